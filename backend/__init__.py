@@ -1,29 +1,56 @@
+import os
+import time
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
+from config import Config, build_engine_options
 
 # Initialize extensions
 db = SQLAlchemy()
 jwt = JWTManager()
 
-def create_app():
+def create_app(config_overrides=None):
+    boot_start = time.perf_counter()
     app = Flask(__name__)
 
     # Configuration
     app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inlinks.db'
+    for key in Config.DATABASE_SETTINGS:
+        app.config[key] = getattr(Config, key)
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = 'jwt-secret-string-change-in-production'
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
+    app.config['ITEM_HOLD_TTL_SECONDS'] = 300
+    app.config['ITEM_HOLD_MAX_TTL_SECONDS'] = 1800
+    app.config['ITEM_HOLD_SWEEP_INTERVAL'] = 60
+    app.config['SLOW_REQUEST_MS'] = 500
+    app.config['SLOW_REQUEST_QUERY_COUNT'] = 50
+    app.config['DASHBOARD_CACHE_TTL'] = 30
+    app.config['BATCH_MAX_REQUESTS'] = 20
+    app.config['AUTO_MIGRATE'] = os.environ.get('AUTO_MIGRATE', 'true').lower() in ('1', 'true', 'yes', 'on')
+    app.config['SCHEMA_CHECK'] = True
+    app.config['JSON_PROVIDER'] = os.environ.get('JSON_PROVIDER', 'auto')
+    if config_overrides:
+        app.config.update(config_overrides)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', build_engine_options(app.config))
 
     # Enable CORS for mobile app and web domain
-    CORS(app, origins=['https://inlinkapi.yesducky.com', 'http://localhost:3000', 'capacitor://localhost', 'http://localhost'], supports_credentials=True)
+    CORS(app, origins=['https://inlinkapi.yesducky.com', 'http://localhost:3000', 'capacitor://localhost', 'http://localhost'], supports_credentials=True,
+         expose_headers=['X-Next-Cursor'])
     
     # Initialize extensions with app
     db.init_app(app)
     jwt.init_app(app)
 
+    # orjson-backed JSON responses when available
+    from utils.json_provider import init_json_provider
+    init_json_provider(app)
+
+    # Registered before the other after_request hooks, so it compresses the final response
+    from utils.compression import init_compression
+    init_compression(app)
+
     # Register blueprints
     from routes.common.auth_routes import auth_bp
     from routes.common.common_routes import common_bp
@@ -61,10 +88,55 @@ def create_app():
     app.register_blueprint(task_item_bp, url_prefix='/api')
     app.register_blueprint(print_label_bp, url_prefix='/api')
 
-    # Create tables and initialize data
+    # Configure the database and check that it is bootstrapped
     with app.app_context():
-        db.create_all()
-        from utils.db_utils import init_default_data
-        init_default_data()
+        # WAL journal, busy timeout and the other connection pragmas for SQLite
+        from utils.sqlite_utils import configure_sqlite
+        configure_sqlite(app, db.engine)
+
+        check_database(app)
+
+        # Per-request query counting and slow request log
+        from utils.query_stats import init_query_stats
+        init_query_stats(app, db.engine)
+
+        # Request, database and cache metrics on GET /metrics
+        from utils.metrics import init_metrics
+        init_metrics(app, db.engine)
+
+        # Opt-in profiling of single requests for admins
+        from utils.request_profiler import init_request_profiler
+        init_request_profiler(app)
 
+    # Release expired item holds in the background
+    from utils.hold_utils import start_hold_sweeper
+    start_hold_sweeper(app)
+
+    # Checkpoint the SQLite WAL in the background
+    from utils.sqlite_utils import start_wal_checkpointer
+    with app.app_context():
+        start_wal_checkpointer(app, db.engine)
+
+    app.config['BOOT_TIME_MS'] = round((time.perf_counter() - boot_start) * 1000, 1)
+    app.logger.debug(f"App created in {app.config['BOOT_TIME_MS']} ms")
     return app
+
+
+def check_database(app):
+    """
+    Check the schema version with a single query instead of creating tables and default data on
+    every start. A database that is behind is bootstrapped in-process when AUTO_MIGRATE is on
+    (the default, for development and single-process servers); otherwise startup fails and
+    bootstrap.py has to be run first, so concurrently starting workers never race on schema changes.
+    """
+    if not app.config['SCHEMA_CHECK']:
+        return
+    from utils.migrations import check_schema
+    current, latest = check_schema()
+    if current >= latest:
+        return
+    if not app.config['AUTO_MIGRATE']:
+        raise RuntimeError(f'Database schema is at version {current}, expected {latest}. '
+                           f'Run "python bootstrap.py" before starting the server.')
+    from utils.db_utils import bootstrap_database
+    bootstrap_database(logger=app.logger)
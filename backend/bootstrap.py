@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Bootstrap the database: apply pending schema migrations and load the default data
+
+Run once per deployment, before starting the server processes. Servers only check the schema
+version at startup; with AUTO_MIGRATE=false they refuse to start on a database that is behind.
+
+Usage:
+    python bootstrap.py              # migrate to the latest version and load default data
+    python bootstrap.py --status     # show the schema version without changing anything
+"""
+
+import argparse
+import logging
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from __init__ import db, create_app
+from utils.db_utils import bootstrap_database
+from utils.migrations import check_schema, MIGRATIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='Only print the schema version')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    app = create_app({'SCHEMA_CHECK': False, 'ITEM_HOLD_SWEEP_INTERVAL': 0, 'SQLITE_CHECKPOINT_INTERVAL': 0})
+    with app.app_context():
+        current, latest = check_schema()
+        print(f"Database: {db.engine.url.render_as_string(hide_password=True)}")
+        print(f"Schema version: {current} (latest {latest})")
+        if args.status:
+            for version, description, _ in MIGRATIONS:
+                print(f"  {'✓' if version <= current else ' '} {version}: {description}")
+            return
+
+        applied = bootstrap_database(logger=app.logger)
+        print(f"✓ Applied {len(applied)} migration(s), default data loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,74 @@ import os
 # Base directory of the application
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _database_url():
+    url = os.environ.get('DATABASE_URL') or 'sqlite:///inlinks.db'
+    # Hosting providers still hand out the postgres:// scheme, which SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
 # Configuration class
 class Config:
     # Secret key for session
     SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(24)
-    
-    # Database configuration
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'app.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = True
+
+    # Database configuration. A relative SQLite path is created in the instance folder.
+    SQLALCHEMY_DATABASE_URI = _database_url()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool for server databases (PostgreSQL, MySQL); SQLite uses SQLAlchemy's defaults
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+    # PostgreSQL only: cancel statements running longer than this (0 disables)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    # PostgreSQL only: session time zone, so timestamps are stored in Hong Kong time as on SQLite
+    DB_TIMEZONE = os.environ.get('DB_TIMEZONE', 'Asia/Hong_Kong')
+
+    DATABASE_SETTINGS = ('SQLALCHEMY_DATABASE_URI', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT',
+                         'DB_POOL_RECYCLE', 'DB_POOL_PRE_PING', 'DB_STATEMENT_TIMEOUT_MS', 'DB_TIMEZONE')
+
+
+def build_engine_options(config):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings of an app config.
+    Pool settings only apply to server databases; SQLite keeps Flask-SQLAlchemy's pool choice.
+
+    Args:
+        config: Flask app config (or any mapping) holding SQLALCHEMY_DATABASE_URI and DB_* keys
+
+    Returns:
+        dict: Keyword arguments for create_engine
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        return {}
+
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if uri.startswith('postgresql'):
+        settings = []
+        if config['DB_STATEMENT_TIMEOUT_MS']:
+            settings.append(f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}")
+        if config['DB_TIMEZONE']:
+            settings.append(f"-c timezone={config['DB_TIMEZONE']}")
+        if settings:
+            options['connect_args'] = {'options': ' '.join(settings)}
+    return options
@@ -85,20 +85,20 @@ class ProcessStateType(db.Model):
 class Lot(db.Model):
     __tablename__ = 'lots'
     id = db.Column(db.String(20), primary_key=True)  # LOT001, LOT002, etc.
-    material_type_id = db.Column(db.String(20), db.ForeignKey('material_types.id'), nullable=False)
+    material_type_id = db.Column(db.String(20), db.ForeignKey('material_types.id'), nullable=False, index=True)
     factory_lot_number = db.Column(db.String(100), nullable=False)
     carton_ids = db.Column(db.Text)  # JSON string of carton IDs
     log_ids = db.Column(db.Text)  # JSON string of log IDs
     created_at = db.Column(db.DateTime, default=get_hk_time)
     created_user_id = db.Column(db.String(20), db.ForeignKey('users.id'), nullable=False)
-    project_id = db.Column(db.String(20), db.ForeignKey('projects.id'), nullable=True)
+    project_id = db.Column(db.String(20), db.ForeignKey('projects.id'), nullable=True, index=True)
 
     material_type = db.relationship('MaterialType', backref='lots')
 
 class Carton(db.Model):
     __tablename__ = 'cartons'
     id = db.Column(db.String(20), primary_key=True)  # CTN001, CTN002, etc.
-    parent_lot_id = db.Column(db.String(20), db.ForeignKey('lots.id'), nullable=False)
+    parent_lot_id = db.Column(db.String(20), db.ForeignKey('lots.id'), nullable=False, index=True)
     material_type_id = db.Column(db.String(20), db.ForeignKey('material_types.id'), nullable=False)
     item_ids = db.Column(db.Text)  # JSON string of item IDs
     log_ids = db.Column(db.Text)  # JSON string of log IDs
@@ -113,26 +113,55 @@ class Item(db.Model):
     material_type_id = db.Column(db.String(20), db.ForeignKey('material_types.id'), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), nullable=False)  # available, assigned, used
-    parent_id = db.Column(db.String(20))  # carton or item ID
+    parent_id = db.Column(db.String(20), index=True)  # carton or item ID
     child_item_ids = db.Column(db.Text)  # JSON string of child item IDs
     log_ids = db.Column(db.Text)  # JSON string of stock log IDs
     task_ids = db.Column(db.Text)  # JSON string of task IDs
     label = db.Column(db.String(100), nullable=True)  # e.g. "ITM001-001"
     label_count = db.Column(db.Integer, nullable=True, default=0)  # Number of labels for this item
     created_at = db.Column(db.DateTime, default=get_hk_time)
+    lot_id = db.Column(db.String(20), db.ForeignKey('lots.id'), nullable=True)  # denormalized from the parent chain
+    carton_id = db.Column(db.String(20), db.ForeignKey('cartons.id'), nullable=True)  # denormalized from the parent chain
+
+    # Available-stock index: "N items of length L in lot X" and per-lot/material stock are range scans
+    __table_args__ = (
+        db.Index('ix_items_stock', 'lot_id', 'material_type_id', 'status', 'quantity'),
+        db.Index('ix_items_carton_id', 'carton_id'),
+        # Stock per material type and status (material quantities, available item lists)
+        db.Index('ix_items_material_status', 'material_type_id', 'status'),
+        db.Index('ix_items_status', 'status'),
+    )
 
     material_type = db.relationship('MaterialType', backref='items')
 
+class ItemHold(db.Model):
+    __tablename__ = 'item_holds'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    item_id = db.Column(db.String(20), db.ForeignKey('items.id'), nullable=False, unique=True)  # one hold per item
+    task_id = db.Column(db.String(20), db.ForeignKey('tasks.id'), nullable=False)
+    user_id = db.Column(db.String(20), db.ForeignKey('users.id'), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=get_hk_time)
+
+    __table_args__ = (
+        db.Index('ix_item_holds_item_expires', 'item_id', 'expires_at'),
+        db.Index('ix_item_holds_task_expires', 'task_id', 'expires_at'),
+        db.Index('ix_item_holds_expires', 'expires_at'),
+    )
+
+    item = db.relationship('Item', backref=db.backref('hold', uselist=False, cascade='all, delete-orphan'))
+    task = db.relationship('Task', backref=db.backref('item_holds', cascade='all, delete-orphan'))
+
 class StockLog(db.Model):
     __tablename__ = 'stock_logs'
     id = db.Column(db.String(20), primary_key=True)  # SL001, SL002, etc.
-    date = db.Column(db.DateTime, default=get_hk_time)
+    date = db.Column(db.DateTime, default=get_hk_time, index=True)
     user_id = db.Column(db.String(20), db.ForeignKey('users.id'))
     description = db.Column(db.Text)
-    task_id = db.Column(db.String(20))
-    item_id = db.Column(db.String(20), db.ForeignKey('items.id'))
-    lot_id = db.Column(db.String(20), db.ForeignKey('lots.id'))
-    carton_id = db.Column(db.String(20), db.ForeignKey('cartons.id'))
+    task_id = db.Column(db.String(20), index=True)
+    item_id = db.Column(db.String(20), db.ForeignKey('items.id'), index=True)
+    lot_id = db.Column(db.String(20), db.ForeignKey('lots.id'), index=True)
+    carton_id = db.Column(db.String(20), db.ForeignKey('cartons.id'), index=True)
     created_at = db.Column(db.DateTime, default=get_hk_time)
 
     user = db.relationship('User', backref='stock_logs')
@@ -169,10 +198,10 @@ class WorkOrder(db.Model):
     start_date = db.Column(db.DateTime, nullable=True)
     due_date = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
-    assignee_id = db.Column(db.String(20), db.ForeignKey('users.id'))
+    assignee_id = db.Column(db.String(20), db.ForeignKey('users.id'), index=True)
     estimated_hour = db.Column(db.Float, nullable=True)
     workflow_type_id = db.Column(db.String(20), db.ForeignKey('workflow_types.id'), nullable=False)
-    parent_project_id = db.Column(db.String(20), db.ForeignKey('projects.id'), nullable=False)
+    parent_project_id = db.Column(db.String(20), db.ForeignKey('projects.id'), nullable=False, index=True)
     lot_id = db.Column(db.String(20), db.ForeignKey('lots.id'))
     task_ids = db.Column(db.Text)  # JSON string of task IDs
     process_log_ids = db.Column(db.Text)  # JSON string of process log IDs
@@ -193,9 +222,9 @@ class Task(db.Model):
     start_date = db.Column(db.DateTime, nullable=True)
     due_date = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
-    assignee_id = db.Column(db.String(20), db.ForeignKey('users.id'))
+    assignee_id = db.Column(db.String(20), db.ForeignKey('users.id'), index=True)
     estimated_hour = db.Column(db.Float, nullable=True)
-    work_order_id = db.Column(db.String(20), db.ForeignKey('work_orders.id'))
+    work_order_id = db.Column(db.String(20), db.ForeignKey('work_orders.id'), index=True)
     subtask_ids = db.Column(db.Text)  # JSON string of subtask IDs
     created_at = db.Column(db.DateTime, default=get_hk_time)
 
@@ -214,9 +243,9 @@ class SubTask(db.Model):
     start_date = db.Column(db.DateTime, nullable=True)
     due_date = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
-    assignee_id = db.Column(db.String(20), db.ForeignKey('users.id'))
+    assignee_id = db.Column(db.String(20), db.ForeignKey('users.id'), index=True)
     estimated_hour = db.Column(db.Float, nullable=True)
-    task_id = db.Column(db.String(20), db.ForeignKey('tasks.id'))
+    task_id = db.Column(db.String(20), db.ForeignKey('tasks.id'), index=True)
     created_at = db.Column(db.DateTime, default=get_hk_time)
 
     task = db.relationship('Task', backref='subtasks')
@@ -226,7 +255,7 @@ class SubTask(db.Model):
 class ProcessLog(db.Model):
     __tablename__ = 'process_logs'
     id = db.Column(db.String(20), primary_key=True)  # PL001, PL002, etc.
-    date = db.Column(db.DateTime, default=get_hk_time)
+    date = db.Column(db.DateTime, default=get_hk_time, index=True)
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=get_hk_time)
 
@@ -237,16 +266,16 @@ class ProcessLog(db.Model):
     user_id = db.Column(db.String(20), db.ForeignKey('users.id'), nullable=False)
     user = db.relationship('User', backref='process_logs')
 
-    project_id = db.Column(db.String(20), db.ForeignKey('projects.id'))
+    project_id = db.Column(db.String(20), db.ForeignKey('projects.id'), index=True)
     project = db.relationship('Project', backref='process_logs')
 
-    work_order_id = db.Column(db.String(20), db.ForeignKey('work_orders.id'))
+    work_order_id = db.Column(db.String(20), db.ForeignKey('work_orders.id'), index=True)
     work_order = db.relationship('WorkOrder', backref='process_logs')
 
-    task_id = db.Column(db.String(20), db.ForeignKey('tasks.id'))
+    task_id = db.Column(db.String(20), db.ForeignKey('tasks.id'), index=True)
     task = db.relationship('Task', backref='process_logs')
 
-    subtask_id = db.Column(db.String(20), db.ForeignKey('subtasks.id'))
+    subtask_id = db.Column(db.String(20), db.ForeignKey('subtasks.id'), index=True)
     subtask = db.relationship('SubTask', backref='process_logs')
 
 
@@ -289,3 +318,17 @@ class PermissionAudit(db.Model):
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.Text)
 
+
+# Database Models - ID Sequence Collection
+class IdSequence(db.Model):
+    __tablename__ = 'id_sequences'
+    prefix = db.Column(db.String(10), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)  # numeric part of the last ID handed out by generate_id
+
+
+# Database Models - Cache Collection
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # incremented by every commit that writes the table
+    updated_at = db.Column(db.DateTime, default=get_hk_time)
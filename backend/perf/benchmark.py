@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for hot API endpoints
+
+Builds a synthetic dataset (see perf/seed_data.py), calls the hot endpoints through the Flask
+test client and records latency, query count and response size per endpoint. Also measures how
+long a fresh process takes to import and create the app on the bootstrapped database and its
+peak RSS, and fails when boot or import time exceeds its target or a module that should be
+imported lazily (LAZY_MODULES) is loaded at boot. For the largest payloads (ENCODING_CASES) it
+also times encoding the response body with each installed JSON provider, and for the streamable
+listings (STREAM_CASES) it compares the peak memory of a buffered and a streamed response, and it
+times generate_id for the busiest ID prefixes (ID_PREFIXES) next to a scan of the table's IDs.
+Cases that write (MUTATING_CASES) and the ID timing run against a scratch copy of the seeded
+database that is restored before every run, so each run, every later case and a reused --db file
+see the seeded data unchanged. Results are written as JSON so runs on different commits can be compared.
+
+Usage:
+    python perf/benchmark.py --scale small --repeat 5
+    python perf/benchmark.py --db /tmp/bench.db        # reuse a seeded database between runs
+    python perf/benchmark.py --compare perf/results/<earlier run>.json
+    python perf/benchmark.py --json-provider stdlib   # serve responses with the stdlib encoder
+    python perf/benchmark.py --accept-encoding gzip   # measure compressed responses
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask_jwt_extended import create_access_token
+from __init__ import create_app, db
+from models import Lot, Item, StockLog
+from perf.seed_data import seed_benchmark_data, SCALES
+from utils.json_provider import available_providers
+from utils.db_utils import generate_id, highest_id_number
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'perf', 'results')
+BOOT_TARGET_MS = 1500
+IMPORT_TARGET_MS = 900
+# Modules only needed by rarely used endpoints; loading them at boot fails the check
+LAZY_MODULES = ('PIL', 'qrcode', 'barcode', 'cProfile', 'pstats')
+BOOT_SCRIPT = '''
+import json, resource, sys, time
+start = time.perf_counter()
+from __init__ import create_app
+imported = time.perf_counter()
+create_app({'ITEM_HOLD_SWEEP_INTERVAL': 0, 'SQLITE_CHECKPOINT_INTERVAL': 0})
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'create_app_ms': (done - imported) * 1000,
+                  'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'modules': sorted(m for m in %r if m in sys.modules)}))
+''' % (LAZY_MODULES,)
+
+# name, method, url template, JSON body template
+CASES = [
+    ('lots', 'GET', '/api/lots', None),
+    ('lots_summary', 'GET', '/api/lots?include=none', None),
+    ('lot_detail', 'GET', '/api/lots/{lot_id}', None),
+    ('cartons_by_lot', 'GET', '/api/cartons/lot/{lot_id}', None),
+    ('cartons_by_lot_summary', 'GET', '/api/cartons/lot/{lot_id}?include=none', None),
+    ('lots_by_material_ids', 'GET', '/api/lots/material_type/{material_type_id}?include=ids', None),
+    ('lot_items', 'GET', '/api/lots/{lot_id}/items', None),
+    ('items_page', 'GET', '/api/items?limit=500', None),
+    ('task_items', 'GET', '/api/tasks/{task_id}/items', None),
+    ('task_available_items', 'GET', '/api/tasks/{task_id}/items/available', None),
+    ('task_assign_items', 'POST', '/api/tasks/{task_id}/items/assign',
+     {'assignments': [{'lot_id': '{lot_id}', 'material_type_id': '{material_type_id}', 'quantity': 5}]}),
+    ('task_print_all', 'POST', '/api/tasks/{task_id}/print-all', {'show_printed': True}),
+    ('dashboard', 'GET', '/api/dashboard', None),
+    ('search', 'GET', '/api/search?q=cab&limit=20', None),
+    ('lot_screen_batch', 'POST', '/api/batch',
+     {'requests': ['/api/lots/{lot_id}', '/api/cartons/lot/{lot_id}?include=none']}),
+    ('material_types', 'GET', '/api/material_types', None),
+    ('card_menus', 'GET', '/api/card-menus', None),
+]
+# Cases that write to the database; they run against the scratch copy (see copy_database)
+MUTATING_CASES = ('task_assign_items', 'task_print_all')
+# Cases whose response body is encoded with every installed JSON provider
+ENCODING_CASES = ('lots', 'items_page')
+# Cases that support ?stream=ndjson; peak memory is compared with the buffered response
+STREAM_CASES = ('lots', 'lot_items')
+# ID prefixes generate_id is timed for; add_lot takes an ITM and an SL ID per item
+ID_PREFIXES = (('ITM', Item), ('SL', StockLog))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def fill(template, ids):
+    """Substitute {placeholders} in a URL or JSON body template"""
+    if isinstance(template, str):
+        return template.format(**ids)
+    if isinstance(template, dict):
+        return {key: fill(value, ids) for key, value in template.items()}
+    if isinstance(template, list):
+        return [fill(value, ids) for value in template]
+    return template
+
+
+def app_config(db_path, json_provider):
+    return {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'ITEM_HOLD_SWEEP_INTERVAL': 0,
+        # No background connection may be open while the scratch copy is restored
+        'SQLITE_CHECKPOINT_INTERVAL': 0,
+        'QUERY_STATS_HEADERS': True,
+        'SLOW_REQUEST_MS': float('inf'),
+        'SLOW_REQUEST_QUERY_COUNT': float('inf'),
+        'JSON_PROVIDER': json_provider,
+    }
+
+
+def copy_database(source_path, target_path, target_app=None):
+    """
+    Overwrite target_path with the contents of the SQLite database at source_path, including pages
+    still in its WAL. The connections target_app holds to the target are closed first.
+    """
+    if target_app is not None:
+        with target_app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    source, target = sqlite3.connect(source_path), sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def build_app(db_path, scale, json_provider='auto'):
+    app = create_app(app_config(db_path, json_provider))
+    with app.app_context():
+        if Lot.query.count() == 0:
+            start = time.perf_counter()
+            counts = seed_benchmark_data(scale)
+            print(f"Seeded {', '.join(f'{n} {name}' for name, n in counts.items())} "
+                  f"in {time.perf_counter() - start:.1f}s")
+        else:
+            print(f'Reusing seeded database {db_path}')
+
+        lot = Lot.query.order_by(Lot.id).first()
+        # A task that already has items, so item listing and print-all have work to do
+        task_item = Item.query.filter(Item.task_ids != '[]').order_by(Item.id).first()
+        ids = {
+            'lot_id': lot.id,
+            'material_type_id': lot.material_type_id,
+            'task_id': json.loads(task_item.task_ids)[0] if task_item else 'TSK00001',
+        }
+        counts = {model.__tablename__: model.query.count() for model in (Lot, Item)}
+        token = create_access_token(identity='USR001')
+    return app, ids, counts, token
+
+
+def run_case(client, headers, method, url, body, repeat, warmup, reset=None):
+    """Time a request; reset (if given) is called before every run, outside the timing"""
+    latencies, query_counts, sizes, statuses = [], [], [], []
+    for n in range(warmup + repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        response = client.open(url, method=method, json=body, headers=headers)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if n < warmup:
+            continue
+        latencies.append(elapsed_ms)
+        query_counts.append(int(response.headers.get('X-Query-Count', 0)))
+        sizes.append(len(response.get_data()))
+        statuses.append(response.status_code)
+    return {
+        'url': url,
+        'method': method,
+        'runs': repeat,
+        'statuses': sorted(set(statuses)),
+        'latency_ms': {
+            'min': round(min(latencies), 2),
+            'median': round(statistics.median(latencies), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'max': round(max(latencies), 2),
+        },
+        'queries': {'median': statistics.median(query_counts), 'max': max(query_counts)},
+        'response_bytes': max(sizes),
+    }
+
+
+def capture_payload(app, client, headers, url):
+    """Call a GET endpoint and return the object its view passed to jsonify"""
+    captured = []
+    original = app.json.response
+
+    def capture(*args, **kwargs):
+        captured.append(app.json._prepare_response_obj(args, kwargs))
+        return original(*args, **kwargs)
+
+    app.json.response = capture
+    try:
+        client.get(url, headers=headers)
+    finally:
+        del app.json.response
+    return captured[-1] if captured else None
+
+
+def measure_encoding(app, payload, repeat):
+    """Time encoding a response payload with each installed JSON provider"""
+    result = {}
+    for name, provider_class in available_providers().items():
+        provider = provider_class(app)
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = provider.response(payload)
+            samples.append((time.perf_counter() - start) * 1000)
+        result[name] = {'median_ms': round(statistics.median(samples), 2), 'bytes': len(response.get_data())}
+    return result
+
+
+def measure_stream_memory(client, headers, url):
+    """Peak Python memory allocated while serving and reading a response, buffered and streamed"""
+    result = {}
+    separator = '&' if '?' in url else '?'
+    for mode, mode_url in (('buffered', url), ('stream', f'{url}{separator}stream=ndjson')):
+        tracemalloc.start()
+        response = client.get(mode_url, headers=headers, buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result[mode] = {'peak_mb': round(peak / 1024 / 1024, 2), 'bytes': size}
+    return result
+
+
+def measure_id_generation(app, repeat):
+    """
+    Time generate_id per prefix against scanning the table for its highest ID. The counters are
+    created and committed first; the timed IDs are rolled back.
+    """
+    result = {}
+    with app.app_context():
+        for prefix, model in ID_PREFIXES:
+            generate_id(prefix, model)
+            db.session.commit()
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                generate_id(prefix, model)
+                samples.append((time.perf_counter() - start) * 1000)
+            db.session.rollback()
+            start = time.perf_counter()
+            highest_id_number(prefix, model)
+            scan_ms = (time.perf_counter() - start) * 1000
+            result[prefix] = {'median_ms': round(statistics.median(samples), 3), 'scan_ms': round(scan_ms, 3)}
+        db.session.remove()
+    return result
+
+
+def measure_boot(db_path, runs):
+    """Import and create the app in fresh processes; the schema check must find the database current"""
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', AUTO_MIGRATE='false')
+    samples = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', BOOT_SCRIPT], cwd=BACKEND_DIR, env=env,
+                                         stderr=subprocess.DEVNULL)
+        samples.append(json.loads(output.decode().strip().splitlines()[-1]))
+    import_ms = statistics.median(s['import_ms'] for s in samples)
+    create_app_ms = statistics.median(s['create_app_ms'] for s in samples)
+    total_ms = statistics.median(s['import_ms'] + s['create_app_ms'] for s in samples)
+    return {'runs': runs, 'import_ms': round(import_ms, 1), 'create_app_ms': round(create_app_ms, 1),
+            'total_ms': round(total_ms, 1), 'rss_mb': round(statistics.median(s['rss_mb'] for s in samples), 1),
+            'eager_modules': samples[-1]['modules']}
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous['meta'].get('commit')} ({previous_path}):")
+    for name, result in results['results'].items():
+        before = previous['results'].get(name)
+        if not before:
+            continue
+        old_ms, new_ms = before['latency_ms']['median'], result['latency_ms']['median']
+        change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0
+        print(f"  {name:22} {old_ms:10.1f} -> {new_ms:10.1f} ms ({change:+.0f}%), "
+              f"queries {before['queries']['median']} -> {result['queries']['median']}, "
+              f"bytes {before['response_bytes']} -> {result['response_bytes']}")
+    for name, encoders in results.get('encoding', {}).items():
+        for provider, after in encoders.items():
+            before = previous.get('encoding', {}).get(name, {}).get(provider)
+            if before:
+                print(f"  {name + ' ' + provider + ' encode':22} {before['median_ms']:10.1f} -> "
+                      f"{after['median_ms']:10.1f} ms")
+    for name, modes in results.get('stream_memory', {}).items():
+        for mode, after in modes.items():
+            before = previous.get('stream_memory', {}).get(name, {}).get(mode)
+            if before:
+                print(f"  {name + ' ' + mode + ' peak':22} {before['peak_mb']:10.1f} -> {after['peak_mb']:10.1f} MB")
+    for prefix, after in results.get('id_generation', {}).items():
+        before = previous.get('id_generation', {}).get(prefix)
+        if before:
+            print(f"  {'generate_id ' + prefix:22} {before['median_ms']:10.3f} -> {after['median_ms']:10.3f} ms")
+    if 'boot' in previous and 'boot' in results:
+        before, after = previous['boot'], results['boot']
+        print(f"  {'boot':22} {before['total_ms']:10.1f} -> {after['total_ms']:10.1f} ms, "
+              f"import {before['import_ms']:.1f} -> {after['import_ms']:.1f} ms, "
+              f"RSS {before.get('rss_mb', 0):.1f} -> {after.get('rss_mb', 0):.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--db', help='SQLite file to seed or reuse (default: a temporary file)')
+    parser.add_argument('--only', help='Comma separated case names to run')
+    parser.add_argument('--output', help='Result file (default: perf/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare with')
+    parser.add_argument('--json-provider', choices=['auto', 'orjson', 'stdlib'], default='auto',
+                        help='JSON provider the app serves responses with (default auto)')
+    parser.add_argument('--accept-encoding', help='Accept-Encoding header sent with every request (e.g. gzip)')
+    parser.add_argument('--boot-runs', type=int, default=3, help='Fresh processes to time app boot in (0 to skip)')
+    parser.add_argument('--boot-target-ms', type=float, default=BOOT_TARGET_MS,
+                        help=f'Fail when the median import + create_app time exceeds this (default {BOOT_TARGET_MS})')
+    parser.add_argument('--import-target-ms', type=float, default=IMPORT_TARGET_MS,
+                        help=f'Fail when the median import time exceeds this (default {IMPORT_TARGET_MS})')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db) if args.db else os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+    app, ids, counts, token = build_app(db_path, args.scale, args.json_provider)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    if args.accept_encoding:
+        headers['Accept-Encoding'] = args.accept_encoding
+    only = set(args.only.split(',')) if args.only else None
+
+    # Writes go to a scratch copy, restored from the seeded database before each run
+    scratch_path = os.path.join(tempfile.mkdtemp(), 'scratch.db')
+    copy_database(db_path, scratch_path)
+    scratch_app = create_app(app_config(scratch_path, args.json_provider))
+    scratch_client = scratch_app.test_client()
+
+    def restore_scratch():
+        copy_database(db_path, scratch_path, scratch_app)
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'scale': args.scale,
+            'rows': counts,
+            'json_provider': app.config['JSON_PROVIDER'],
+            'accept_encoding': args.accept_encoding,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': {},
+    }
+    for name, method, url, body in CASES:
+        if only and name not in only:
+            continue
+        if name in MUTATING_CASES:
+            result = run_case(scratch_client, headers, method, fill(url, ids), fill(body, ids),
+                              args.repeat, args.warmup, reset=restore_scratch)
+        else:
+            result = run_case(client, headers, method, fill(url, ids), fill(body, ids), args.repeat, args.warmup)
+        results['results'][name] = result
+        print(f"{name:22} median {result['latency_ms']['median']:10.1f} ms  p95 {result['latency_ms']['p95']:10.1f} ms  "
+              f"queries {result['queries']['median']:>6}  {result['response_bytes']:>10} bytes  {result['statuses']}")
+
+    results['encoding'] = {}
+    for name, method, url, body in CASES:
+        if name not in ENCODING_CASES or (only and name not in only):
+            continue
+        payload = capture_payload(app, client, headers, fill(url, ids))
+        if payload is None:
+            continue
+        results['encoding'][name] = encoders = measure_encoding(app, payload, args.repeat)
+        print(f"{name + ' encode':22} " + '  '.join(
+            f"{provider} {encoder['median_ms']:8.1f} ms" for provider, encoder in encoders.items()))
+
+    results['stream_memory'] = {}
+    for name, method, url, body in CASES:
+        if name not in STREAM_CASES or (only and name not in only):
+            continue
+        results['stream_memory'][name] = modes = measure_stream_memory(client, headers, fill(url, ids))
+        print(f"{name + ' peak memory':22} " + '  '.join(
+            f"{mode} {m['peak_mb']:8.1f} MB" for mode, m in modes.items()))
+
+    restore_scratch()
+    results['id_generation'] = id_generation = measure_id_generation(scratch_app, max(args.repeat, 20))
+    for prefix, timing in id_generation.items():
+        print(f"{'generate_id ' + prefix:22} median {timing['median_ms']:10.3f} ms  "
+              f"(scan for highest ID {timing['scan_ms']:.1f} ms)")
+
+    with app.app_context():
+        db.session.remove()
+    with scratch_app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+    boot_ok = True
+    if args.boot_runs:
+        results['boot'] = boot = measure_boot(db_path, args.boot_runs)
+        boot['target_ms'] = args.boot_target_ms
+        boot['import_target_ms'] = args.import_target_ms
+        boot_ok = (boot['total_ms'] <= args.boot_target_ms and boot['import_ms'] <= args.import_target_ms
+                   and not boot['eager_modules'])
+        print(f"{'boot':22} median {boot['total_ms']:10.1f} ms  (import {boot['import_ms']:.1f}/"
+              f"{args.import_target_ms:.0f} ms, create_app {boot['create_app_ms']:.1f} ms, "
+              f"target {args.boot_target_ms:.0f} ms, RSS {boot['rss_mb']:.1f} MB) {'✓' if boot_ok else '✗'}")
+        if boot['eager_modules']:
+            print(f"{'':22} loaded at boot but should be lazy: {', '.join(boot['eager_modules'])}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if not boot_ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
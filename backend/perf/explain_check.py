@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Query plan check for the benchmark endpoints
+
+Calls every benchmark case (see perf/benchmark.py) on a seeded SQLite database, records the
+SQL statements each one runs and asks SQLite for their plan with EXPLAIN QUERY PLAN. A filtered
+statement that reads a whole table instead of searching an index fails the check.
+
+Allowed full scans:
+    - statements without a WHERE clause (whole-table listings)
+    - common table expressions (the work queue of a recursive query is always scanned)
+    - small reference tables listed in REFERENCE_TABLES
+    - the statements matched by KNOWN_SCANS, each with the reason it cannot use an index
+
+Usage:
+    python perf/explain_check.py
+    python perf/explain_check.py --db /tmp/bench.db --verbose
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from __init__ import db
+from perf.benchmark import CASES, build_app, fill
+
+# Lookup tables with a handful of rows; scanning them is cheaper than an index search
+REFERENCE_TABLES = {'material_types', 'process_state_types', 'log_types', 'workflow_types', 'user_types',
+                    'permissions', 'user_type_permissions', 'card_menus', 'schema_version'}
+
+# (table, SQL pattern, reason)
+KNOWN_SCANS = [
+    ('items', r'items\.task_ids LIKE', 'task_ids is a JSON-text list; LIKE with a leading wildcard cannot use an index'),
+] + [
+    (table, r'AS section\b', 'dashboard counts aggregate every row (utils/dashboard_stats.py)')
+    for table in ('projects', 'work_orders', 'tasks', 'items', 'lots')
+]
+
+SCAN_LINE = re.compile(r'^SCAN (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX \w+)?$')
+CTE_NAME = re.compile(r'(?:\bWITH(?:\s+RECURSIVE)?|,)\s*(\w+)(?:\([^)]*\))?\s+AS\s+\(', re.IGNORECASE)
+
+
+def full_scans(plan_details):
+    """Tables read in full according to EXPLAIN QUERY PLAN detail lines"""
+    tables = []
+    for detail in plan_details:
+        match = SCAN_LINE.match(detail.strip())
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def known_scan(table, statement):
+    for known_table, pattern, reason in KNOWN_SCANS:
+        if table == known_table and re.search(pattern, statement):
+            return reason
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='small')
+    parser.add_argument('--db', help='SQLite file to seed or reuse (default: a temporary file)')
+    parser.add_argument('--verbose', action='store_true', help='Print the plan of every statement')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db) if args.db else os.path.join(tempfile.mkdtemp(), 'explain.db')
+    app, ids, _, token = build_app(db_path, args.scale)
+    with app.app_context():
+        engine = db.engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    captured = {}
+    for name, method, url, body in CASES:
+        statements.clear()
+        client.open(fill(url, ids), method=method, json=fill(body, ids), headers=headers)
+        captured[name] = list(statements)
+    event.remove(engine, 'before_cursor_execute', record)
+
+    failures = 0
+    with engine.connect() as conn:
+        raw = conn.connection.driver_connection
+        for name, case_statements in captured.items():
+            seen = set()
+            problems = []
+            for statement, parameters in case_statements:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                plan = [row[-1] for row in raw.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()]
+                if args.verbose:
+                    print(f'  {name}: {" ".join(statement.split())[:160]}')
+                    for detail in plan:
+                        print(f'      {detail}')
+                if not re.search(r'\bWHERE\b', statement, re.IGNORECASE):
+                    continue
+                ctes = set(CTE_NAME.findall(statement))
+                for table in full_scans(plan):
+                    if table in REFERENCE_TABLES or table in ctes:
+                        continue
+                    if known_scan(table, statement):
+                        continue
+                    problems.append((table, statement))
+            failures += len(problems)
+            print(f"{'✗' if problems else '✓'} {name}: {len(seen)} distinct statements"
+                  f"{f', {len(problems)} full scan(s)' if problems else ''}")
+            for table, statement in problems:
+                print(f'    SCAN {table}: {" ".join(statement.split())[:200]}')
+
+    if failures:
+        print(f'\n{failures} filtered statement(s) scan a whole table')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
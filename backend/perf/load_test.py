@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Load test for a running InLINKS server
+
+Simulates mobile clients polling their tasks and scanning items while supervisors assign stock
+and print labels. Clients start gradually over the ramp-up period and each picks its next call
+from a weighted mix. Reports throughput, p50/p95/p99 latency and errors per operation, and counts
+SQLite "database is locked" failures separately.
+
+Usage:
+    python app.py                                    # in another shell
+    python perf/load_test.py --clients 30 --ramp-up 10 --duration 60
+    python perf/load_test.py --mix scan=60,poll=30,assign=5,print=5 --json results.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+DEFAULT_MIX = 'scan=50,poll=25,task_items=15,assign=5,print=5'
+LOCKED_MESSAGE = 'database is locked'
+
+
+class Operations:
+    """The API calls a simulated client can make, with the IDs discovered from the server"""
+
+    def __init__(self, base_url, token, user_id, items, tasks, assign_quantity):
+        self.base_url = base_url
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.user_id = user_id
+        self.items = items
+        self.tasks = tasks
+        self.assign_quantity = assign_quantity
+
+    def call(self, session, name, rng):
+        if name == 'scan':
+            item = rng.choice(self.items)
+            return session.get(f"{self.base_url}/api/items/{item['id']}", headers=self.headers)
+        if name == 'poll':
+            return session.get(f'{self.base_url}/api/tasks/by_user/{self.user_id}', headers=self.headers)
+        if name == 'task_items':
+            return session.get(f'{self.base_url}/api/tasks/{rng.choice(self.tasks)}/items', headers=self.headers)
+        if name == 'assign':
+            item = rng.choice(self.items)
+            body = {'assignments': [{'lot_id': item['lot_id'], 'material_type_id': item['material_type_id'],
+                                     'quantity': self.assign_quantity}]}
+            return session.post(f'{self.base_url}/api/tasks/{rng.choice(self.tasks)}/items/assign',
+                                json=body, headers=self.headers)
+        if name == 'print':
+            item = rng.choice(self.items)
+            return session.post(f"{self.base_url}/api/items/{item['id']}/print",
+                                json={'task_id': rng.choice(self.tasks)}, headers=self.headers)
+        raise ValueError(f'Unknown operation: {name}')
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def login(base_url, username, password):
+    response = requests.post(f'{base_url}/auth/login', json={'username': username, 'password': password})
+    response.raise_for_status()
+    data = response.json()
+    return data['access_token'], data.get('user_id')
+
+
+def discover(base_url, token):
+    """Fetch item and task IDs to use in the generated calls"""
+    headers = {'Authorization': f'Bearer {token}'}
+    items = requests.get(f'{base_url}/api/items', params={'status': 'available', 'limit': 500,
+                                                          'fields': 'id,lot_id,material_type_id'},
+                         headers=headers).json()['items']
+    tasks = requests.get(f'{base_url}/api/tasks', params={'limit': 500}, headers=headers).json()['items']
+    items = [item for item in items if item.get('lot_id')]
+    if not items or not tasks:
+        sys.exit('The server needs available items with a lot and at least one task to load test')
+    return items, [task['id'] for task in tasks]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_client(operations, weights, stop_at, results, lock, seed):
+    rng = random.Random(seed)
+    names, cumulative = list(weights), list(weights.values())
+    session = requests.Session()
+    samples = []
+    while time.time() < stop_at:
+        name = rng.choices(names, weights=cumulative)[0]
+        start = time.perf_counter()
+        error, locked = None, False
+        try:
+            response = operations.call(session, name, rng)
+            status = response.status_code
+            if status >= 400:
+                body = response.text
+                locked = LOCKED_MESSAGE in body
+                error = f'HTTP {status}'
+        except requests.RequestException as e:
+            status, error = None, type(e).__name__
+            locked = LOCKED_MESSAGE in str(e)
+        samples.append((name, (time.perf_counter() - start) * 1000, error, locked))
+    with lock:
+        results.extend(samples)
+
+
+def report(results, elapsed, clients):
+    by_operation = defaultdict(list)
+    for sample in results:
+        by_operation[sample[0]].append(sample)
+
+    summary = {'clients': clients, 'duration_s': round(elapsed, 1), 'requests': len(results),
+               'throughput_rps': round(len(results) / elapsed, 1) if elapsed else 0.0,
+               'errors': sum(1 for s in results if s[2]), 'database_locked': sum(1 for s in results if s[3]),
+               'operations': {}}
+
+    print(f"\n{'operation':12} {'count':>7} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'locked':>7}")
+    for name, samples in sorted(by_operation.items()) + [('all', results)]:
+        latencies = [s[1] for s in samples]
+        errors = defaultdict(int)
+        for s in samples:
+            if s[2]:
+                errors[s[2]] += 1
+        stats = {
+            'count': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50), 1),
+            'p95_ms': round(percentile(latencies, 0.95), 1),
+            'p99_ms': round(percentile(latencies, 0.99), 1),
+            'error_rate': round(sum(errors.values()) / len(samples), 4) if samples else 0.0,
+            'errors': dict(errors),
+            'database_locked': sum(1 for s in samples if s[3]),
+        }
+        if name != 'all':
+            summary['operations'][name] = stats
+        else:
+            summary.update({k: stats[k] for k in ('p50_ms', 'p95_ms', 'p99_ms', 'error_rate')})
+        print(f"{name:12} {stats['count']:>7} {stats['throughput_rps']:>7} {stats['p50_ms']:>9} {stats['p95_ms']:>9} "
+              f"{stats['p99_ms']:>9} {sum(errors.values()):>7} {stats['database_locked']:>7}")
+
+    if summary['database_locked']:
+        print(f"\n✗ {summary['database_locked']} requests failed with '{LOCKED_MESSAGE}'")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--clients', type=int, default=20, help='Number of concurrent simulated clients')
+    parser.add_argument('--ramp-up', type=float, default=10, help='Seconds over which clients are started')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run after the first client starts')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Weighted operations (default {DEFAULT_MIX})')
+    parser.add_argument('--assign-quantity', type=float, default=1, help='Quantity requested per assignment')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write the summary to this file')
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    token, user_id = login(args.base_url, args.username, args.password)
+    items, tasks = discover(args.base_url, token)
+    operations = Operations(args.base_url, token, user_id or 'USR001', items, tasks, args.assign_quantity)
+    print(f'{len(items)} items and {len(tasks)} tasks discovered; '
+          f'{args.clients} clients over {args.ramp_up}s ramp-up, {args.duration}s total')
+
+    results, lock, threads = [], threading.Lock(), []
+    start = time.time()
+    stop_at = start + args.duration
+    for n in range(args.clients):
+        thread = threading.Thread(target=run_client, args=(operations, weights, stop_at, results, lock, args.seed + n),
+                                  daemon=True)
+        thread.start()
+        threads.append(thread)
+        if args.clients > 1:
+            time.sleep(args.ramp_up / (args.clients - 1))
+    for thread in threads:
+        thread.join()
+
+    summary = report(results, time.time() - start, args.clients)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(1 if summary['database_locked'] else 0)
+
+
+if __name__ == '__main__':
+    main()
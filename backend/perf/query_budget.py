@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Query budget check for list endpoints
+
+Seeds a throwaway database with a 2,000 task project hierarchy, calls each list endpoint
+through the Flask test client and fails when an endpoint runs more SQL statements than its
+budget. A lazy-loaded relationship shows up here as one extra query per row. Unpaged requests to
+the lists that keep a bare-array response must also stay within MAX_PAGE_SIZE rows and point to
+the rest with an X-Next-Cursor header.
+
+Usage: python perf/query_budget.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from __init__ import create_app, db
+from perf.seed_data import seed_project_data
+from utils.list_query import MAX_PAGE_SIZE
+
+# Maximum number of SQL statements per request
+QUERY_BUDGETS = {
+    '/api/projects?limit=500': 2,
+    '/api/work_orders?limit=500': 1,
+    '/api/tasks?limit=500': 1,
+    '/api/subtasks?limit=500': 1,
+    # Unpaged (bare array) requests, capped at MAX_PAGE_SIZE rows
+    '/api/projects': 2,
+    '/api/work_orders': 1,
+    '/api/tasks': 1,
+    '/api/subtasks': 1,
+    '/api/users': 1,
+    '/api/cartons': 1,
+    '/api/stock_logs': 1,
+    '/api/projects/PRJ001/work_orders': 1,
+    '/api/work_orders/WO0001/tasks': 1,
+    '/api/tasks/TSK00001/sub_tasks': 1,
+    '/api/tasks/by_user/USR002': 1,
+    # User, user type and the grouped counts (cache disabled below)
+    '/api/dashboard': 3,
+}
+
+
+def run():
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'ITEM_HOLD_SWEEP_INTERVAL': 0,
+        'DASHBOARD_CACHE_TTL': 0,
+    })
+
+    with app.app_context():
+        counts = seed_project_data()
+        token = create_access_token(identity='USR001')
+        engine = db.engine
+
+    print(f"Seeded {', '.join(f'{n} {name}' for name, n in counts.items())}")
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    failures = 0
+    for url, budget in QUERY_BUDGETS.items():
+        statements.clear()
+        response = client.get(url, headers=headers)
+        used = len(statements)
+        ok = response.status_code == 200 and used <= budget
+        note = ''
+        body = response.get_json(silent=True)
+        if isinstance(body, list):
+            # Unpaged bare array: bounded, and truncation is signalled
+            truncated = 'X-Next-Cursor' in response.headers
+            ok = ok and len(body) <= MAX_PAGE_SIZE and (truncated or len(body) < MAX_PAGE_SIZE)
+            note = f", {len(body)} rows{' + X-Next-Cursor' if truncated else ''}"
+        failures += 0 if ok else 1
+        print(f"{'✓' if ok else '✗'} {url}: {used} queries (budget {budget}), status {response.status_code}{note}")
+        if not ok and used > budget:
+            for statement in statements[:5]:
+                print(f"    {' '.join(statement.split())[:160]}")
+
+    event.remove(engine, 'before_cursor_execute', count_statement)
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run() else 0)
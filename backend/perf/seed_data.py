@@ -0,0 +1,181 @@
+"""
+Synthetic data for performance checks - bulk inserts projects, work orders, tasks, subtasks,
+lots, cartons, split item trees and stock/process log histories
+"""
+
+import json
+import random
+from models import (User, Project, WorkOrder, Task, SubTask, Lot, Carton, Item, StockLog, ProcessLog,
+                    LogType, ProcessStateType)
+from __init__ import db
+
+# Preset sizes for seed_benchmark_data
+SCALES = {
+    'small': {'projects': 10, 'tasks_per_work_order': 10, 'lots': 50, 'cartons_per_lot': 4, 'items_per_carton': 25},
+    'medium': {'projects': 40, 'tasks_per_work_order': 25, 'lots': 500, 'cartons_per_lot': 5, 'items_per_carton': 40},
+    'large': {'projects': 100, 'tasks_per_work_order': 40, 'lots': 2000, 'cartons_per_lot': 5, 'items_per_carton': 30},
+}
+INSERT_CHUNK = 5000
+
+
+def seed_project_data(users=20, projects=20, lots_per_project=5, work_orders_per_project=5,
+                      tasks_per_work_order=20, subtasks_per_task=1):
+    """
+    Insert a project hierarchy with every row pointing at a state and an assignee.
+    Must run inside an app context on a database created by create_app.
+
+    Returns:
+        dict: Number of rows inserted per model
+    """
+    states = {}
+    for state in ProcessStateType.query.all():
+        states.setdefault(state.state_type, []).append(state.id)
+
+    user_ids = ['USR001']
+    for n in range(2, users + 1):
+        user_ids.append(f'USR{n:03d}')
+        db.session.add(User(id=user_ids[-1], user_type_id='UT002', username=f'perf_user_{n}',
+                            password_hash='!', is_active=True))
+
+    counts = {'users': users, 'projects': 0, 'lots': 0, 'work_orders': 0, 'tasks': 0, 'subtasks': 0}
+    for p in range(1, projects + 1):
+        project_id = f'PRJ{p:03d}'
+        db.session.add(Project(id=project_id, project_name=f'Project {p}', state_id=states['project'][p % 3],
+                               person_in_charge_id=user_ids[p % users], priority='medium',
+                               work_order_ids='[]', process_log_ids='[]'))
+        counts['projects'] += 1
+
+        lot_ids = []
+        for _ in range(lots_per_project):
+            counts['lots'] += 1
+            lot_ids.append(f"LOT{counts['lots']:04d}")
+            db.session.add(Lot(id=lot_ids[-1], material_type_id='MT001', factory_lot_number=f"F-{counts['lots']}",
+                               carton_ids='[]', log_ids='[]', created_user_id='USR001', project_id=project_id))
+
+        for w in range(work_orders_per_project):
+            counts['work_orders'] += 1
+            work_order_id = f"WO{counts['work_orders']:04d}"
+            db.session.add(WorkOrder(id=work_order_id, work_order_name=f"Work order {counts['work_orders']}",
+                                     state_id=states['work_order'][w % 3], assignee_id=user_ids[w % users],
+                                     workflow_type_id='WT001', parent_project_id=project_id,
+                                     lot_id=lot_ids[w % len(lot_ids)] if lot_ids else None,
+                                     task_ids='[]', process_log_ids='[]'))
+
+            for t in range(tasks_per_work_order):
+                counts['tasks'] += 1
+                task_id = f"TSK{counts['tasks']:05d}"
+                db.session.add(Task(id=task_id, task_name=f"Task {counts['tasks']}",
+                                    state_id=states['task'][t % len(states['task'])],
+                                    assignee_id=user_ids[counts['tasks'] % users],
+                                    work_order_id=work_order_id, subtask_ids='[]'))
+
+                for s in range(subtasks_per_task):
+                    counts['subtasks'] += 1
+                    db.session.add(SubTask(id=f"SUB{counts['subtasks']:06d}",
+                                           subtask_name=f"Subtask {counts['subtasks']}",
+                                           state_id=states['subtask'][s % len(states['subtask'])],
+                                           assignee_id=user_ids[counts['subtasks'] % users], task_id=task_id))
+
+    db.session.commit()
+    return counts
+
+
+def _insert(model, rows):
+    """Bulk insert plain dict rows in chunks"""
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(model.__table__.insert(), rows[start:start + INSERT_CHUNK])
+
+
+def seed_inventory_data(lots=50, cartons_per_lot=4, items_per_carton=25, split_ratio=0.3, max_split_depth=3,
+                        logs_per_item=2, process_logs_per_task=5, seed=42):
+    """
+    Insert lots with cartons and item trees. A share of the items is split into assigned or used
+    children, up to max_split_depth levels deep, the way task assignment splits cable rolls.
+    Lots are spread over the existing projects and assigned children over the existing tasks.
+    Must run after seed_project_data on a fresh database.
+
+    Returns:
+        dict: Number of rows inserted per model
+    """
+    rng = random.Random(seed)
+    project_ids = [p.id for p in Project.query.with_entities(Project.id).order_by(Project.id)]
+    task_ids = [t.id for t in Task.query.with_entities(Task.id).order_by(Task.id)]
+    material_type_ids = ['MT001', 'MT002', 'MT003']
+
+    lot_rows, carton_rows, item_rows, log_rows = [], [], [], []
+
+    def add_logs(item_id, lot_id, carton_id, task_id=None):
+        log_ids = []
+        for _ in range(logs_per_item):
+            log_ids.append(f'SL{len(log_rows) + 1:08d}')
+            log_rows.append({'id': log_ids[-1], 'user_id': 'USR001', 'description': f'CREATE Item {item_id}',
+                             'task_id': task_id, 'item_id': item_id, 'lot_id': lot_id, 'carton_id': carton_id})
+        return json.dumps(log_ids)
+
+    def add_item(material_type_id, quantity, status, parent_id, lot_id, carton_id, depth):
+        item_id = f'ITM{len(item_rows) + 1:06d}'
+        row = {'id': item_id, 'material_type_id': material_type_id, 'quantity': quantity, 'status': status,
+               'parent_id': parent_id, 'lot_id': lot_id, 'carton_id': carton_id, 'label_count': 0}
+        item_rows.append(row)
+
+        task_id = None
+        if status != 'available' and task_ids:
+            task_id = rng.choice(task_ids)
+        row['task_ids'] = json.dumps([task_id] if task_id else [])
+        row['log_ids'] = add_logs(item_id, lot_id, carton_id, task_id)
+
+        # Split part of the roll into a child, which may be split again
+        child_ids = []
+        while depth < max_split_depth and quantity > 2 and rng.random() < split_ratio:
+            child_quantity = round(rng.uniform(1, quantity / 2), 1)
+            quantity = round(quantity - child_quantity, 1)
+            child_status = rng.choice(('assigned', 'used', 'available'))
+            child_ids.append(add_item(material_type_id, child_quantity, child_status, item_id, lot_id, carton_id,
+                                      depth + 1))
+        row['quantity'] = quantity
+        row['child_item_ids'] = json.dumps(child_ids)
+        return item_id
+
+    for n in range(1, lots + 1):
+        lot_id = f'LOT{n:04d}'
+        material_type_id = material_type_ids[n % len(material_type_ids)]
+        carton_ids = []
+        for _ in range(cartons_per_lot):
+            carton_id = f'CTN{len(carton_rows) + 1:05d}'
+            carton_ids.append(carton_id)
+            top_item_ids = [add_item(material_type_id, rng.choice((100.0, 200.0, 305.0)), 'available', carton_id,
+                                     lot_id, carton_id, 0)
+                            for _ in range(items_per_carton)]
+            carton_rows.append({'id': carton_id, 'parent_lot_id': lot_id, 'material_type_id': material_type_id,
+                                'item_ids': json.dumps(top_item_ids), 'log_ids': '[]'})
+        lot_rows.append({'id': lot_id, 'material_type_id': material_type_id, 'factory_lot_number': f'F-{n}',
+                         'carton_ids': json.dumps(carton_ids), 'log_ids': '[]', 'created_user_id': 'USR001',
+                         'project_id': project_ids[n % len(project_ids)] if project_ids else None})
+
+    if not LogType.query.get('LT002'):
+        db.session.add(LogType(id='LT002', type='UPDATE', description='Update'))
+    process_log_rows = [
+        {'id': f'PL{n:08d}', 'log_type_id': 'LT002', 'user_id': 'USR001', 'task_id': task_id,
+         'description': f'Updated task {task_id}'}
+        for n, task_id in enumerate((t for t in task_ids for _ in range(process_logs_per_task)), 1)
+    ]
+
+    _insert(Lot, lot_rows)
+    _insert(Carton, carton_rows)
+    _insert(Item, item_rows)
+    _insert(StockLog, log_rows)
+    _insert(ProcessLog, process_log_rows)
+    db.session.commit()
+    return {'lots': len(lot_rows), 'cartons': len(carton_rows), 'items': len(item_rows),
+            'stock_logs': len(log_rows), 'process_logs': len(process_log_rows)}
+
+
+def seed_benchmark_data(scale='small'):
+    """Seed a full dataset of one of the SCALES presets. Returns the row counts per model."""
+    preset = SCALES[scale]
+    counts = seed_project_data(projects=preset['projects'], lots_per_project=0,
+                               tasks_per_work_order=preset['tasks_per_work_order'])
+    counts.pop('lots')
+    counts.update(seed_inventory_data(lots=preset['lots'], cartons_per_lot=preset['cartons_per_lot'],
+                                      items_per_carton=preset['items_per_carton']))
+    return counts
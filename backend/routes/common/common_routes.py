@@ -6,13 +6,22 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from models import UserType, User, MaterialType, WorkflowType, LogType
 from utils.db_utils import generate_id
+from utils.list_query import paginate, list_response, ListQueryError
+from utils.http_cache import conditional_cache
 from __init__ import db
 
 common_bp = Blueprint('common', __name__)
 
+USER_LIST_FILTERS = {
+    'user_type_id': (User.user_type_id, 'in'),
+    'is_active': (User.is_active, 'eq'),
+}
+USER_LIST_SORTS = {'username': User.username, 'created_at': User.created_at, 'last_login': User.last_login}
+
 # User Types endpoints
 @common_bp.route('/user_types', methods=['GET', 'POST'])
 @jwt_required()
+@conditional_cache(('user_types',))
 def user_types():
     if request.method == 'GET':
         user_types = UserType.query.all()
@@ -84,8 +93,12 @@ def get_user_type_by_id(user_type_id):
 @common_bp.route('/users', methods=['GET'])
 @jwt_required()
 def get_users():
-    users = User.query.all()
-    return jsonify([{
+    try:
+        users, page = paginate(User.query, User, request.args, filters=USER_LIST_FILTERS, sorts=USER_LIST_SORTS,
+                               legacy_array=True)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response([{
         'id': u.id,
         'username': u.username,
         'user_type_id': u.user_type_id,
@@ -94,7 +107,7 @@ def get_users():
         'email': u.email,
         'last_login': u.last_login.isoformat() if u.last_login else None
 
-    } for u in users])
+    } for u in users], page)
 
 @common_bp.route('/users/<string:user_id>', methods=['GET', 'PUT', 'DELETE'])
 @jwt_required()
@@ -129,6 +142,7 @@ def user_detail(user_id):
 # Material Types endpoints
 @common_bp.route('/material_types', methods=['GET', 'POST'])
 @jwt_required()
+@conditional_cache(('material_types',))
 def material_types():
     if request.method == 'GET':
         materials = MaterialType.query.all()
@@ -7,12 +7,14 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 import json
 from models import CardMenu, User, UserType
 from utils.db_utils import generate_id
+from utils.http_cache import conditional_cache
 from __init__ import db
 
 menu_bp = Blueprint('menu', __name__)
 
 @menu_bp.route('/card-menus', methods=['GET'])
 @jwt_required()
+@conditional_cache(('users', 'user_types', 'card_menus'), per_user=True)
 def get_card_menus():
     """Get card menus filtered by user type"""
     try:
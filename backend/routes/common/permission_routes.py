@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from utils.auth_middleware import require_permission, get_user_permissions
+from utils.http_cache import conditional_cache
 from models import Permission, UserTypePermission, User, UserType, PermissionAudit
 from __init__ import db
 
@@ -57,6 +58,7 @@ def assign_permissions(user_type_id):
 
 @permission_bp.route('/auth/permissions', methods=['GET'])
 @jwt_required()
+@conditional_cache(('users', 'user_types', 'permissions', 'user_type_permissions'), per_user=True)
 def get_current_user_permissions():
     """Get current user's permissions"""
     current_user_id = get_jwt_identity()
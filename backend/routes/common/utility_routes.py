@@ -1,10 +1,14 @@
 """
-Utility routes - Dashboard, Search, Sample Data, Error Handlers
+Utility routes - Dashboard, Search, Batch, Sample Data, Error Handlers
 """
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, Project, WorkOrder, Task, Item, MaterialType
+from models import User
+from utils.dashboard_stats import get_dashboard_stats
+from utils.list_query import list_envelope
+from utils.search_index import search as search_entities, SearchQueryError
+from utils.batch import parse_batch, run_batch, BatchRequestError
 
 utility_bp = Blueprint('utility', __name__)
 
@@ -15,19 +19,12 @@ def dashboard():
     current_user_id = get_jwt_identity()
     user = User.query.get(current_user_id)
 
-    stats = {
-        'total_projects': Project.query.count(),
-        'total_work_orders': WorkOrder.query.count(),
-        'total_tasks': Task.query.count(),
-        'total_items': Item.query.count(),
-        'available_items': Item.query.filter_by(status='available').count(),
-        'assigned_items': Item.query.filter_by(status='assigned').count(),
-        'used_items': Item.query.filter_by(status='used').count(),
-        'user_info': {
-            'id': user.id,
-            'username': user.username,
-            'user_type': user.user_type.type if user.user_type else None
-        }
+    # Counts and breakdowns come from one grouped query, cached between writes
+    stats = dict(get_dashboard_stats())
+    stats['user_info'] = {
+        'id': user.id,
+        'username': user.username,
+        'user_type': user.user_type.type if user.user_type else None
     }
 
     return jsonify(stats)
@@ -35,39 +32,22 @@ def dashboard():
 @utility_bp.route('/search', methods=['GET'])
 @jwt_required()
 def search():
-    """Search across all entities"""
-    query = request.args.get('q', '')
-    entity_type = request.args.get('type', 'all')
+    """Search across all entities, ranked by relevance, paginated with limit and cursor"""
+    try:
+        results, page = search_entities(request.args)
+    except SearchQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(list_envelope(results, page))
 
-    results = {}
-
-    if entity_type in ['all', 'projects']:
-        projects = Project.query.filter(Project.project_name.contains(query)).limit(10).all()
-        results['projects'] = [{
-            'id': p.id,
-            'name': p.project_name,
-            'type': 'project'
-        } for p in projects]
-
-    if entity_type in ['all', 'items']:
-        items = Item.query.join(MaterialType).filter(MaterialType.material_name.contains(query)).limit(10).all()
-        results['items'] = [{
-            'id': i.id,
-            'name': f"{i.material_type.material_name} ({i.quantity} {i.material_type.material_unit})",
-            'type': 'item',
-            'status': i.status
-        } for i in items]
-
-    if entity_type in ['all', 'users']:
-        users = User.query.filter(User.username.contains(query)).limit(10).all()
-        results['users'] = [{
-            'id': u.id,
-            'name': u.username,
-            'type': 'user',
-            'user_type': u.user_type.type if u.user_type else None
-        } for u in users]
-
-    return jsonify(results)
+@utility_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    """Run several GET requests in one round trip and return their responses in request order"""
+    try:
+        sub_requests = parse_batch(request.get_json(silent=True))
+    except BatchRequestError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'responses': run_batch(sub_requests)})
 
 
 # Error handlers
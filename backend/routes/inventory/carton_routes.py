@@ -4,32 +4,45 @@ Carton management routes
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Carton, MaterialType
+from models import Carton, Item
 from utils.db_utils import generate_id
-from utils.item_utils import get_item_with_children_recursive
+from utils.item_utils import get_item_with_children_recursive, get_item_summaries
+from utils.list_query import paginate, list_response, ListQueryError
+from utils.reference_cache import get_material_type
+from utils.serializers import stock_summary, stock_totals, parse_include
 from utils.stock_logger import StockLogger
 from __init__ import db
 import json
 
 carton_bp = Blueprint('carton', __name__)
 
+CARTON_LIST_FILTERS = {
+    'parent_lot_id': (Carton.parent_lot_id, 'eq'),
+    'material_type_id': (Carton.material_type_id, 'eq'),
+}
+CARTON_LIST_SORTS = {'created_at': Carton.created_at}
+
 @carton_bp.route('/cartons', methods=['GET', 'POST'])
 @jwt_required()
 def cartons():
     """
-    GET: Retrieve all cartons
+    GET: Retrieve a page of cartons (filters: parent_lot_id, material_type_id; sorts: id, created_at)
     POST: Create a new carton
     """
     if request.method == 'GET':
-        cartons = Carton.query.all()
-        return jsonify([{
+        try:
+            cartons, page = paginate(Carton.query, Carton, request.args,
+                                     filters=CARTON_LIST_FILTERS, sorts=CARTON_LIST_SORTS, legacy_array=True)
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        return list_response([{
             'id': c.id,
             'parent_lot_id': c.parent_lot_id,
             'material_type_id': c.material_type_id,
             'item_ids': c.item_ids,
             'log_ids': c.log_ids,
             'created_at': c.created_at.isoformat()
-        } for c in cartons])
+        } for c in cartons], page)
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -89,8 +102,8 @@ def carton_detail(carton_id):
             'created_at': carton.created_at.isoformat(),
             'material_type': {
                 'id': carton.material_type_id,
-                'name': MaterialType.query.get(carton.material_type_id).material_name if carton.material_type_id else None,
-                'unit': MaterialType.query.get(carton.material_type_id).material_unit if carton.material_type_id else None
+                'name': get_material_type(carton.material_type_id).material_name if carton.material_type_id else None,
+                'unit': get_material_type(carton.material_type_id).material_unit if carton.material_type_id else None
             }
         })
 
@@ -222,8 +235,14 @@ def cartons_by_lot(lot_id):
     """
     Get all cartons for a specific lot
     Includes detailed information about each carton including item counts and quantities
-    Uses recursive item retrieval to include child items
+    Query parameters: include (none, ids or full, the default) controls how the items of each
+    carton are embedded in all_items; with none or ids the counts come from one aggregate query
     """
+    try:
+        include = parse_include(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
         from models import Lot
 
@@ -234,6 +253,9 @@ def cartons_by_lot(lot_id):
 
         # Get all cartons for this lot
         cartons = Carton.query.filter_by(parent_lot_id=lot_id).all()
+        if include != 'full':
+            summaries, carton_item_ids = get_item_summaries(Item.carton_id, Item.lot_id == lot_id,
+                                                            with_ids=include == 'ids')
 
         result = []
         for carton in cartons:
@@ -243,24 +265,14 @@ def cartons_by_lot(lot_id):
             except json.JSONDecodeError:
                 item_ids = []
 
-            # Get all items in this carton (including children) using recursive function
-            all_items_with_children = []
-            for item_id in item_ids:
-                # Get the item and all its children recursively
-                item_tree = get_item_with_children_recursive(item_id)
-                all_items_with_children.extend(item_tree)
-
-            # Calculate item statistics including all child items
-            total_items = len(all_items_with_children)
-            available_items = len([item for item in all_items_with_children if item['status'] == 'available'])
-            used_items = len([item for item in all_items_with_children if item['status'] == 'used'])
-            assigned_items = len([item for item in all_items_with_children if item['status'] == 'assigned'])
-
-            # Calculate quantity statistics including all child items
-            total_quantity = sum(item['quantity'] for item in all_items_with_children)
-            available_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'available')
-            used_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'used')
-            assigned_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'assigned')
+            if include == 'full':
+                # Get all items in this carton (including children) using recursive function
+                all_items_with_children = []
+                for item_id in item_ids:
+                    all_items_with_children.extend(get_item_with_children_recursive(item_id))
+                summary = stock_summary(all_items_with_children)
+            else:
+                summary = summaries.get(carton.id) or stock_totals({}, {})
 
             # Parse log IDs from JSON string
             try:
@@ -268,24 +280,23 @@ def cartons_by_lot(lot_id):
             except json.JSONDecodeError:
                 log_ids = []
 
-            result.append({
+            data = {
                 'id': carton.id,
                 'parent_lot_id': carton.parent_lot_id,
                 'material_type_id': carton.material_type_id,
-                'total_items': total_items,
-                'available_items': available_items,
-                'used_items': used_items,
-                'assigned_items': assigned_items,
-                'total_quantity': float(total_quantity),
-                'available_quantity': float(available_quantity),
-                'used_quantity': float(used_quantity),
-                'assigned_quantity': float(assigned_quantity),
+            }
+            data.update(summary)
+            data.update({
                 'item_ids': item_ids,
-                'all_items': all_items_with_children,  # Include all items with their children
                 'log_ids': log_ids,
                 'log_count': len(log_ids),
-                'created_at': carton.created_at.isoformat()
+                'created_at': carton.created_at
             })
+            if include == 'full':
+                data['all_items'] = all_items_with_children
+            elif include == 'ids':
+                data['all_items'] = carton_item_ids.get(carton.id, [])
+            result.append(data)
 
         return jsonify({
             'lot': {
@@ -4,73 +4,68 @@ Item routes - Handle all item-related operations
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Item, Carton
+from sqlalchemy import select, literal, exists, func, or_
+from models import Item, Lot
 from utils.db_utils import generate_id
-from utils.item_utils import get_item_with_children_recursive
+from utils.item_utils import get_item_with_children_recursive, get_parent_location
+from utils.list_query import paginate, list_envelope, ListQueryError
+from utils.serializers import item_dict, item_location_dict
+from utils.streaming import stream_format, stream_response, StreamFormatError, STREAM_BATCH_SIZE
 from utils.stock_logger import StockLogger
 from __init__ import db
 from utils.auth_middleware import require_permission
 
 item_bp = Blueprint('item', __name__)
 
+ITEM_LIST_FILTERS = {
+    'status': (Item.status, 'eq'),
+    'material_type_id': (Item.material_type_id, 'eq'),
+    'lot_id': (Item.lot_id, 'eq'),
+    'carton_id': (Item.carton_id, 'eq'),
+    'task_id': (Item.task_ids, 'json_contains'),
+    'created_from': (Item.created_at, 'ge'),
+    'created_to': (Item.created_at, 'le'),
+}
+ITEM_LIST_SORTS = {'created_at': Item.created_at, 'quantity': Item.quantity}
+ITEM_LIST_FIELDS = ('id', 'material_type_id', 'quantity', 'status', 'parent_id', 'parent_type', 'lot_id',
+                    'carton_id', 'child_item_ids', 'log_ids', 'task_ids', 'created_at')
+
 # Items endpoints
 @item_bp.route('/items', methods=['GET', 'POST'])
 @jwt_required()
 @require_permission('items.read')
 def items():
     """
-    GET: Retrieve all items with parent type and lot information
+    GET: Retrieve a page of items with parent type and lot information
+         Query parameters:
+           limit (default 50, max 500), cursor (next_cursor of the previous page),
+           sort (id, created_at, quantity; prefix '-' for descending),
+           status, material_type_id, lot_id, carton_id, task_id, created_from, created_to (ISO dates),
+           fields (comma separated subset of the item fields), include_total (true/false)
+         Returns: {"items": [...], "next_cursor": str or null, "limit": int, "total": int (if requested)}
     POST: Create a new item
     """
     if request.method == 'GET':
-        items = Item.query.all()
+        args = request.args
+
+        fields = [f for f in args.get('fields', '').split(',') if f]
+        unknown_fields = [f for f in fields if f not in ITEM_LIST_FIELDS]
+        if unknown_fields:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown_fields)}"}), 400
+        if fields and 'id' not in fields:
+            fields.insert(0, 'id')
+
+        try:
+            page_items, page = paginate(Item.query, Item, args, filters=ITEM_LIST_FILTERS, sorts=ITEM_LIST_SORTS)
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+
         result = []
+        for i in page_items:
+            item_data = item_location_dict(i)
+            result.append({f: item_data[f] for f in fields} if fields else item_data)
 
-        for i in items:
-            item_data = {
-                'id': i.id,
-                'material_type_id': i.material_type_id,
-                'quantity': i.quantity,
-                'status': i.status,
-                'parent_id': i.parent_id,
-                'parent_type': None,
-                'lot_id': None,
-                'child_item_ids': i.child_item_ids,
-                'log_ids': i.log_ids,
-                'task_ids': i.task_ids,
-                'created_at': i.created_at.isoformat()
-            }
-
-            # Determine parent type and find lot_id if parent_id exists
-            if i.parent_id:
-                # Check if parent_id is a carton
-                carton = Carton.query.get(i.parent_id)
-                if carton:
-                    item_data['parent_type'] = 'carton'
-                    item_data['lot_id'] = carton.parent_lot_id
-                else:
-                    # Check if parent_id is an item
-                    parent_item = Item.query.get(i.parent_id)
-                    if parent_item:
-                        item_data['parent_type'] = 'item'
-                        # Recursively find the lot_id by tracing up the parent chain
-                        current_parent_id = parent_item.parent_id
-                        while current_parent_id:
-                            # Check if current parent is a carton
-                            parent_carton = Carton.query.get(current_parent_id)
-                            if parent_carton:
-                                item_data['lot_id'] = parent_carton.parent_lot_id
-                                break
-                            # Otherwise check if it's another item
-                            parent_item = Item.query.get(current_parent_id)
-                            if parent_item:
-                                current_parent_id = parent_item.parent_id
-                            else:
-                                break
-
-            result.append(item_data)
-
-        return jsonify(result)
+        return jsonify(list_envelope(result, page))
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -82,6 +77,7 @@ def items():
             return jsonify({'error': 'quantity is required'}), 400
 
         item_id = generate_id('ITM', Item)
+        lot_id, carton_id = get_parent_location(data.get('parent_id'))
 
         item = Item(
             id=item_id,
@@ -89,6 +85,8 @@ def items():
             quantity=data['quantity'],
             status=data.get('status', 'available'),
             parent_id=data.get('parent_id'),
+            lot_id=lot_id,
+            carton_id=carton_id,
             child_item_ids=data.get('child_item_ids', '[]'),
             log_ids=data.get('log_ids', '[]'),
             task_ids=data.get('task_ids', '[]')
@@ -131,24 +129,12 @@ def item_detail(item_id):
         # The first item in the tree is the main item
         main_item = item_tree[0]
 
-        # Try to get factory lot number by tracing up the parent chain
-        factory_lot_number = None
-        parent_id = main_item.get('parent_id')
-        from models import Carton, Lot
-        while parent_id:
-            carton = Carton.query.get(parent_id)
-            if carton:
-                lot = Lot.query.get(carton.parent_lot_id)
-                if lot:
-                    factory_lot_number = lot.factory_lot_number
-                break
-            parent_item = Item.query.get(parent_id)
-            if parent_item:
-                parent_id = parent_item.parent_id
-            else:
-                break
+        lot = Lot.query.get(item.lot_id) if item.lot_id else None
+        factory_lot_number = lot.factory_lot_number if lot else None
 
         response = dict(main_item)
+        response['lot_id'] = item.lot_id
+        response['carton_id'] = item.carton_id
         response['factory_lot_number'] = factory_lot_number
         response['label_count'] = item.label_count
         response['material_type_name'] = item.material_type.material_name if item.material_type else None
@@ -199,6 +185,15 @@ def item_detail(item_id):
         item.material_type_id = new_data['material_type_id']
         item.quantity = new_data['quantity']
         item.status = new_data['status']
+        if new_data['parent_id'] != item.parent_id:
+            # Moving an item moves its whole subtree to the new parent's lot
+            new_lot_id, new_carton_id = get_parent_location(new_data['parent_id'])
+            descendant_ids = [child['id'] for child in get_item_with_children_recursive(item.id)[1:]]
+            if descendant_ids:
+                Item.query.filter(Item.id.in_(descendant_ids)).update(
+                    {Item.lot_id: new_lot_id, Item.carton_id: new_carton_id}, synchronize_session=False)
+            item.lot_id = new_lot_id
+            item.carton_id = new_carton_id
         item.parent_id = new_data['parent_id']
         item.child_item_ids = new_data['child_item_ids']
         item.log_ids = new_data['log_ids']
@@ -295,90 +290,61 @@ def get_items_under_carton(carton_id):
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve items under carton', 'details': str(e)}), 500
 
+def _lot_items_statement(lot_id):
+    """
+    Items of a lot with their depth below the carton, ordered by carton, depth and ID.
+    Depths come from a recursive query over parent_id within the lot, so rows can be streamed
+    without loading the whole lot first.
+    """
+    parent = db.aliased(Item)
+    levels = select(Item.id, literal(0).label('level')).where(
+        Item.lot_id == lot_id,
+        or_(Item.parent_id.is_(None), Item.parent_id == Item.id,
+            ~exists().where(parent.id == Item.parent_id, parent.lot_id == lot_id))
+    ).cte('levels', recursive=True)
+    levels = levels.union_all(
+        select(Item.id, levels.c.level + 1)
+        .join(levels, Item.parent_id == levels.c.id)
+        .where(Item.lot_id == lot_id, Item.id != Item.parent_id)
+    )
+    # Items in a parent_id cycle are not reached from a root; list them at level 0
+    level = func.coalesce(levels.c.level, 0).label('level')
+    return (
+        select(Item.id, Item.material_type_id, Item.quantity, Item.status, Item.parent_id, Item.child_item_ids,
+               Item.log_ids, Item.task_ids, Item.created_at, Item.carton_id, level)
+        .outerjoin(levels, levels.c.id == Item.id)
+        .where(Item.lot_id == lot_id)
+        .order_by(func.coalesce(Item.carton_id, ''), level, Item.id)
+    )
+
+
 @item_bp.route('/lots/<string:lot_id>/items', methods=['GET'])
 @jwt_required()
 @require_permission('items.read')
 def get_items_under_lot(lot_id):
     """
     GET: Retrieve all items under a specific lot, including nested child items
-    This finds all cartons under the lot first, then gets all items under those cartons
+    Items are selected by their denormalized lot_id, so no carton or parent chain walk is needed
+    Query parameters: stream (json or ndjson) to stream the items as they are read
     """
     try:
-        # First, get all cartons under the lot
-        cartons = Carton.query.filter_by(parent_lot_id=lot_id).all()
-
-        if not cartons:
-            return jsonify([])
-
-        # Function to recursively get all child items
-        def get_all_child_items(item, level=0):
-            result = [{
-                'id': item.id,
-                'material_type_id': item.material_type_id,
-                'quantity': item.quantity,
-                'status': item.status,
-                'parent_id': item.parent_id,
-                'child_item_ids': item.child_item_ids,
-                'log_ids': item.log_ids,
-                'task_ids': item.task_ids,
-                'created_at': item.created_at.isoformat(),
-                'level': level
-            }]
-
-            # Parse child_item_ids and get child items recursively
-            if item.child_item_ids and item.child_item_ids != '[]':
-                try:
-                    import json
-                    child_ids = json.loads(item.child_item_ids)
-                    for child_id in child_ids:
-                        child_item = Item.query.get(child_id)
-                        if child_item:
-                            # Get child items recursively with incremented level
-                            child_results = get_all_child_items(child_item, level + 1)
-                            result.extend(child_results)
-                except (json.JSONDecodeError, TypeError):
-                    # If child_item_ids is not valid JSON, skip it
-                    pass
-
-            return result
-
-        # Collect all items from all cartons under the lot
-        all_items = []
-        for carton in cartons:
-            # Get all direct items under each carton
-            direct_items = Item.query.filter_by(parent_id=carton.id).all()
-
-            # For each direct item, get it and all its nested children
-            for item in direct_items:
-                all_items.extend(get_all_child_items(item))
-
-        # Add carton information to each item for better context
-        for item_data in all_items:
-            # Find which carton this item belongs to (directly or through parent chain)
-            current_parent_id = item_data['parent_id']
-            carton_id = None
-
-            # Trace up the parent chain to find the carton
-            while current_parent_id:
-                # Check if current parent is a carton
-                carton = next((c for c in cartons if c.id == current_parent_id), None)
-                if carton:
-                    carton_id = carton.id
-                    break
-                # Otherwise check if it's an item and continue up the chain
-                parent_item = Item.query.get(current_parent_id)
-                if parent_item:
-                    current_parent_id = parent_item.parent_id
-                else:
-                    break
-
-            item_data['carton_id'] = carton_id
-            item_data['lot_id'] = lot_id
-
-        # Sort by carton, then by level, then by ID for clear hierarchy
-        all_items.sort(key=lambda x: (x.get('carton_id', ''), x['level'], x['id']))
-
-        return jsonify(all_items)
+        fmt = stream_format()
+    except StreamFormatError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def lot_items():
+        rows = db.session.execute(_lot_items_statement(lot_id).execution_options(yield_per=STREAM_BATCH_SIZE))
+        try:
+            for row in rows:
+                yield dict(item_dict(row), level=row.level, carton_id=row.carton_id, lot_id=lot_id)
+        finally:
+            rows.close()
+
+    if fmt:
+        return stream_response(lot_items(), fmt)
+
+    try:
+        return jsonify(list(lot_items()))
 
     except Exception as e:
         return jsonify({'error': 'Failed to retrieve items under lot', 'details': str(e)}), 500
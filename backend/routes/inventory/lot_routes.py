@@ -6,7 +6,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Lot, Item, MaterialType, Carton, StockLog
 from utils.db_utils import generate_id
-from utils.item_utils import get_item_with_children_recursive
+from utils.item_utils import get_lot_items, get_item_summaries
+from utils.reference_cache import get_material_type
+from utils.serializers import lot_dict, stock_summary, stock_totals, parse_include
+from utils.streaming import stream_format, stream_response, STREAM_BATCH_SIZE
 from utils.stock_logger import StockLogger
 from utils.process_logger import ProcessLogger
 from __init__ import db
@@ -14,64 +17,65 @@ import json
 
 lot_bp = Blueprint('lot', __name__)
 
+
+def _lot_items_loader(include, *criteria):
+    """
+    Build the function that loads the stock totals and embedded items of a lot.
+
+    Args:
+        include (str): 'full' walks each lot's cartons and embeds every item dictionary;
+                       'ids' and 'none' read the totals of all matching lots from one aggregate
+                       query, embedding item IDs or nothing
+        *criteria: Filters on Item selecting the lots' items, for the aggregate query
+
+    Returns:
+        function: (lot, carton_ids) -> (stock totals, embedded items or None)
+    """
+    if include == 'full':
+        def load(lot, carton_ids):
+            # All items in this lot, including children
+            items = get_lot_items(carton_ids)
+            return stock_summary(items), items
+        return load
+
+    summaries, item_ids = get_item_summaries(Item.lot_id, *criteria, with_ids=include == 'ids')
+
+    def load(lot, carton_ids):
+        summary = summaries.get(lot.id) or stock_totals({}, {})
+        return summary, (item_ids.get(lot.id, []) if item_ids is not None else None)
+    return load
+
+
 # Lots endpoints
 @lot_bp.route('/lots', methods=['GET', 'POST'])
 @jwt_required()
 def lots():
     if request.method == 'GET':
-        lots = Lot.query.join(MaterialType, Lot.material_type_id == MaterialType.id).all()
-        result = []
-
-        for l in lots:
-            # Get carton count
-            carton_ids = json.loads(l.carton_ids) if l.carton_ids else []
-            carton_count = len(carton_ids)
-
-            # Get all items in this lot (including children) using recursive function
-            all_items_with_children = []
-            for carton_id in carton_ids:
-                # Get items directly in this carton
-                carton_items = Item.query.filter_by(parent_id=carton_id).all()
-                for item in carton_items:
-                    # Get the item and all its children recursively
-                    item_tree = get_item_with_children_recursive(item.id)
-                    all_items_with_children.extend(item_tree)
-
-            # Calculate totals including all child items
-            total_items = len(all_items_with_children)
-            available_items = len([item for item in all_items_with_children if item['status'] == 'available'])
-            used_items = len([item for item in all_items_with_children if item['status'] == 'used'])
-            assigned_items = len([item for item in all_items_with_children if item['status'] == 'assigned'])
-
-            # Calculate quantities including all child items
-            total_quantity = sum(item['quantity'] for item in all_items_with_children)
-            available_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'available')
-            used_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'used')
-            assigned_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'assigned')
-
-            result.append({
-                'id': l.id,
-                'material_type_id': l.material_type_id,
-                'material_name': l.material_type.material_name,
-                'material_unit': l.material_type.material_unit,
-                'factory_lot_number': l.factory_lot_number,
-                'carton_count': carton_count,
-                'total_items': total_items,
-                'available_items': available_items,
-                'used_items': used_items,
-                'assigned_items': assigned_items,
-                'total_quantity': float(total_quantity),
-                'available_quantity': float(available_quantity),
-                'used_quantity': float(used_quantity),
-                'assigned_quantity': float(assigned_quantity),
-                'carton_ids': carton_ids,
-                'all_items': all_items_with_children,  # Include all items with their children
-                'log_ids': l.log_ids,
-                'created_at': l.created_at.isoformat(),
-                'created_user_id': l.created_user_id
-            })
-
-        return jsonify(result)
+        # ?stream=json|ndjson sends each lot as soon as its items are loaded;
+        # ?include=none|ids|full controls how the items are embedded in all_items
+        try:
+            fmt = stream_format()
+            include = parse_include(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        def lot_summaries():
+            load_items = _lot_items_loader(include)
+            lots = Lot.query.join(MaterialType, Lot.material_type_id == MaterialType.id)
+            for l in lots.yield_per(STREAM_BATCH_SIZE):
+                carton_ids = json.loads(l.carton_ids) if l.carton_ids else []
+                summary, items = load_items(l, carton_ids)
+
+                data = lot_dict(l, carton_ids, summary)
+                data['material_name'] = l.material_type.material_name
+                data['material_unit'] = l.material_type.material_unit
+                if items is not None:
+                    data['all_items'] = items
+                yield data
+
+        if fmt:
+            return stream_response(lot_summaries(), fmt)
+        return jsonify(list(lot_summaries()))
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -103,53 +107,15 @@ def lot_detail(lot_id):
     lot = Lot.query.options(db.joinedload(Lot.material_type)).get_or_404(lot_id)
 
     if request.method == 'GET':
-        # Get carton count
         carton_ids = json.loads(lot.carton_ids) if lot.carton_ids else []
-        carton_count = len(carton_ids)
-
-        # Get all items in this lot (including children) using recursive function
-        all_items_with_children = []
-        for carton_id in carton_ids:
-            # Get items directly in this carton
-            carton_items = Item.query.filter_by(parent_id=carton_id).all()
-            for item in carton_items:
-                # Get the item and all its children recursively
-                item_tree = get_item_with_children_recursive(item.id)
-                all_items_with_children.extend(item_tree)
-
-        # Calculate totals including all child items
-        total_items = len(all_items_with_children)
-        available_items = len([item for item in all_items_with_children if item['status'] == 'available'])
-        used_items = len([item for item in all_items_with_children if item['status'] == 'used'])
-        assigned_items = len([item for item in all_items_with_children if item['status'] == 'assigned'])
-
-        # Calculate quantities including all child items
-        total_quantity = sum(item['quantity'] for item in all_items_with_children)
-        available_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'available')
-        used_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'used')
-        assigned_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'assigned')
+        # All items in this lot, including children
+        all_items_with_children = get_lot_items(carton_ids)
 
-        return jsonify({
-            'id': lot.id,
-            'material_type_id': lot.material_type_id,
-            'material_name': lot.material_type.material_name,
-            'material_unit': lot.material_type.material_unit,
-            'factory_lot_number': lot.factory_lot_number,
-            'carton_count': carton_count,
-            'total_items': total_items,
-            'available_items': available_items,
-            'used_items': used_items,
-            'assigned_items': assigned_items,
-            'total_quantity': float(total_quantity),
-            'available_quantity': float(available_quantity),
-            'used_quantity': float(used_quantity),
-            'assigned_quantity': float(assigned_quantity),
-            'carton_ids': carton_ids,
-            'all_items': all_items_with_children,  # Include all items with their children
-            'log_ids': lot.log_ids,
-            'created_at': lot.created_at.isoformat(),
-            'created_user_id': lot.created_user_id
-        })
+        data = lot_dict(lot, carton_ids, stock_summary(all_items_with_children))
+        data['material_name'] = lot.material_type.material_name
+        data['material_unit'] = lot.material_type.material_unit
+        data['all_items'] = all_items_with_children
+        return jsonify(data)
 
     elif request.method == 'PUT':
         data = request.get_json()
@@ -195,64 +161,34 @@ def lots_by_material_type(material_type_id):
     """
     Get all lots for a specific material type
     Includes detailed information about each lot including carton and item counts
-    Uses recursive item retrieval to include child items
+    Query parameters: include (none, ids or full, the default) controls how the items of each
+    lot are embedded in all_items; with none or ids the counts come from one aggregate query
     """
+    try:
+        include = parse_include(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
         # Verify material type exists
-        material_type = MaterialType.query.get(material_type_id)
+        material_type = get_material_type(material_type_id)
         if not material_type:
             return jsonify({'error': 'Material type not found'}), 404
 
         # Get all lots for this material type
+        lot_ids = Lot.query.with_entities(Lot.id).filter_by(material_type_id=material_type_id)
         lots = Lot.query.filter_by(material_type_id=material_type_id).all()
+        load_items = _lot_items_loader(include, Item.lot_id.in_(lot_ids))
 
         result = []
         for lot in lots:
-            # Get carton count
             carton_ids = json.loads(lot.carton_ids) if lot.carton_ids else []
-            carton_count = len(carton_ids)
-
-            # Get all items in this lot (including children) using recursive function
-            all_items_with_children = []
-            for carton_id in carton_ids:
-                # Get items directly in this carton
-                carton_items = Item.query.filter_by(parent_id=carton_id).all()
-                for item in carton_items:
-                    # Get the item and all its children recursively
-                    item_tree = get_item_with_children_recursive(item.id)
-                    all_items_with_children.extend(item_tree)
-
-            # Calculate totals including all child items
-            total_items = len(all_items_with_children)
-            available_items = len([item for item in all_items_with_children if item['status'] == 'available'])
-            used_items = len([item for item in all_items_with_children if item['status'] == 'used'])
-            assigned_items = len([item for item in all_items_with_children if item['status'] == 'assigned'])
-
-            # Calculate quantities including all child items
-            total_quantity = sum(item['quantity'] for item in all_items_with_children)
-            available_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'available')
-            used_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'used')
-            assigned_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'assigned')
-
-            result.append({
-                'id': lot.id,
-                'material_type_id': lot.material_type_id,
-                'factory_lot_number': lot.factory_lot_number,
-                'carton_count': carton_count,
-                'total_items': total_items,
-                'available_items': available_items,
-                'used_items': used_items,
-                'assigned_items': assigned_items,
-                'total_quantity': float(total_quantity),
-                'available_quantity': float(available_quantity),
-                'used_quantity': float(used_quantity),
-                'assigned_quantity': float(assigned_quantity),
-                'carton_ids': carton_ids,
-                'all_items': all_items_with_children,  # Include all items with their children
-                'log_ids': lot.log_ids,
-                'created_at': lot.created_at.isoformat(),
-                'created_user_id': lot.created_user_id
-            })
+            summary, items = load_items(lot, carton_ids)
+
+            data = lot_dict(lot, carton_ids, summary)
+            if items is not None:
+                data['all_items'] = items
+            result.append(data)
 
         return jsonify({
             'material_type': {
@@ -307,6 +243,8 @@ def add_lot():
                     quantity=item_quantity,
                     status='available',
                     parent_id=carton_id,
+                    lot_id=lot_id,
+                    carton_id=carton_id,
                     child_item_ids='[]',
                     log_ids='[]',
                     task_ids='[]'
@@ -364,60 +302,24 @@ def get_unassigned_lots():
     """
     try:
         lots = Lot.query.filter(Lot.project_id.is_(None)).all()
+        # Only the counts are returned, so they come from one aggregate query
+        unassigned_ids = Lot.query.with_entities(Lot.id).filter(Lot.project_id.is_(None))
+        load_items = _lot_items_loader('none', Item.lot_id.in_(unassigned_ids))
         result = []
 
         for l in lots:
-            # Get carton count
             carton_ids = json.loads(l.carton_ids) if l.carton_ids else []
-            carton_count = len(carton_ids)
-
-            # Get all items in this lot (including children) using recursive function
-            all_items_with_children = []
-            for carton_id in carton_ids:
-                # Get items directly in this carton
-                carton_items = Item.query.filter_by(parent_id=carton_id).all()
-                for item in carton_items:
-                    # Get the item and all its children recursively
-                    item_tree = get_item_with_children_recursive(item.id)
-                    all_items_with_children.extend(item_tree)
-
-            # Calculate totals including all child items
-            total_items = len(all_items_with_children)
-            available_items = len([item for item in all_items_with_children if item['status'] == 'available'])
-            used_items = len([item for item in all_items_with_children if item['status'] == 'used'])
-            assigned_items = len([item for item in all_items_with_children if item['status'] == 'assigned'])
-
-            # Calculate quantities including all child items
-            total_quantity = sum(item['quantity'] for item in all_items_with_children)
-            available_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'available')
-            used_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'used')
-            assigned_quantity = sum(item['quantity'] for item in all_items_with_children if item['status'] == 'assigned')
-
-            result.append({
-                'id': l.id,
-                'material_type_id': l.material_type_id,
+            summary, _ = load_items(l, carton_ids)
+
+            data = lot_dict(l, carton_ids, summary)
+            data['material_name'] = l.material_type.material_name
+            data['material_unit'] = l.material_type.material_unit
+            data['material_type'] = {
+                'id': l.material_type.id,
                 'material_name': l.material_type.material_name,
-                'material_unit': l.material_type.material_unit,
-                'factory_lot_number': l.factory_lot_number,
-                'carton_count': carton_count,
-                'total_items': total_items,
-                'available_items': available_items,
-                'used_items': used_items,
-                'assigned_items': assigned_items,
-                'total_quantity': float(total_quantity),
-                'available_quantity': float(available_quantity),
-                'used_quantity': float(used_quantity),
-                'assigned_quantity': float(assigned_quantity),
-                'carton_ids': carton_ids,
-                'log_ids': l.log_ids,
-                'created_at': l.created_at.isoformat(),
-                'created_user_id': l.created_user_id,
-                'material_type': {
-                    'id': l.material_type.id,
-                    'material_name': l.material_type.material_name,
-                    'material_unit': l.material_type.material_unit
-                }
-            })
+                'material_unit': l.material_type.material_unit
+            }
+            result.append(data)
 
         return jsonify(result)
 
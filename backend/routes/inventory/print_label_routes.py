@@ -3,11 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Task, Item, MaterialType
 from __init__ import db
 import io
-import qrcode
-from barcode import Code128
-from barcode.writer import ImageWriter
-from PIL import Image, ImageDraw, ImageFont
 import base64
+import time
+from utils.metrics import LABEL_RENDER
 
 print_label_bp = Blueprint('print_label', __name__)
 
@@ -37,7 +35,15 @@ def print_item_label(item_id):
         
         db.session.commit()
         
+        # The imaging libraries are imported on first use: they are slow to load and take memory in
+        # every worker, and most workers never render a label
+        import qrcode
+        from barcode import Code128
+        from barcode.writer import ImageWriter
+        from PIL import Image, ImageDraw, ImageFont
+
         # Create PDF in memory
+        render_start = time.perf_counter()
         pdf_buffer = io.BytesIO()
         
         # Create a new image with PIL for the label
@@ -92,6 +98,7 @@ def print_item_label(item_id):
         # Save as PDF
         img.save(pdf_buffer, format='PDF', quality=95)
         pdf_buffer.seek(0)
+        LABEL_RENDER.observe(('item',), time.perf_counter() - render_start)
         
         # Return PDF file
         return send_file(
@@ -160,7 +167,14 @@ def print_all_task_items(task_id):
         
         db.session.commit()
         
+        # Imported on first use, see print_item_label
+        import qrcode
+        from barcode import Code128
+        from barcode.writer import ImageWriter
+        from PIL import Image, ImageDraw, ImageFont
+
         # Create PDF with filtered items
+        render_start = time.perf_counter()
         pdf_buffer = io.BytesIO()
         
         # Calculate dimensions for multiple labels
@@ -225,6 +239,7 @@ def print_all_task_items(task_id):
         # Save all pages as a multi-page PDF
         page_images[0].save(pdf_buffer, format='PDF', save_all=True, append_images=page_images[1:], quality=95)
         pdf_buffer.seek(0)
+        LABEL_RENDER.observe(('task',), time.perf_counter() - render_start)
         
         # Return combined PDF file
         return send_file(
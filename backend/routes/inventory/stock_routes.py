@@ -6,21 +6,38 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Item, StockLog, Carton
 from utils.db_utils import generate_id
+from utils.list_query import paginate, list_response, ListQueryError
 from __init__ import db
 
 stock_bp = Blueprint('stock', __name__)
 
+STOCK_LOG_LIST_FILTERS = {
+    'item_id': (StockLog.item_id, 'eq'),
+    'lot_id': (StockLog.lot_id, 'eq'),
+    'carton_id': (StockLog.carton_id, 'eq'),
+    'task_id': (StockLog.task_id, 'eq'),
+    'user_id': (StockLog.user_id, 'eq'),
+    'date_from': (StockLog.date, 'ge'),
+    'date_to': (StockLog.date, 'le'),
+}
+STOCK_LOG_LIST_SORTS = {'date': StockLog.date, 'created_at': StockLog.created_at}
+
 # Stock Logs endpoints
 @stock_bp.route('/stock_logs', methods=['GET', 'POST'])
 @jwt_required()
 def stock_logs():
     """
-    GET: Retrieve all stock logs
+    GET: Retrieve a page of stock logs, newest first by default
+         (filters: item_id, lot_id, carton_id, task_id, user_id, date_from, date_to; sorts: id, date, created_at)
     POST: Create a new stock log
     """
     if request.method == 'GET':
-        stock_logs = StockLog.query.all()
-        return jsonify([{
+        try:
+            stock_logs, page = paginate(StockLog.query, StockLog, request.args, filters=STOCK_LOG_LIST_FILTERS,
+                                        sorts=STOCK_LOG_LIST_SORTS, default_sort='-date', legacy_array=True)
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        return list_response([{
             'id': sl.id,
             'date': sl.date.isoformat(),
             'user_id': sl.user_id,
@@ -28,7 +45,7 @@ def stock_logs():
             'task_id': sl.task_id,
             'item_id': sl.item_id,
             'created_at': sl.created_at.isoformat()
-        } for sl in stock_logs])
+        } for sl in stock_logs], page)
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -4,10 +4,12 @@ Task Item routes - Handle item assignment to tasks
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Item, Task, Lot, MaterialType, StockLog, Project, Carton
-from utils.db_utils import generate_id
+from models import Item, Task, Lot, MaterialType, StockLog, Project
+from utils.db_utils import generate_id, json_list_contains
 from utils.stock_logger import StockLogger
 from utils.process_logger import ProcessLogger
+from utils.hold_utils import held_by_other_task, get_active_holds, hold_items, release_holds
+from utils.reference_cache import get_material_type
 from __init__ import db
 from utils.auth_middleware import require_permission
 import json
@@ -26,32 +28,23 @@ def get_task_items(task_id):
         
         # Get all items assigned to this task
         items = Item.query.filter(
-            Item.task_ids.contains(task_id)
+            json_list_contains(Item.task_ids, task_id)
         ).all()
         
+        # Load the lots of all items in one query
+        lot_ids = {item.lot_id for item in items if item.lot_id}
+        lots = {lot.id: lot for lot in Lot.query.filter(Lot.id.in_(lot_ids)).all()} if lot_ids else {}
+        
         result = []
         for item in items:
             # Get material type info
-            material_type = MaterialType.query.get(item.material_type_id)
+            material_type = get_material_type(item.material_type_id)
             
-            # Get lot info by tracing up parent chain
-            lot_info = None
-            parent_id = item.parent_id
-            while parent_id:
-                carton = Carton.query.get(parent_id)
-                if carton:
-                    lot = Lot.query.get(carton.parent_lot_id)
-                    if lot:
-                        lot_info = {
-                            'id': lot.id,
-                            'factory_lot_number': lot.factory_lot_number
-                        }
-                    break
-                parent_item = Item.query.get(parent_id)
-                if parent_item:
-                    parent_id = parent_item.parent_id
-                else:
-                    break
+            lot = lots.get(item.lot_id)
+            lot_info = {
+                'id': lot.id,
+                'factory_lot_number': lot.factory_lot_number
+            } if lot else None
             
             result.append({
                 'id': item.id,
@@ -61,6 +54,7 @@ def get_task_items(task_id):
                 'quantity': float(item.quantity),
                 'status': item.status,
                 'parent_id': item.parent_id,
+                'carton_id': item.carton_id,
                 'lot_info': lot_info,
                 'label_count': item.label_count,
                 'created_at': item.created_at.isoformat()
@@ -104,16 +98,15 @@ def get_available_items_for_task(task_id):
                 'message': 'No lots assigned to this project'
             })
         
-        # Build query for available items
-        query = db.session.query(Item, Carton, Lot, MaterialType).join(
-            Carton, Item.parent_id == Carton.id
-        ).join(
-            Lot, Carton.parent_lot_id == Lot.id
+        # Build query for available items (range scan on the lot_id stock index)
+        query = db.session.query(Item, Lot, MaterialType).join(
+            Lot, Item.lot_id == Lot.id
         ).join(
             MaterialType, Item.material_type_id == MaterialType.id
         ).filter(
-            Lot.id.in_(project_lot_ids),
-            Item.status == 'available'
+            Item.lot_id.in_(project_lot_ids),
+            Item.status == 'available',
+            ~held_by_other_task(task_id)
         )
         
         # Filter by material type if specified
@@ -124,7 +117,7 @@ def get_available_items_for_task(task_id):
         
         # Group by material type
         material_types = {}
-        for item, carton, lot, material_type in items:
+        for item, lot, material_type in items:
             mt_id = material_type.id
             if mt_id not in material_types:
                 material_types[mt_id] = {
@@ -165,6 +158,7 @@ def get_available_items_for_task(task_id):
         return jsonify({
             'task_id': task_id,
             'material_types': result,
+            'held_item_ids': [hold.item_id for hold in get_active_holds(task_id)],
             'project_id': project.id,
             'project_name': project.project_name
         })
@@ -212,13 +206,12 @@ def assign_items_to_task(task_id):
                     continue
                 
                 # Get available items from this lot with the specified material type and quantity
-                available_items = db.session.query(Item, Carton).join(
-                    Carton, Item.parent_id == Carton.id
-                ).filter(
-                    Carton.parent_lot_id == lot_id,
+                available_items = Item.query.filter(
+                    Item.lot_id == lot_id,
                     Item.material_type_id == material_type_id,
                     Item.status == 'available',
-                    Item.quantity == item_quantity
+                    Item.quantity == item_quantity,
+                    ~held_by_other_task(task_id)
                 ).order_by(Item.created_at.asc()).limit(count).all()
                 
                 if len(available_items) < count:
@@ -227,7 +220,7 @@ def assign_items_to_task(task_id):
                     }), 400
                 
                 # Assign the requested items
-                for item, carton in available_items:
+                for item in available_items:
                     item.status = 'assigned'
                     
                     # Add task ID to item's task_ids
@@ -243,7 +236,7 @@ def assign_items_to_task(task_id):
                     StockLogger.log_assign_item_to_task(user_id, item.id, task_id, float(item.quantity))
                     
                     # Log to process logs
-                    material_type = MaterialType.query.get(item.material_type_id)
+                    material_type = get_material_type(item.material_type_id)
                     ProcessLogger.log_add_item_to_task(
                         user_id, task_id, item.id, float(item.quantity), 
                         material_type.material_name if material_type else ""
@@ -266,17 +259,16 @@ def assign_items_to_task(task_id):
                 
                 # Get available items from this lot with the specified material type
                 # Order by quantity ascending (shorter materials first)
-                available_items = db.session.query(Item, Carton).join(
-                    Carton, Item.parent_id == Carton.id
-                ).filter(
-                    Carton.parent_lot_id == lot_id,
+                available_items = Item.query.filter(
+                    Item.lot_id == lot_id,
                     Item.material_type_id == material_type_id,
-                    Item.status == 'available'
+                    Item.status == 'available',
+                    ~held_by_other_task(task_id)
                 ).order_by(Item.quantity.asc(), Item.created_at.asc()).all()
                 
                 remaining_quantity = requested_quantity
                 
-                for item, carton in available_items:
+                for item in available_items:
                     if remaining_quantity <= 0:
                         break
                     
@@ -299,7 +291,7 @@ def assign_items_to_task(task_id):
                         StockLogger.log_assign_item_to_task(user_id, item.id, task_id, item_quantity)
                         
                         # Log to process logs
-                        material_type = MaterialType.query.get(item.material_type_id)
+                        material_type = get_material_type(item.material_type_id)
                         ProcessLogger.log_add_item_to_task(
                             user_id, task_id, item.id, item_quantity, 
                             material_type.material_name if material_type else ""
@@ -330,6 +322,8 @@ def assign_items_to_task(task_id):
                             quantity=child_quantity,
                             status='assigned',
                             parent_id=item.id,
+                            lot_id=item.lot_id,
+                            carton_id=item.carton_id,
                             task_ids=json.dumps([task_id])
                         )
                         
@@ -348,7 +342,7 @@ def assign_items_to_task(task_id):
                         StockLogger.log_assign_item_to_task(user_id, child_item_id, task_id, child_quantity)
                         
                         # Log to process logs
-                        material_type = MaterialType.query.get(child_item.material_type_id)
+                        material_type = get_material_type(child_item.material_type_id)
                         ProcessLogger.log_add_item_to_task(
                             user_id, task_id, child_item_id, child_quantity, 
                             material_type.material_name if material_type else ""
@@ -363,6 +357,8 @@ def assign_items_to_task(task_id):
                         
                         remaining_quantity = 0
         
+        # Planning is done, release whatever this task was still holding
+        release_holds(task_id)
         db.session.commit()
         
         return jsonify({
@@ -405,7 +401,7 @@ def remove_item_from_task(task_id, item_id):
             StockLogger.log_remove_item_from_task(user_id, item.id, task_id, item.quantity)
             
             # Log to process logs
-            material_type = MaterialType.query.get(item.material_type_id)
+            material_type = get_material_type(item.material_type_id)
             ProcessLogger.create_log(
                 user_id=user_id,
                 action_type='UPDATE',
@@ -442,14 +438,14 @@ def get_task_items_summary(task_id):
         
         # Get all items assigned to this task
         items = Item.query.filter(
-            Item.task_ids.contains(task_id)
+            json_list_contains(Item.task_ids, task_id)
         ).all()
         
         # Group items by material type first, then by quantity
         grouped_by_type = {}
         
         for item in items:
-            material_type = MaterialType.query.get(item.material_type_id)
+            material_type = get_material_type(item.material_type_id)
             if not material_type:
                 continue
                 
@@ -493,4 +489,97 @@ def get_task_items_summary(task_id):
             'total_quantity': sum(item['item_quantity'] * item['number_of_item'] for item in result)
         })
     except Exception as e:
-        return jsonify({'error': 'Failed to get task items summary', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to get task items summary', 'details': str(e)}), 500
+
+@task_item_bp.route('/tasks/<string:task_id>/items/holds', methods=['GET'])
+@jwt_required()
+@require_permission('items.read')
+def get_task_item_holds(task_id):
+    """
+    GET: Retrieve the unexpired item holds of a task
+    """
+    try:
+        Task.query.get_or_404(task_id)
+        holds = get_active_holds(task_id)
+
+        return jsonify({
+            'task_id': task_id,
+            'holds': [{
+                'item_id': hold.item_id,
+                'user_id': hold.user_id,
+                'expires_at': hold.expires_at.isoformat(),
+                'created_at': hold.created_at.isoformat() if hold.created_at else None
+            } for hold in holds],
+            'total_holds': len(holds)
+        })
+    except Exception as e:
+        return jsonify({'error': 'Failed to get item holds', 'details': str(e)}), 500
+
+@task_item_bp.route('/tasks/<string:task_id>/items/hold', methods=['POST', 'DELETE'])
+@jwt_required()
+@require_permission('items.write')
+def hold_task_items(task_id):
+    """
+    POST: Hold items for a task while planning, for ttl_seconds (refreshes existing holds)
+          Accepts either explicit item_ids or items mode assignments
+          ({"lot_id", "material_type_id", "quantity", "count"}) to pick matching items
+    DELETE: Release the task's holds (only the given item_ids if provided)
+    """
+    try:
+        Task.query.get_or_404(task_id)
+        data = request.get_json(silent=True) or {}
+
+        if request.method == 'DELETE':
+            released = release_holds(task_id, data.get('item_ids'))
+            db.session.commit()
+            return jsonify({'message': 'Item holds released', 'task_id': task_id, 'released': released})
+
+        item_ids = list(data.get('item_ids') or [])
+        shortages = []
+
+        for assignment in data.get('assignments') or []:
+            lot_id = assignment.get('lot_id')
+            material_type_id = assignment.get('material_type_id')
+            count = int(assignment.get('count', 0))
+            item_quantity = float(assignment.get('quantity', 0))
+
+            if not lot_id or not material_type_id or count <= 0 or item_quantity <= 0:
+                continue
+
+            candidates = db.session.query(Item.id).filter(
+                Item.lot_id == lot_id,
+                Item.material_type_id == material_type_id,
+                Item.status == 'available',
+                Item.quantity == item_quantity,
+                Item.id.notin_(item_ids),
+                ~held_by_other_task(task_id)
+            ).order_by(Item.created_at.asc()).limit(count).all()
+
+            if len(candidates) < count:
+                shortages.append({
+                    'lot_id': lot_id,
+                    'material_type_id': material_type_id,
+                    'quantity': item_quantity,
+                    'requested': count,
+                    'available': len(candidates)
+                })
+            item_ids.extend(candidate.id for candidate in candidates)
+
+        if not item_ids:
+            return jsonify({'error': 'item_ids or assignments are required', 'shortages': shortages}), 400
+
+        held, conflicts = hold_items(task_id, get_jwt_identity(), item_ids, data.get('ttl_seconds'))
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Items held successfully',
+            'task_id': task_id,
+            'held_item_ids': [hold.item_id for hold in held],
+            'expires_at': held[0].expires_at.isoformat() if held else None,
+            'conflicts': conflicts,
+            'shortages': shortages
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update item holds', 'details': str(e)}), 500
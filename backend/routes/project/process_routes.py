@@ -4,9 +4,11 @@ Process collection routes - Work Orders, Tasks, Sub Tasks
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import ProcessLog, ProcessStateType
+from models import ProcessLog
 from utils.db_utils import generate_id
 from utils.process_logger import ProcessLogger
+from utils.http_cache import conditional_cache
+from utils.reference_cache import get_process_states
 from __init__ import db
 
 process_bp = Blueprint('process', __name__)
@@ -50,8 +52,9 @@ def get_process_logs(type, id):
 
 @process_bp.route('/process_state_types/by_type/<state_type>', methods=['GET'])
 @jwt_required()
+@conditional_cache(('process_state_types',))
 def get_process_state_types_by_type(state_type):
-    states = ProcessStateType.query.filter_by(state_type=state_type).all()
+    states = get_process_states(state_type)
     return jsonify([
         {
             'id': s.id,
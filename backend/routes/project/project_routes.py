@@ -1,14 +1,31 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Project, WorkOrder, User, ProcessStateType, Lot
+from models import Project, WorkOrder, User, Lot
 from utils.db_utils import generate_id
 from utils.process_logger import ProcessLogger
+from utils.reference_cache import get_process_state
+from utils.list_query import paginate, list_response, ListQueryError
+from utils.eager_loading import with_list_loaders
 from __init__ import db
 import datetime
 
 
 project_bp = Blueprint('project', __name__)
 
+PROJECT_LIST_FILTERS = {
+    'state_id': (Project.state_id, 'in'),
+    'priority': (Project.priority, 'in'),
+    'person_in_charge_id': (Project.person_in_charge_id, 'eq'),
+    'due_from': (Project.due_date, 'ge'),
+    'due_to': (Project.due_date, 'le'),
+}
+PROJECT_LIST_SORTS = {
+    'created_at': Project.created_at,
+    'start_date': Project.start_date,
+    'due_date': Project.due_date,
+    'project_name': Project.project_name,
+}
+
 def parse_date(date_str):
     if date_str is None:
         return None
@@ -22,8 +39,13 @@ def parse_date(date_str):
 @jwt_required()
 def projects():
     if request.method == 'GET':
-        projects = Project.query.all()
-        return jsonify([{
+        try:
+            query = with_list_loaders(Project.query, 'projects')
+            projects, page = paginate(query, Project, request.args,
+                                      filters=PROJECT_LIST_FILTERS, sorts=PROJECT_LIST_SORTS, legacy_array=True)
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        return list_response([{
             'id': p.id,
             'project_name': p.project_name,
             'description': p.description,
@@ -49,7 +71,7 @@ def projects():
                 } for lot in p.lots
             ],
             'created_at': p.created_at.isoformat() if p.created_at else None
-        } for p in projects])
+        } for p in projects], page)
     elif request.method == 'POST':
         data = request.get_json()
         current_user_id = get_jwt_identity()
@@ -131,7 +153,7 @@ def project_detail(project_id):
                 val = data.get(field)
                 new_data[field] = parse_date(val) if val is not None else old_data[field]
             elif field == 'completed_at':
-                completed_state = ProcessStateType.query.filter_by(state_type='project', state_name='completed').first()
+                completed_state = get_process_state('project', 'completed')
                 new_data[field] = datetime.datetime.now() if completed_state and data.get('state_id') == completed_state.id else old_data[field]
             else:
                 new_data[field] = data.get(field, old_data[field])
@@ -171,7 +193,8 @@ def project_detail(project_id):
 @project_bp.route('/projects/<string:project_id>/work_orders', methods=['GET'])
 @jwt_required()
 def get_project_work_orders(project_id):
-    work_orders = WorkOrder.query.filter_by(parent_project_id=project_id).all()
+    work_orders = with_list_loaders(WorkOrder.query, 'project_work_orders') \
+        .filter_by(parent_project_id=project_id).all()
     return jsonify([
         {
             'id': wo.id,
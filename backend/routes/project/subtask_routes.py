@@ -1,13 +1,30 @@
 import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import SubTask, ProcessStateType
+from models import SubTask
 from utils.db_utils import generate_id
 from utils.process_logger import ProcessLogger
+from utils.reference_cache import get_process_state
+from utils.list_query import paginate, list_response, ListQueryError
+from utils.eager_loading import with_list_loaders
 from __init__ import db
 
 subtask_bp = Blueprint('subtasks', __name__)
 
+SUBTASK_LIST_FILTERS = {
+    'task_id': (SubTask.task_id, 'eq'),
+    'state_id': (SubTask.state_id, 'in'),
+    'assignee_id': (SubTask.assignee_id, 'eq'),
+    'due_from': (SubTask.due_date, 'ge'),
+    'due_to': (SubTask.due_date, 'le'),
+}
+SUBTASK_LIST_SORTS = {
+    'created_at': SubTask.created_at,
+    'start_date': SubTask.start_date,
+    'due_date': SubTask.due_date,
+    'subtask_name': SubTask.subtask_name,
+}
+
 def parse_date(date_str):
     if not date_str:
         return None
@@ -20,8 +37,13 @@ def parse_date(date_str):
 @jwt_required()
 def subtasks():
     if request.method == 'GET':
-        subtasks = SubTask.query.all()
-        return jsonify([
+        try:
+            query = with_list_loaders(SubTask.query, 'subtasks')
+            subtasks, page = paginate(query, SubTask, request.args,
+                                      filters=SUBTASK_LIST_FILTERS, sorts=SUBTASK_LIST_SORTS, legacy_array=True)
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        return list_response([
             {
                 'id': s.id,
                 'subtask_name': s.subtask_name,
@@ -43,7 +65,7 @@ def subtasks():
                 'created_at': s.created_at.isoformat() if s.created_at else None
             }
             for s in subtasks
-        ])
+        ], page)
     elif request.method == 'POST':
         data = request.get_json()
         current_user_id = get_jwt_identity()
@@ -109,7 +131,7 @@ def subtask_detail(subtask_id):
                 val = data.get(field)
                 new_data[field] = parse_date(val) if val is not None else old_data[field]
             elif field == 'completed_at':
-                completed_state = ProcessStateType.query.filter_by(state_type='subtask', state_name='completed').first()
+                completed_state = get_process_state('subtask', 'completed')
                 new_data[field] = datetime.datetime.now() if completed_state and data.get('state_id') == completed_state.id else old_data[field]
             elif field == 'estimated_hour':
                 est = data.get('estimated_hour', old_data['estimated_hour'])
@@ -1,13 +1,30 @@
 import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Task, SubTask, ProcessStateType
+from models import Task, SubTask
 from utils.db_utils import generate_id
 from utils.process_logger import ProcessLogger
+from utils.reference_cache import get_process_state
+from utils.list_query import paginate, list_response, ListQueryError
+from utils.eager_loading import with_list_loaders
 from __init__ import db
 
 task_bp = Blueprint('task', __name__)
 
+TASK_LIST_FILTERS = {
+    'work_order_id': (Task.work_order_id, 'eq'),
+    'state_id': (Task.state_id, 'in'),
+    'assignee_id': (Task.assignee_id, 'eq'),
+    'due_from': (Task.due_date, 'ge'),
+    'due_to': (Task.due_date, 'le'),
+}
+TASK_LIST_SORTS = {
+    'created_at': Task.created_at,
+    'start_date': Task.start_date,
+    'due_date': Task.due_date,
+    'task_name': Task.task_name,
+}
+
 def parse_date(date_str):
     if not date_str:
         return None
@@ -20,8 +37,13 @@ def parse_date(date_str):
 @jwt_required()
 def tasks():
     if request.method == 'GET':
-        tasks = Task.query.all()
-        return jsonify([
+        try:
+            query = with_list_loaders(Task.query, 'tasks')
+            tasks, page = paginate(query, Task, request.args,
+                                   filters=TASK_LIST_FILTERS, sorts=TASK_LIST_SORTS, legacy_array=True)
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        return list_response([
             {
                 'id': t.id,
                 'task_name': t.task_name,
@@ -44,7 +66,7 @@ def tasks():
                 'created_at': t.created_at.isoformat() if t.created_at else None
             }
             for t in tasks
-        ])
+        ], page)
     elif request.method == 'POST':
         data = request.get_json()
         current_user_id = get_jwt_identity()
@@ -112,7 +134,7 @@ def task_detail(task_id):
                 val = data.get(field)
                 new_data[field] = parse_date(val) if val is not None else old_data[field]
             elif field == 'completed_at':
-                completed_state = ProcessStateType.query.filter_by(state_type='task', state_name='completed').first()
+                completed_state = get_process_state('task', 'completed')
                 new_data[field] = datetime.datetime.now() if completed_state and data.get('state_id') == completed_state.id else old_data[field]
             elif field == 'estimated_hour':
                 est = data.get('estimated_hour', old_data['estimated_hour'])
@@ -150,7 +172,7 @@ def task_detail(task_id):
 @task_bp.route('/tasks/<string:task_id>/sub_tasks', methods=['GET'])
 @jwt_required()
 def get_task_subtasks(task_id):
-    subtasks = SubTask.query.filter_by(task_id=task_id).all()
+    subtasks = with_list_loaders(SubTask.query, 'subtasks').filter_by(task_id=task_id).all()
     result = [
         {
             'id': s.id,
@@ -172,7 +194,7 @@ def get_task_subtasks(task_id):
 @task_bp.route('/tasks/by_user/<user_id>', methods=['GET'])
 @jwt_required()
 def get_tasks_by_user(user_id):
-    task = Task.query.filter_by(assignee_id=user_id).all()
+    task = with_list_loaders(Task.query, 'user_tasks').filter_by(assignee_id=user_id).all()
 
     return jsonify([
         {
@@ -247,10 +269,7 @@ def start_task(task_id):
             return jsonify({'error': 'Only tasks in assigned_worker state can be started'}), 400
 
 
-        pulling_cable_state = ProcessStateType.query.filter_by(
-            state_type='task', 
-            state_name='in_progress'
-        ).first()
+        pulling_cable_state = get_process_state('task', 'in_progress')
         
         if not pulling_cable_state:
             return jsonify({'error': 'pulling_cable state not found'}), 500
@@ -2,13 +2,32 @@ import datetime
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import WorkOrder, Task, ProcessStateType
+from models import WorkOrder, Task
 from utils.db_utils import generate_id
 from utils.process_logger import ProcessLogger
+from utils.reference_cache import get_process_state
+from utils.list_query import paginate, list_response, ListQueryError
+from utils.eager_loading import with_list_loaders
 from __init__ import db
 
 workorder_bp = Blueprint('work_order', __name__)
 
+WORK_ORDER_LIST_FILTERS = {
+    'parent_project_id': (WorkOrder.parent_project_id, 'eq'),
+    'state_id': (WorkOrder.state_id, 'in'),
+    'assignee_id': (WorkOrder.assignee_id, 'eq'),
+    'lot_id': (WorkOrder.lot_id, 'eq'),
+    'workflow_type_id': (WorkOrder.workflow_type_id, 'eq'),
+    'due_from': (WorkOrder.due_date, 'ge'),
+    'due_to': (WorkOrder.due_date, 'le'),
+}
+WORK_ORDER_LIST_SORTS = {
+    'created_at': WorkOrder.created_at,
+    'start_date': WorkOrder.start_date,
+    'due_date': WorkOrder.due_date,
+    'work_order_name': WorkOrder.work_order_name,
+}
+
 
 def parse_date(date_str):
     if not date_str:
@@ -24,8 +43,14 @@ def parse_date(date_str):
 @jwt_required()
 def work_orders():
     if request.method == 'GET':
-        work_orders = WorkOrder.query.all()
-        return jsonify([{
+        try:
+            query = with_list_loaders(WorkOrder.query, 'work_orders')
+            work_orders, page = paginate(query, WorkOrder, request.args,
+                                         filters=WORK_ORDER_LIST_FILTERS, sorts=WORK_ORDER_LIST_SORTS,
+                                         legacy_array=True)
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        return list_response([{
             'id': wo.id,
             'work_order_name': wo.work_order_name,
             'description': wo.description,
@@ -48,7 +73,7 @@ def work_orders():
             'task_ids': wo.task_ids,
             'process_log_ids': wo.process_log_ids,
             'created_at': wo.created_at.isoformat() if wo.created_at else None
-        } for wo in work_orders])
+        } for wo in work_orders], page)
 
     elif request.method == 'POST':
         data = request.get_json()
@@ -130,7 +155,7 @@ def work_order_detail(work_order_id):
                 val = data.get(field)
                 new_data[field] = parse_date(val) if val is not None else old_data[field]
             elif field == 'completed_at':
-                completed_state = ProcessStateType.query.filter_by(state_type='project', state_name='completed').first()
+                completed_state = get_process_state('project', 'completed')
                 new_data[field] = datetime.datetime.now() if completed_state and data.get(
                     'state_id') == completed_state.id else old_data[field]
             elif field == 'estimated_hour':
@@ -173,7 +198,7 @@ def work_order_detail(work_order_id):
 @workorder_bp.route('/work_orders/<string:work_order_id>/tasks', methods=['GET'])
 @jwt_required()
 def get_work_order_tasks(work_order_id):
-    tasks = Task.query.filter_by(work_order_id=work_order_id).all()
+    tasks = with_list_loaders(Task.query, 'work_order_tasks').filter_by(work_order_id=work_order_id).all()
 
     return jsonify([
         {
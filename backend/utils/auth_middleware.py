@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import jsonify, request, current_app
+from flask import jsonify, request, current_app, g
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from models import User, UserType, Permission, UserTypePermission, PermissionAudit
 from __init__ import db
@@ -14,13 +14,13 @@ def require_permission(permission_id):
         def decorated_function(*args, **kwargs):
             try:
                 current_user_id = get_jwt_identity()
-                user = User.query.get(current_user_id)
+                decision = check_permission(current_user_id, permission_id)
 
-                if not user or not user.is_active:
+                if decision == 'inactive_user':
                     log_permission_attempt(current_user_id, permission_id, 'denied', 'inactive_user')
                     return jsonify({'error': 'User inactive'}), 403
 
-                if has_permission(user, permission_id):
+                if decision == 'granted':
                     log_permission_attempt(current_user_id, permission_id, 'granted')
                     return f(*args, **kwargs)
                 else:
@@ -36,6 +36,25 @@ def require_permission(permission_id):
     return decorator
 
 
+def check_permission(user_id, permission_id):
+    """
+    Decide whether a user may use a permission: 'granted', 'insufficient_permissions' or
+    'inactive_user'. Decisions are kept in flask.g for the rest of the app context, so the
+    sub-requests of a batch (see utils/batch.py) look each permission up once.
+    """
+    decisions = g.setdefault('permission_decisions', {})
+    key = (str(user_id), permission_id)
+    if key not in decisions:
+        user = User.query.get(user_id)
+        if not user or not user.is_active:
+            decisions[key] = 'inactive_user'
+        elif has_permission(user, permission_id):
+            decisions[key] = 'granted'
+        else:
+            decisions[key] = 'insufficient_permissions'
+    return decisions[key]
+
+
 def has_permission(user, permission_id):
     """Check if user has specific permission"""
     user_type = UserType.query.get(user.user_type_id)
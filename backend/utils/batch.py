@@ -0,0 +1,115 @@
+"""
+Batch requests - several GET requests answered in one round trip
+
+Each sub-request is dispatched to its view inside the batch request's app context, so they all
+share the database session (objects loaded by one are found in the identity map by the next) and
+the flask.g cache of permission decisions (see utils/auth_middleware.py). The caller's
+Authorization header is passed on, so every view still runs its own @jwt_required and
+@require_permission checks. Instrumentation hooks (before/after_request) only run for the batch
+request itself, which therefore counts the queries of all its sub-requests.
+
+A failing sub-request does not fail the batch: its status and error body are returned in its slot.
+Responses that are not JSON are reported as {"error": <status phrase>}.
+"""
+
+from flask import current_app, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import HTTP_STATUS_CODES
+from werkzeug.test import EnvironBuilder
+from __init__ import db
+
+DEFAULT_MAX_REQUESTS = 20
+# Headers of the batch request that sub-requests receive
+FORWARDED_HEADERS = ('Authorization', 'User-Agent', 'Accept-Language')
+
+
+class BatchRequestError(ValueError):
+    """Raised for a malformed batch request"""
+
+
+def parse_batch(data):
+    """
+    Validate the body of a batch request.
+
+    Args:
+        data (dict): {"requests": [{"id": optional str, "path": "/api/..."} or "/api/...", ...]}
+
+    Returns:
+        list: (id, path) tuples in request order
+
+    Raises:
+        BatchRequestError: If the body is malformed, too long or asks for something that cannot be batched
+    """
+    entries = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise BatchRequestError('requests must be a non-empty list')
+    max_requests = current_app.config.get('BATCH_MAX_REQUESTS', DEFAULT_MAX_REQUESTS)
+    if len(entries) > max_requests:
+        raise BatchRequestError(f'At most {max_requests} requests can be batched')
+
+    parsed = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        if not isinstance(entry, dict) or not isinstance(entry.get('path'), str):
+            raise BatchRequestError(f'requests[{index}] must be a path or an object with a path')
+        if entry.get('method', 'GET').upper() != 'GET':
+            raise BatchRequestError(f'requests[{index}]: only GET requests can be batched')
+        path = entry['path']
+        route, _, query = path.partition('?')
+        if not route.startswith('/api/') or route.rstrip('/') == request.path.rstrip('/'):
+            raise BatchRequestError(f'requests[{index}]: path must be an /api/ endpoint other than the batch endpoint')
+        if 'stream=' in query:
+            raise BatchRequestError(f'requests[{index}]: streamed responses cannot be batched')
+        parsed.append((entry.get('id', str(index)), path))
+    return parsed
+
+
+def _dispatch(path, headers):
+    """Run one GET sub-request through its view and return the response"""
+    app = current_app._get_current_object()
+    builder = EnvironBuilder(path=path, method='GET', base_url=request.root_url, headers=headers,
+                             environ_base={'REMOTE_ADDR': request.remote_addr})
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    # The app context of the batch request is reused, so the session and g are shared
+    with app.request_context(environ):
+        try:
+            try:
+                rv = app.dispatch_request()
+            except Exception as e:
+                # HTTP errors and exceptions with a registered handler (e.g. JWT errors)
+                rv = app.handle_user_exception(e)
+            return app.make_response(rv)
+        except Exception as e:
+            if isinstance(e, HTTPException):
+                return e.get_response()
+            db.session.rollback()
+            current_app.logger.exception(f'Batch sub-request {path} failed')
+            return app.make_response(({'error': 'Internal server error', 'details': str(e)}, 500))
+
+
+def run_batch(sub_requests):
+    """
+    Dispatch validated sub-requests (see parse_batch) one after another.
+
+    Returns:
+        list: {"id", "path", "status", "body"} per sub-request, in request order
+    """
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    results = []
+    for request_id, path in sub_requests:
+        response = _dispatch(path, headers)
+        try:
+            if response.is_json:
+                body = response.get_json(silent=True)
+            else:
+                # e.g. the HTML page of a 404 for an unknown path
+                body = {'error': HTTP_STATUS_CODES.get(response.status_code, 'Unknown error')}
+        finally:
+            response.close()
+        results.append({'id': request_id, 'path': path, 'status': response.status_code, 'body': body})
+    return results
@@ -0,0 +1,184 @@
+"""
+Response compression - negotiated gzip / brotli for JSON, text and PDF responses
+
+Compression runs as the last after_request hook. The encoding is picked from the client's
+Accept-Encoding header: brotli when the Brotli package is installed and the client prefers it,
+otherwise gzip. Responses are left as they are when they:
+
+    - already carry a Content-Encoding, are partial (206) or have no body (204, 304, HEAD)
+    - have a media type outside COMPRESSIBLE_MIMETYPES (images, archives and other formats that
+      are compressed already)
+    - are smaller than COMPRESSION_MIN_SIZE bytes
+    - would shrink by less than MIN_SAVING (a buffered body is sent uncompressed then)
+
+Streamed responses (see utils/streaming.py) are compressed chunk by chunk and flushed after each
+chunk, so clients still receive rows as they are produced. CPU time spent compressing and the
+bytes before and after are recorded in the inlinks_http_compression_* metrics.
+
+Config:
+    COMPRESSION_ENABLED: Turn compression on or off (default True)
+    COMPRESSION_MIN_SIZE: Smallest body in bytes worth compressing (default 1024)
+    COMPRESSION_LEVEL: gzip level, 1-9 (default 6)
+    COMPRESSION_BROTLI_QUALITY: brotli quality, 0-11 (default 5)
+"""
+
+import time
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/pdf', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+}
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 5
+# Bodies that compress by less than this fraction are sent as they are
+MIN_SAVING = 0.05
+# Passthrough bodies (send_file) up to this size are read and compressed in one piece
+MAX_BUFFERED_PASSTHROUGH = 16 * 1024 * 1024
+
+
+def available_encodings():
+    """Content codings this process can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ''
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _negotiate(accept_encodings):
+    """The best encoding the client accepts, or None"""
+    best, best_quality = None, 0
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compress(data, encoding, level, quality):
+    if encoding == 'br':
+        return brotli.compress(data, quality=quality)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+def _stream_compressor(encoding, level, quality):
+    """(compress and flush one chunk, finish) functions of a streaming compressor"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=quality)
+        return (lambda data: compressor.process(data) + compressor.flush()), compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+
+def _record(encoding, cpu_seconds, size_in, size_out):
+    from utils.metrics import COMPRESSION_TIME, COMPRESSION_BYTES
+
+    COMPRESSION_TIME.observe((encoding,), cpu_seconds)
+    COMPRESSION_BYTES.inc((encoding, 'in'), size_in)
+    COMPRESSION_BYTES.inc((encoding, 'out'), size_out)
+
+
+def _compress_stream(body, encoding, level, quality):
+    """Compress a streamed body chunk by chunk; closes the original body when done"""
+    compress_chunk, finish = _stream_compressor(encoding, level, quality)
+    cpu = 0.0
+    size_in = size_out = 0
+    try:
+        for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            start = time.thread_time()
+            compressed = compress_chunk(chunk)
+            cpu += time.thread_time() - start
+            size_in += len(chunk)
+            size_out += len(compressed)
+            if compressed:
+                yield compressed
+        start = time.thread_time()
+        compressed = finish()
+        cpu += time.thread_time() - start
+        size_out += len(compressed)
+        yield compressed
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+        _record(encoding, cpu, size_in, size_out)
+
+
+def init_compression(app):
+    """
+    Compress the responses of an app. Call before registering other after_request hooks, so it
+    runs after them and compresses the final body.
+    """
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    from utils.metrics import COMPRESSION_TIME, COMPRESSION_BYTES
+
+    for encoding in available_encodings():
+        COMPRESSION_TIME.register((encoding,))
+        COMPRESSION_BYTES.register((encoding, 'in'))
+        COMPRESSION_BYTES.register((encoding, 'out'))
+
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+    level = app.config.get('COMPRESSION_LEVEL', DEFAULT_LEVEL)
+    quality = app.config.get('COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+
+    @app.after_request
+    def compress_response(response):
+        if (request.method == 'HEAD' or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers or not _compressible(response)):
+            return response
+        # The body depends on Accept-Encoding from here on, whether or not it gets compressed
+        response.vary.add('Accept-Encoding')
+        encoding = _negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+        length = response.content_length
+        if length is not None and length < min_size:
+            return response
+
+        if response.direct_passthrough and length is not None and length <= MAX_BUFFERED_PASSTHROUGH:
+            # send_file bodies of a known, moderate size are compressed like buffered ones
+            body = response.response
+            data = b''.join(body)
+            if hasattr(body, 'close'):
+                body.close()
+            response.direct_passthrough = False
+            response.set_data(data)
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level, quality)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            start = time.thread_time()
+            compressed = _compress(data, encoding, level, quality)
+            cpu = time.thread_time() - start
+            if len(compressed) > len(data) * (1 - MIN_SAVING):
+                _record(encoding, cpu, len(data), len(data))
+                return response
+            _record(encoding, cpu, len(data), len(compressed))
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # A strong ETag identifies the exact bytes, which are now the compressed ones
+            response.set_etag(etag, weak=True)
+        return response
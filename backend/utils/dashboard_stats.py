@@ -0,0 +1,176 @@
+"""
+Dashboard statistics - entity counts and per-material / per-project breakdowns from one query
+
+All counts come from a single UNION ALL statement of grouped counts. The result is kept in a
+process-wide counter cache that is dropped when a commit changes a counted table and otherwise
+expires after DASHBOARD_CACHE_TTL seconds, which bounds staleness for writes made by other
+processes or outside the ORM.
+"""
+
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func, literal, null, select, union_all, Float, String
+from models import Project, WorkOrder, Task, Item, Lot, MaterialType
+from utils.write_tracking import track_writes
+from __init__ import db
+
+DEFAULT_CACHE_TTL = 30
+ITEM_STATUSES = ('available', 'assigned', 'used')
+# Models whose writes change the dashboard
+COUNTED_MODELS = (Project, WorkOrder, Task, Item, Lot, MaterialType)
+
+_lock = threading.Lock()
+_cache = {'stats': None, 'expires': 0.0}
+_generation = 0
+
+
+def invalidate_dashboard_cache():
+    """Drop the cached counts; the next request recomputes them"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache['stats'] = None
+
+
+def _row(section, key, name, status, count, quantity=None):
+    return select(
+        literal(section, String).label('section'),
+        key.label('key'),
+        (name if name is not None else null()).label('name'),
+        (status if status is not None else null()).label('status'),
+        count.label('count'),
+        (quantity if quantity is not None else literal(None, Float)).label('quantity'),
+    )
+
+
+def _counts_statement():
+    """
+    One statement returning (section, key, name, status, count, quantity) rows:
+        project         - every project, with count 0, so projects without work are listed too
+        project_*       - work orders, tasks and items (through their lot) per project
+        unlinked_tasks  - tasks without a work order, which only count towards the total
+        material        - items per material type and status, with their total quantity
+    """
+    projects = _row('project', Project.id, Project.project_name, None, literal(0)).select_from(Project)
+    work_orders = _row('project_work_orders', WorkOrder.parent_project_id, None, None, func.count(WorkOrder.id)) \
+        .group_by(WorkOrder.parent_project_id)
+    tasks = _row('project_tasks', WorkOrder.parent_project_id, None, None, func.count(Task.id)) \
+        .select_from(Task).join(WorkOrder, Task.work_order_id == WorkOrder.id) \
+        .group_by(WorkOrder.parent_project_id)
+    unlinked_tasks = _row('unlinked_tasks', literal(None, String), None, None, func.count(Task.id)) \
+        .where(Task.work_order_id.is_(None))
+    materials = _row('material', Item.material_type_id, MaterialType.material_name, Item.status,
+                     func.count(Item.id), func.sum(Item.quantity)) \
+        .select_from(Item).outerjoin(MaterialType, Item.material_type_id == MaterialType.id) \
+        .group_by(Item.material_type_id, MaterialType.material_name, Item.status)
+    project_items = _row('project_items', Lot.project_id, None, Item.status, func.count(Item.id),
+                         func.sum(Item.quantity)) \
+        .select_from(Item).join(Lot, Item.lot_id == Lot.id) \
+        .where(Lot.project_id.isnot(None)) \
+        .group_by(Lot.project_id, Item.status)
+    return union_all(projects, work_orders, tasks, unlinked_tasks, materials, project_items)
+
+
+def _status_counts(counts):
+    stats = {f'{status}_items': counts.get(status, 0) for status in ITEM_STATUSES}
+    stats['total_items'] = sum(counts.values())
+    return stats
+
+
+def compute_dashboard_stats():
+    """
+    Run the dashboard query and shape the result.
+
+    Returns:
+        dict: Totals (total_projects, total_work_orders, total_tasks, total_items and items per
+              status) plus 'materials' and 'projects' breakdown lists
+    """
+    projects = {}
+    per_project = {'work_orders': {}, 'tasks': {}, 'items': {}}
+    materials = {}
+    total_work_orders = 0
+    total_tasks = 0
+    item_counts = {}
+
+    for section, key, name, status, count, quantity in db.session.execute(_counts_statement()):
+        if section == 'project':
+            projects[key] = {'project_id': key, 'project_name': name}
+        elif section == 'project_work_orders':
+            total_work_orders += count
+            per_project['work_orders'][key] = count
+        elif section == 'project_tasks':
+            total_tasks += count
+            per_project['tasks'][key] = count
+        elif section == 'unlinked_tasks':
+            total_tasks += count
+        elif section == 'material':
+            item_counts[status] = item_counts.get(status, 0) + count
+            material = materials.setdefault(key, {'material_type_id': key, 'material_name': name,
+                                                  'items': {}, 'quantities': {}})
+            material['items'][status] = count
+            material['quantities'][status] = quantity or 0
+        elif section == 'project_items':
+            per_project['items'].setdefault(key, {})[status] = count
+
+    material_stats = []
+    for material in sorted(materials.values(), key=lambda m: m['material_type_id']):
+        entry = {'material_type_id': material['material_type_id'], 'material_name': material['material_name']}
+        entry.update(_status_counts(material['items']))
+        entry['available_quantity'] = material['quantities'].get('available', 0)
+        entry['total_quantity'] = sum(material['quantities'].values())
+        material_stats.append(entry)
+
+    project_stats = []
+    for project in sorted(projects.values(), key=lambda p: p['project_id']):
+        project_id = project['project_id']
+        entry = dict(project,
+                     work_orders=per_project['work_orders'].get(project_id, 0),
+                     tasks=per_project['tasks'].get(project_id, 0))
+        entry.update(_status_counts(per_project['items'].get(project_id, {})))
+        project_stats.append(entry)
+
+    stats = {
+        'total_projects': len(projects),
+        'total_work_orders': total_work_orders,
+        'total_tasks': total_tasks,
+    }
+    stats.update(_status_counts(item_counts))
+    stats['materials'] = material_stats
+    stats['projects'] = project_stats
+    return stats
+
+
+def get_dashboard_stats():
+    """
+    Dashboard counts from the cache, recomputed when missing or older than DASHBOARD_CACHE_TTL
+    seconds (0 disables caching).
+
+    Returns:
+        dict: See compute_dashboard_stats; treat as read-only, it is shared between requests
+    """
+    from utils.metrics import record_cache_lookup
+
+    ttl = current_app.config.get('DASHBOARD_CACHE_TTL', DEFAULT_CACHE_TTL)
+    now = time.monotonic()
+    with _lock:
+        stats = _cache['stats']
+        if stats is not None and now < _cache['expires']:
+            record_cache_lookup('dashboard', True)
+            return stats
+        generation = _generation
+    record_cache_lookup('dashboard', False)
+
+    stats = compute_dashboard_stats()
+    if ttl:
+        with _lock:
+            # A commit that invalidated the cache while we were counting may not be in the result
+            if generation == _generation:
+                _cache['stats'] = stats
+                _cache['expires'] = now + ttl
+    return stats
+
+
+# Commits that change a counted table drop the cached counts
+track_writes('dashboard_stats', [model.__tablename__ for model in COUNTED_MODELS],
+             on_commit=lambda tables: invalidate_dashboard_cache())
@@ -2,16 +2,42 @@
 Database utility functions for ID generation and data initialization
 """
 
-from models import db, User, UserType, Permission, UserTypePermission, MaterialType, WorkflowType, ProcessStateType
+from sqlalchemy import func, cast, Integer, update, insert
+from sqlalchemy.exc import IntegrityError
+from models import (db, User, UserType, Permission, UserTypePermission, MaterialType, WorkflowType, ProcessStateType,
+                    LogType, IdSequence)
+
+def highest_id_number(prefix, model_class):
+    """Highest numeric suffix among the IDs of a table (scans every ID; only used to seed a counter)"""
+    # Numeric rather than string order, which depends on the collation and breaks once a number
+    # outgrows its zero padding
+    number = cast(func.substr(model_class.id, len(prefix) + 1), Integer)
+    return db.session.query(func.max(number)).filter(model_class.id.like(f'{prefix}%')).scalar() or 0
+
+def next_id_number(prefix, model_class):
+    """
+    Reserve the next number of a prefix's counter in id_sequences, inside the caller's transaction.
+    One indexed UPDATE per call; the row stays locked until commit, so concurrent transactions get
+    distinct numbers, and a rollback gives the number back.
+    """
+    sequences = IdSequence.__table__
+    bump = (update(sequences).where(sequences.c.prefix == prefix)
+            .values(last_value=sequences.c.last_value + 1).returning(sequences.c.last_value))
+    new_num = db.session.execute(bump).scalar()
+    if new_num is None:
+        # First ID of this prefix: start the counter after the IDs already in the table
+        new_num = highest_id_number(prefix, model_class) + 1
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(sequences).values(prefix=prefix, last_value=new_num))
+        except IntegrityError:
+            # Another transaction created the counter first
+            new_num = db.session.execute(bump).scalar()
+    return new_num
 
 def generate_id(prefix, model_class):
     """Generate sequential IDs with prefix and appropriate digit formatting"""
-    latest = model_class.query.filter(model_class.id.like(f'{prefix}%')).order_by(model_class.id.desc()).first()
-    if latest:
-        latest_num = int(latest.id[len(prefix):])
-        new_num = latest_num + 1
-    else:
-        new_num = 1
+    new_num = next_id_number(prefix, model_class)
 
     # Define minimum digits based on prefix
     if prefix == 'LOT':
@@ -35,6 +61,24 @@ def generate_id(prefix, model_class):
     else:
         return f'{prefix}{new_num:03d}'  # 3 digits for other types (default)
 
+def json_list_contains(column, value):
+    """
+    Filter for JSON-text list columns (e.g. Item.task_ids) containing a value.
+    Matches the quoted JSON string so TSK00001 does not also match TSK000012, using a plain LIKE
+    that behaves the same on SQLite and PostgreSQL.
+    """
+    return column.contains(f'"{value}"', autoescape=True)
+
+def bootstrap_database(logger=None):
+    """
+    Apply pending migrations and load the default data (user types, permissions, reference data and
+    the admin user). Run once per deployment with bootstrap.py rather than in every worker.
+    """
+    from utils.migrations import migrate
+    applied = migrate(logger=logger)
+    init_default_data()
+    return applied
+
 def init_default_data():
     """Initialize database with default data"""
     # Create default user type if it doesn't exist
@@ -109,6 +153,7 @@ def init_default_data():
         {'id': 'inventory.write', 'resource': 'inventory', 'action': 'write', 'description': 'Manage inventory'},
         {'id': 'admin.users', 'resource': 'admin', 'action': 'users', 'description': 'Manage users'},
         {'id': 'admin.roles', 'resource': 'admin', 'action': 'roles', 'description': 'Manage roles'},
+        {'id': 'admin.profile', 'resource': 'admin', 'action': 'profile', 'description': 'Profile individual requests'},
         {'id': 'dashboard.view', 'resource': 'dashboard', 'action': 'view', 'description': 'Access dashboard'},
         # Project permissions
         {'id': 'project.read', 'resource': 'project', 'action': 'read', 'description': 'View project details'},
@@ -230,6 +275,27 @@ def init_default_data():
             )
             db.session.add(workflow_type)
 
+    # Create log types (ProcessLogger falls back to LT002 for unknown actions)
+    log_types_data = [
+        {'type': 'CREATE', 'description': 'Record created'},
+        {'type': 'UPDATE', 'description': 'Record updated'},
+        {'type': 'DELETE', 'description': 'Record deleted'},
+        {'type': 'STATE_CHANGE', 'description': 'State changed'},
+        {'type': 'ASSIGNMENT', 'description': 'Assignee changed'},
+        {'type': 'COMPLETION', 'description': 'Marked as completed'},
+        {'type': 'PRIORITY_CHANGE', 'description': 'Priority changed'},
+        {'type': 'DUE_DATE_CHANGE', 'description': 'Due date changed'},
+        {'type': 'ESTIMATION_CHANGE', 'description': 'Estimated hours changed'}
+    ]
+    for i, lt_data in enumerate(log_types_data, 1):
+        if not LogType.query.filter_by(id=f'LT{i:03d}').first():
+            log_type = LogType(
+                id=f'LT{i:03d}',
+                type=lt_data['type'],
+                description=lt_data['description']
+            )
+            db.session.add(log_type)
+
     # Create process state types
     process_state_types_data = [
         # Project states
@@ -0,0 +1,60 @@
+"""
+Eager-loading policy - relationship loader options for list endpoints
+
+Every list endpoint that serializes a relationship per row must load it here instead of
+lazily, otherwise each row costs an extra SELECT. Many-to-one relationships are joined
+into the main query; collections are loaded with one extra IN query per page.
+"""
+
+from sqlalchemy.orm import joinedload, selectinload
+from models import Project, WorkOrder, Task, SubTask
+
+LIST_LOADERS = {
+    # GET /projects
+    'projects': (
+        joinedload(Project.state),
+        joinedload(Project.person_in_charge),
+        selectinload(Project.lots),
+    ),
+    # GET /work_orders
+    'work_orders': (
+        joinedload(WorkOrder.state),
+    ),
+    # GET /projects/<id>/work_orders
+    'project_work_orders': (
+        joinedload(WorkOrder.state),
+        joinedload(WorkOrder.workflow_type),
+    ),
+    # GET /tasks
+    'tasks': (
+        joinedload(Task.state),
+    ),
+    # GET /work_orders/<id>/tasks
+    'work_order_tasks': (
+        joinedload(Task.state),
+        joinedload(Task.assignee),
+    ),
+    # GET /tasks/by_user/<id>
+    'user_tasks': (
+        joinedload(Task.state),
+        joinedload(Task.work_order),
+    ),
+    # GET /subtasks, GET /tasks/<id>/sub_tasks
+    'subtasks': (
+        joinedload(SubTask.state),
+    ),
+}
+
+
+def with_list_loaders(query, endpoint):
+    """
+    Apply the eager-loading policy of a list endpoint to a query.
+
+    Args:
+        query: SQLAlchemy query selecting the endpoint's model
+        endpoint (str): Key in LIST_LOADERS
+
+    Returns:
+        Query: The query with loader options applied
+    """
+    return query.options(*LIST_LOADERS[endpoint])
@@ -0,0 +1,176 @@
+"""
+Item hold utilities - time-limited soft reservations of items for task planning
+"""
+
+import threading
+import time
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import Item, ItemHold, get_hk_time
+from __init__ import db
+
+DEFAULT_HOLD_TTL_SECONDS = 300
+MAX_HOLD_TTL_SECONDS = 1800
+
+
+def get_hold_ttl(requested_ttl=None):
+    """
+    Resolve the TTL for a new hold, clamped to the configured maximum.
+
+    Args:
+        requested_ttl: TTL in seconds requested by the client (optional)
+
+    Returns:
+        int: TTL in seconds
+    """
+    default_ttl = current_app.config.get('ITEM_HOLD_TTL_SECONDS', DEFAULT_HOLD_TTL_SECONDS)
+    max_ttl = current_app.config.get('ITEM_HOLD_MAX_TTL_SECONDS', MAX_HOLD_TTL_SECONDS)
+    try:
+        ttl = int(requested_ttl) if requested_ttl is not None else default_ttl
+    except (TypeError, ValueError):
+        ttl = default_ttl
+    return max(1, min(ttl, max_ttl))
+
+
+def held_by_other_task(task_id):
+    """
+    SQL clause that is true when an item has an unexpired hold owned by another task.
+    Use as ``query.filter(~held_by_other_task(task_id))`` on queries selecting Item.
+    """
+    return db.session.query(ItemHold.id).filter(
+        ItemHold.item_id == Item.id,
+        ItemHold.task_id != task_id,
+        ItemHold.expires_at > get_hk_time()
+    ).exists()
+
+
+def get_active_holds(task_id):
+    """Get all unexpired holds owned by a task"""
+    return ItemHold.query.filter(
+        ItemHold.task_id == task_id,
+        ItemHold.expires_at > get_hk_time()
+    ).order_by(ItemHold.item_id).all()
+
+
+def hold_items(task_id, user_id, item_ids, ttl_seconds=None):
+    """
+    Place or refresh holds on items for a task.
+    Items that are not available or are held by another task are reported as conflicts.
+    The caller is responsible for committing the session.
+
+    Args:
+        task_id (str): The task the items are held for
+        user_id (str): The user placing the hold
+        item_ids (list): IDs of the items to hold
+        ttl_seconds (int, optional): Requested hold duration
+
+    Returns:
+        tuple: (list of held ItemHold rows, list of conflict dicts)
+    """
+    now = get_hk_time()
+    expires_at = now + timedelta(seconds=get_hold_ttl(ttl_seconds))
+    item_ids = list(dict.fromkeys(item_ids))
+
+    # Drop expired holds on these items so they can be taken over
+    ItemHold.query.filter(
+        ItemHold.item_id.in_(item_ids),
+        ItemHold.expires_at <= now
+    ).delete(synchronize_session=False)
+
+    items = {i.id: i for i in Item.query.filter(Item.id.in_(item_ids)).all()}
+    existing = {h.item_id: h for h in ItemHold.query.filter(ItemHold.item_id.in_(item_ids)).all()}
+
+    held = []
+    conflicts = []
+    for item_id in item_ids:
+        item = items.get(item_id)
+        if not item:
+            conflicts.append({'item_id': item_id, 'reason': 'not_found'})
+            continue
+        if item.status != 'available':
+            conflicts.append({'item_id': item_id, 'reason': 'not_available'})
+            continue
+
+        hold = existing.get(item_id)
+        if hold and hold.task_id != task_id:
+            conflicts.append({'item_id': item_id, 'reason': 'held', 'task_id': hold.task_id,
+                              'expires_at': hold.expires_at.isoformat()})
+            continue
+
+        if not hold:
+            hold = _insert_hold(item_id, task_id, user_id, expires_at)
+            if hold.task_id != task_id:
+                conflicts.append({'item_id': item_id, 'reason': 'held', 'task_id': hold.task_id,
+                                  'expires_at': hold.expires_at.isoformat()})
+                continue
+        hold.expires_at = expires_at
+        hold.user_id = user_id
+        held.append(hold)
+
+    return held, conflicts
+
+
+def _insert_hold(item_id, task_id, user_id, expires_at):
+    """
+    Insert a hold in a savepoint. When a concurrent request has held the item since it was
+    checked, the unique item_id constraint rejects the insert and that request's hold is
+    returned instead, so the caller can report the conflict without failing the transaction.
+    """
+    hold = ItemHold(item_id=item_id, task_id=task_id, user_id=user_id, expires_at=expires_at)
+    try:
+        with db.session.begin_nested():
+            db.session.add(hold)
+    except IntegrityError:
+        hold = ItemHold.query.filter(ItemHold.item_id == item_id).one()
+    return hold
+
+
+def release_holds(task_id, item_ids=None):
+    """
+    Release holds owned by a task. Releases all of the task's holds when item_ids is None.
+    The caller is responsible for committing the session.
+
+    Returns:
+        int: Number of holds released
+    """
+    query = ItemHold.query.filter(ItemHold.task_id == task_id)
+    if item_ids is not None:
+        query = query.filter(ItemHold.item_id.in_(item_ids))
+    return query.delete(synchronize_session=False)
+
+
+def sweep_expired_holds():
+    """Delete all expired holds and commit. Returns the number of holds removed."""
+    removed = ItemHold.query.filter(ItemHold.expires_at <= get_hk_time()).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def start_hold_sweeper(app):
+    """
+    Start a daemon thread that periodically removes expired holds.
+    Expired holds are already ignored by availability queries; the sweeper only keeps the table small.
+    Disabled when ITEM_HOLD_SWEEP_INTERVAL is 0.
+    """
+    interval = app.config.get('ITEM_HOLD_SWEEP_INTERVAL', 60)
+    if not interval:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    removed = sweep_expired_holds()
+                    if removed:
+                        app.logger.info(f"Released {removed} expired item holds")
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Item hold sweep failed: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    sweeper = threading.Thread(target=run, name='item-hold-sweeper', daemon=True)
+    sweeper.start()
+    return sweeper
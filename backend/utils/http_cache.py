@@ -0,0 +1,164 @@
+"""
+HTTP caching - ETags, conditional GET and a response cache for read-heavy reference data
+
+Every commit that writes a versioned table increments that table's row in table_versions, in the
+same transaction, so all server processes see the change. A cached endpoint reads the versions of
+the tables it depends on (one small primary-key query) and derives its ETag from them:
+
+    - If-None-Match / If-Modified-Since match: 304 without running the view
+    - the same ETag was served before: the stored body is returned without running the view
+    - otherwise the view runs and its 200 response is stored
+
+Clients always revalidate (Cache-Control: private, no-cache), so a change is visible on the
+next request.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, Response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select, update, insert
+from models import TableVersion, HK_TZ, get_hk_time
+from utils.write_tracking import track_writes
+from __init__ import db
+
+# Tables whose writes are counted. Only small, rarely written tables belong here: every commit
+# that touches one also updates its table_versions row.
+VERSIONED_TABLES = ('material_types', 'process_state_types', 'card_menus', 'user_types', 'users',
+                    'permissions', 'user_type_permissions', 'log_types', 'workflow_types')
+# Versioned tables whose updates only count when one of these columns changes. Logins write
+# users.last_login, which no cached response shows; bumping on it would empty the cache of every
+# per-user endpoint at each shift start.
+VERSIONED_COLUMNS = {'users': ('username', 'user_type_id', 'is_active')}
+DEFAULT_RESPONSE_CACHE_SIZE = 256
+
+_versions = TableVersion.__table__
+_responses = OrderedDict()
+_responses_lock = threading.Lock()
+
+
+def bump_table_versions(connection, tables):
+    """Increment the versions of tables on a connection, inside the caller's transaction"""
+    now = get_hk_time()
+    # Sorted, so concurrent transactions lock the rows in the same order
+    for table in sorted(tables):
+        result = connection.execute(
+            update(_versions).where(_versions.c.table_name == table)
+            .values(version=_versions.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(_versions).values(table_name=table, version=1, updated_at=now))
+
+
+def get_table_versions(tables):
+    """
+    Read the current versions of tables.
+
+    Returns:
+        tuple: ({table: version}, last modified datetime or None)
+    """
+    rows = db.session.execute(
+        select(_versions.c.table_name, _versions.c.version, _versions.c.updated_at)
+        .where(_versions.c.table_name.in_(tables))
+    ).all()
+    versions = {table: 0 for table in tables}
+    last_modified = None
+    for table, version, updated_at in rows:
+        versions[table] = version
+        if updated_at is not None:
+            if updated_at.tzinfo is None:
+                # SQLite drops the offset; timestamps are stored in Hong Kong time
+                updated_at = HK_TZ.localize(updated_at)
+            last_modified = max(last_modified, updated_at) if last_modified else updated_at
+    return versions, last_modified
+
+
+# Writes bump table_versions inside the writing transaction, so the new versions commit with them
+track_writes('http_cache', VERSIONED_TABLES, update_columns=VERSIONED_COLUMNS,
+             on_flush=lambda session, tables: bump_table_versions(session.connection(), tables))
+
+
+def _store_response(etag, response, max_size):
+    with _responses_lock:
+        _responses[etag] = (response.get_data(), response.status_code, response.mimetype)
+        _responses.move_to_end(etag)
+        while len(_responses) > max_size:
+            _responses.popitem(last=False)
+
+
+def _cached_response(etag):
+    with _responses_lock:
+        entry = _responses.get(etag)
+        if entry is not None:
+            _responses.move_to_end(etag)
+    return entry
+
+
+def clear_response_cache():
+    with _responses_lock:
+        _responses.clear()
+
+
+def conditional_cache(tables, per_user=False):
+    """
+    Serve GET requests of a view with ETag / Last-Modified validation and a response cache.
+    Other methods pass straight through. Put it below @jwt_required so the identity is known.
+
+    Args:
+        tables (tuple): Versioned tables the response is built from
+        per_user (bool): The response depends on the current user (e.g. their permissions)
+
+    Config:
+        HTTP_CACHE_ENABLED: Turn conditional GET and the response cache on or off (default True)
+        RESPONSE_CACHE_SIZE: Responses kept in memory per process (default 256)
+    """
+    unknown = set(tables) - set(VERSIONED_TABLES)
+    if unknown:
+        raise ValueError(f"Tables are not versioned: {', '.join(sorted(unknown))}")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or not current_app.config.get('HTTP_CACHE_ENABLED', True):
+                return view(*args, **kwargs)
+            from utils.metrics import record_cache_lookup
+
+            versions, last_modified = get_table_versions(tables)
+            user = get_jwt_identity() if per_user else None
+            # The database URL and modification time keep ETags distinct across rebuilt databases
+            key = repr((str(db.engine.url), request.endpoint, request.path,
+                        sorted(request.args.items(multi=True)), user, sorted(versions.items()),
+                        last_modified.isoformat() if last_modified else None))
+            etag = hashlib.sha1(key.encode()).hexdigest()[:24]
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and last_modified.replace(microsecond=0) <= request.if_modified_since)
+            if not_modified:
+                record_cache_lookup('http_not_modified', True)
+                response = Response(status=304)
+            else:
+                record_cache_lookup('http_not_modified', False)
+                entry = _cached_response(etag)
+                record_cache_lookup('http_response', entry is not None)
+                if entry is not None:
+                    data, status, mimetype = entry
+                    response = Response(data, status=status, mimetype=mimetype)
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    _store_response(etag, response,
+                                    current_app.config.get('RESPONSE_CACHE_SIZE', DEFAULT_RESPONSE_CACHE_SIZE))
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -3,7 +3,30 @@ Item utility functions for recursive operations
 """
 
 import json
-from models import Item
+from sqlalchemy import func
+from models import Item, Carton
+from utils.serializers import item_dict, stock_totals
+
+
+def get_parent_location(parent_id):
+    """
+    Resolve the lot and carton of an item placed under a parent.
+
+    Args:
+        parent_id (str): A carton ID or another item's ID
+
+    Returns:
+        tuple: (lot_id, carton_id), both None if the parent is unknown
+    """
+    if not parent_id:
+        return None, None
+    carton = Carton.query.get(parent_id)
+    if carton:
+        return carton.parent_lot_id, carton.id
+    parent_item = Item.query.get(parent_id)
+    if parent_item:
+        return parent_item.lot_id, parent_item.carton_id
+    return None, None
 
 
 def get_item_with_children_recursive(item_id):
@@ -18,20 +41,6 @@ def get_item_with_children_recursive(item_id):
               Returns empty list if item not found.
               Each item in the list is a dictionary with item details.
     """
-    def get_item_details(item):
-        """Convert Item model to dictionary"""
-        return {
-            'id': item.id,
-            'material_type_id': item.material_type_id,
-            'quantity': float(item.quantity),
-            'status': item.status,
-            'parent_id': item.parent_id,
-            'child_item_ids': item.child_item_ids,
-            'log_ids': item.log_ids,
-            'task_ids': item.task_ids,
-            'created_at': item.created_at.isoformat()
-        }
-
     def get_children_recursive(item, visited_ids=None):
         """
         Recursively get all children of an item.
@@ -64,7 +73,7 @@ def get_item_with_children_recursive(item_id):
             child_item = Item.query.get(child_id)
             if child_item:
                 # Add the child item itself
-                children.append(get_item_details(child_item))
+                children.append(item_dict(child_item))
 
                 # Recursively get the child's children
                 grandchildren = get_children_recursive(child_item, visited_ids.copy())
@@ -78,7 +87,7 @@ def get_item_with_children_recursive(item_id):
         return []
 
     # Start with the main item
-    result = [get_item_details(main_item)]
+    result = [item_dict(main_item)]
 
     # Get all children recursively
     children = get_children_recursive(main_item)
@@ -87,6 +96,58 @@ def get_item_with_children_recursive(item_id):
     return result
 
 
+def get_lot_items(carton_ids):
+    """
+    Get every item in a lot's cartons, with their children.
+
+    Args:
+        carton_ids (list): The lot's carton IDs
+
+    Returns:
+        list: Item dictionaries (see utils.serializers.item_dict), carton by carton
+    """
+    items = []
+    for carton_id in carton_ids:
+        # Items directly in the carton, each followed by its children
+        for item in Item.query.filter_by(parent_id=carton_id).all():
+            items.extend(get_item_with_children_recursive(item.id))
+    return items
+
+
+def get_item_summaries(group_column, *criteria, with_ids=False):
+    """
+    Stock totals of items grouped by their lot or carton, from one aggregate query.
+
+    Args:
+        group_column: Item.lot_id or Item.carton_id
+        *criteria: Filters on Item (default: all items)
+        with_ids (bool): Also return the item IDs of each group
+
+    Returns:
+        tuple: ({key: stock totals (see utils.serializers.stock_totals)},
+                {key: [item IDs in ID order]} or None)
+    """
+    counts = {}
+    quantities = {}
+    rows = Item.query.with_entities(group_column, Item.status, func.count(Item.id), func.sum(Item.quantity)) \
+        .filter(group_column.isnot(None), *criteria) \
+        .group_by(group_column, Item.status)
+    for key, status, count, quantity in rows:
+        counts.setdefault(key, {})[status] = count
+        quantities.setdefault(key, {})[status] = quantity or 0.0
+    summaries = {key: stock_totals(counts[key], quantities[key]) for key in counts}
+
+    item_ids = None
+    if with_ids:
+        item_ids = {}
+        rows = Item.query.with_entities(group_column, Item.id) \
+            .filter(group_column.isnot(None), *criteria) \
+            .order_by(group_column, Item.id)
+        for key, item_id in rows:
+            item_ids.setdefault(key, []).append(item_id)
+    return summaries, item_ids
+
+
 def get_item_hierarchy_tree(item_id):
     """
     Get an item and its children in a tree structure (nested format).
@@ -122,7 +183,7 @@ def get_item_hierarchy_tree(item_id):
 
         visited_ids.add(item.id)
 
-        item_dict = {
+        node = {
             'id': item.id,
             'material_type_id': item.material_type_id,
             'quantity': float(item.quantity),
@@ -130,7 +191,7 @@ def get_item_hierarchy_tree(item_id):
             'parent_id': item.parent_id,
             'log_ids': item.log_ids,
             'task_ids': item.task_ids,
-            'created_at': item.created_at.isoformat(),
+            'created_at': item.created_at,
             'children': []
         }
 
@@ -145,9 +206,9 @@ def get_item_hierarchy_tree(item_id):
             child_item = Item.query.get(child_id)
             if child_item:
                 child_tree = build_tree(child_item, visited_ids.copy())
-                item_dict['children'].append(child_tree)
+                node['children'].append(child_tree)
 
-        return item_dict
+        return node
 
     # Get the main item
     main_item = Item.query.get(item_id)
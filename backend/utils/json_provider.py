@@ -0,0 +1,86 @@
+"""
+JSON provider - orjson-backed response serialization with a stdlib fallback
+
+jsonify and every JSON response go through app.json. With orjson installed, responses are
+encoded in C straight to bytes; without it the stdlib encoder is used. Both render datetime and
+date values as ISO 8601 (the format the routes produced with isoformat()), so serializers can
+hand datetimes over unconverted. Keys are sorted as with Flask's default provider.
+
+Config:
+    JSON_PROVIDER: 'auto' (default: orjson when installed), 'orjson' or 'stdlib'; also read
+                   from the JSON_PROVIDER environment variable
+"""
+
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(o):
+    """Types neither encoder handles natively"""
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, tuple):
+        # namedtuple records (e.g. from the reference data cache)
+        return list(o)
+    return DefaultJSONProvider.default(o)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's provider, with ISO 8601 dates instead of HTTP dates"""
+
+    default = staticmethod(_default)
+
+    def dumps_compact(self, obj):
+        """Serialize obj without whitespace, as response() does outside debug mode"""
+        return self.dumps(obj, separators=(',', ':'))
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """Encodes with orjson; calls passing json.dumps keyword arguments use the stdlib encoder"""
+
+    def _options(self, pretty=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def dumps_compact(self, obj):
+        return self.dumps(obj)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(pretty))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def available_providers():
+    """Provider name -> class for the encoders installed here"""
+    providers = {'stdlib': StdlibJSONProvider}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider
+    return providers
+
+
+def init_json_provider(app):
+    """Install the JSON provider selected by the JSON_PROVIDER setting"""
+    name = app.config.get('JSON_PROVIDER') or 'auto'
+    providers = available_providers()
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in providers else 'stdlib'
+    if name not in providers:
+        raise RuntimeError(f"JSON_PROVIDER {name!r} is not available. Installed: {', '.join(providers)}")
+    app.json = providers[name](app)
+    app.config['JSON_PROVIDER'] = name
@@ -0,0 +1,209 @@
+"""
+List query utilities - shared cursor pagination, filtering and sorting for list endpoints
+"""
+
+import base64
+import json
+from datetime import datetime
+from flask import jsonify
+from sqlalchemy import and_, or_
+from utils.db_utils import json_list_contains
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class ListQueryError(ValueError):
+    """Invalid list query parameter. Routes return the message as a 400 response."""
+
+
+def _coerce(column, value):
+    """Convert a query string value to the Python type of a column"""
+    python_type = column.type.python_type
+    if python_type is datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ListQueryError(f"{column.key} must be an ISO date")
+    if python_type is bool:
+        if value.lower() not in ('true', 'false'):
+            raise ListQueryError(f"{column.key} must be true or false")
+        return value.lower() == 'true'
+    if python_type in (int, float):
+        try:
+            return python_type(value)
+        except ValueError:
+            raise ListQueryError(f"{column.key} must be a number")
+    return value
+
+
+def _encode_cursor(value, row_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, column):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ListQueryError('Invalid cursor')
+    if value is not None and not isinstance(value, bool):
+        value = _coerce(column, str(value))
+    return value, row_id
+
+
+def _after_cursor(column, pk, value, row_id, descending):
+    """
+    Keyset condition selecting rows after (value, row_id) in the sort order.
+    NULL sort values come first when ascending and last when descending.
+    """
+    if column is pk:
+        return pk < row_id if descending else pk > row_id
+
+    if descending:
+        if value is None:
+            return and_(column.is_(None), pk < row_id)
+        return or_(column < value, column.is_(None), and_(column == value, pk < row_id))
+
+    if value is None:
+        return or_(column.isnot(None), and_(column.is_(None), pk > row_id))
+    return or_(column > value, and_(column == value, pk > row_id))
+
+
+def apply_filters(query, args, filters):
+    """
+    Apply whitelisted filters from the request arguments.
+
+    Args:
+        query: SQLAlchemy query to filter
+        args: Request arguments (e.g. request.args)
+        filters (dict): Query parameter name -> (column, operator).
+                        Operators: 'eq', 'in' (comma separated values), 'ge', 'le', 'contains' (case-insensitive),
+                        'json_contains' (JSON-text list column holding the value)
+
+    Returns:
+        Query: The filtered query
+    """
+    for param, (column, op) in filters.items():
+        raw = args.get(param)
+        if raw is None or raw == '':
+            continue
+        if op == 'in':
+            query = query.filter(column.in_([_coerce(column, v) for v in raw.split(',') if v]))
+        elif op == 'contains':
+            # Case-insensitive on every backend, as SQLite's LIKE already is
+            query = query.filter(column.icontains(raw, autoescape=True))
+        elif op == 'json_contains':
+            query = query.filter(json_list_contains(column, raw))
+        elif op == 'ge':
+            query = query.filter(column >= _coerce(column, raw))
+        elif op == 'le':
+            query = query.filter(column <= _coerce(column, raw))
+        else:
+            query = query.filter(column == _coerce(column, raw))
+    return query
+
+
+def paginate(query, model, args, filters=None, sorts=None, default_sort='id',
+             default_limit=DEFAULT_PAGE_SIZE, max_limit=MAX_PAGE_SIZE, legacy_array=False):
+    """
+    Filter, sort and keyset-paginate a list query.
+
+    Query parameters read from args:
+        limit: page size, clamped to max_limit
+        cursor: opaque next_cursor value from the previous page
+        sort: a whitelisted sort key, prefixed with '-' for descending order
+        include_total: 'true' to count all matching rows
+        plus any parameter named in filters
+
+    Args:
+        query: Base SQLAlchemy query selecting model
+        model: The model class being listed (its id column breaks sort ties)
+        args: Request arguments (e.g. request.args)
+        filters (dict, optional): Whitelisted filters, see apply_filters
+        sorts (dict, optional): Sort key -> column. 'id' is always allowed
+        default_sort (str): Sort key used when none is requested
+        default_limit (int): Page size used when none is requested
+        max_limit (int): Largest page size a client may request
+        legacy_array (bool): For lists that returned a bare array before pagination: without a
+                             limit or cursor parameter, return up to max_limit rows as a bare
+                             array (see list_response), so existing clients keep working while
+                             the response stays bounded
+
+    Returns:
+        tuple: (list of rows, page dict with next_cursor, limit, optional total and, for an
+               unpaged legacy request, unpaged=True)
+
+    Raises:
+        ListQueryError: If a parameter is invalid
+    """
+    unpaged = legacy_array and not args.get('limit') and not args.get('cursor')
+    try:
+        limit = int(args.get('limit', max_limit if unpaged else default_limit))
+    except ValueError:
+        raise ListQueryError('limit must be an integer')
+    limit = max(1, min(limit, max_limit))
+
+    pk = model.id
+    sorts = dict(sorts or {})
+    sorts.setdefault('id', pk)
+    sort_key = args.get('sort') or default_sort
+    descending = sort_key.startswith('-')
+    sort_key = sort_key.lstrip('-')
+    if sort_key not in sorts:
+        raise ListQueryError(f"Unknown sort: {sort_key}. Allowed: {', '.join(sorted(sorts))}")
+    column = sorts[sort_key]
+
+    query = apply_filters(query, args, filters or {})
+    total = query.count() if args.get('include_total', '').lower() == 'true' else None
+
+    if args.get('cursor'):
+        value, row_id = _decode_cursor(args['cursor'], column)
+        query = query.filter(_after_cursor(column, pk, value, row_id, descending))
+
+    if column is pk:
+        order = [pk.desc() if descending else pk.asc()]
+    elif descending:
+        order = [column.desc().nullslast(), pk.desc()]
+    else:
+        order = [column.asc().nullsfirst(), pk.asc()]
+
+    rows = query.order_by(*order).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(getattr(last, column.key), last.id)
+
+    page = {'next_cursor': next_cursor, 'limit': limit}
+    if total is not None:
+        page['total'] = total
+    if unpaged:
+        page['unpaged'] = True
+    return rows, page
+
+
+def list_envelope(items, page):
+    """
+    Build the standard list response body: {"items": [...], "next_cursor", "limit", "total"?}.
+    An unpaged legacy request (see paginate) gets the bare list of items.
+    """
+    if page.get('unpaged'):
+        return items
+    return {'items': items, **page}
+
+
+def list_response(items, page):
+    """
+    JSON response for a list (see list_envelope). A bare-array legacy response that was cut off at
+    the page size carries the cursor of the next page in an X-Next-Cursor header.
+    """
+    response = jsonify(list_envelope(items, page))
+    if page.get('unpaged') and page['next_cursor']:
+        response.headers['X-Next-Cursor'] = page['next_cursor']
+    return response
@@ -0,0 +1,298 @@
+"""
+Metrics - request, database, label and cache metrics in Prometheus text exposition format
+
+Values are written to per-thread shards, so recording a sample takes no lock: each thread only
+touches its own dict and the scrape adds the shards up. Shards of finished threads are folded
+into a retired shard at scrape time. Label sets for every endpoint are registered at startup;
+the request hooks only look up a prepared key.
+"""
+
+import hmac
+import os
+import threading
+import time
+import weakref
+from flask import g, request, Response, abort
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_LIVE_SHARDS = 256
+# Headers set by reverse proxies; without METRICS_TOKEN, requests carrying one are refused
+FORWARDED_HEADERS = ('X-Forwarded-For', 'X-Real-IP', 'Forwarded')
+
+_local = threading.local()
+_shards = []  # (weakref to thread, shard dict)
+_retired = {}
+_shards_lock = threading.Lock()
+_registry = []
+_gauges = {}
+
+
+def _shard():
+    shard = getattr(_local, 'values', None)
+    if shard is None:
+        shard = _local.values = {}
+        with _shards_lock:
+            # Servers that start a thread per request would otherwise grow the list until the next scrape
+            if len(_shards) >= MAX_LIVE_SHARDS:
+                _retire_dead_shards()
+            _shards.append((weakref.ref(threading.current_thread()), shard))
+    return shard
+
+
+def _retire_dead_shards():
+    """Fold the shards of exited threads into the retired shard. Caller holds _shards_lock."""
+    alive = []
+    for thread_ref, shard in _shards:
+        thread = thread_ref()
+        if thread is None or not thread.is_alive():
+            _merge(_retired, shard)
+        else:
+            alive.append((thread_ref, shard))
+    _shards[:] = alive
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.label_sets = set()
+        _registry.append(self)
+
+    def register(self, labels):
+        """Pre-register a label set so it is exported (as 0) before the first sample"""
+        self.label_sets.add(tuple(labels))
+
+    def inc(self, labels=(), amount=1):
+        shard = _shard()
+        key = (self.name, labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0]
+            self.label_sets.add(labels)
+        values[0] += amount
+
+    def _empty(self):
+        return [0]
+
+    def _samples(self, labels, values):
+        yield self.name, labels, values[0]
+
+
+class Histogram(Counter):
+    """Histogram with cumulative buckets, a sum and a count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        shard = _shard()
+        key = (self.name, labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = self._empty()
+            self.label_sets.add(labels)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                values[i] += 1
+                break
+        else:
+            values[len(self.buckets)] += 1
+        values[-1] += value
+
+    def _empty(self):
+        # One slot per bucket, one for +Inf, then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def _samples(self, labels, values):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), values):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield f'{self.name}_bucket', labels + (('le', le),), cumulative
+        yield f'{self.name}_sum', labels, values[-1]
+        yield f'{self.name}_count', labels, cumulative
+
+
+def register_gauge(name, help_text, callback, labelnames=()):
+    """
+    Register a gauge that is evaluated at scrape time. Registering a name again replaces it.
+
+    Args:
+        name (str): Metric name
+        help_text (str): HELP line
+        callback: Function returning a number, or a dict of label value tuple -> number
+        labelnames (tuple): Label names when callback returns a dict
+    """
+    _gauges[name] = (help_text, callback, tuple(labelnames))
+
+
+# Metrics recorded by the request hooks and by the modules that own the measured work
+HTTP_REQUESTS = Counter('inlinks_http_requests_total', 'HTTP requests handled',
+                        ('blueprint', 'endpoint', 'method', 'status'))
+HTTP_ERRORS = Counter('inlinks_http_request_errors_total', 'HTTP requests answered with a 5xx status',
+                      ('blueprint', 'endpoint'))
+HTTP_LATENCY = Histogram('inlinks_http_request_duration_seconds', 'HTTP request latency',
+                         ('blueprint', 'endpoint'))
+DB_QUERIES = Counter('inlinks_db_queries_total', 'SQL statements executed by requests', ('blueprint',))
+DB_TIME = Histogram('inlinks_db_request_time_seconds', 'Database time per request', ('blueprint',))
+LABEL_RENDER = Histogram('inlinks_label_render_seconds', 'Label PDF render time', ('kind',))
+CACHE_REQUESTS = Counter('inlinks_cache_requests_total', 'Cache lookups', ('cache', 'result'))
+COMPRESSION_TIME = Histogram('inlinks_http_compression_cpu_seconds', 'CPU time spent compressing a response body',
+                             ('encoding',), buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+COMPRESSION_BYTES = Counter('inlinks_http_compression_bytes_total',
+                            'Response body bytes before (in) and after (out) compression', ('encoding', 'stage'))
+
+
+def record_cache_lookup(cache, hit):
+    """Count a cache hit or miss for the cache hit rate"""
+    CACHE_REQUESTS.inc((cache, 'hit' if hit else 'miss'))
+
+
+def _collect():
+    """Add up all shards. Shards of threads that have exited are folded into the retired shard."""
+    totals = {}
+    with _shards_lock:
+        _retire_dead_shards()
+        _merge(totals, _retired)
+        for _, shard in _shards:
+            _merge(totals, shard)
+    return totals
+
+
+def _merge(target, shard):
+    for key, values in list(shard.items()):
+        current = target.get(key)
+        if current is None:
+            target[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, labels):
+    """Format label values; entries past the named labels are extra (name, value) pairs such as le"""
+    pairs = list(zip(names, labels)) + list(labels[len(names):])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render_metrics():
+    """Render all metrics in Prometheus text exposition format"""
+    totals = _collect()
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for labels in sorted(metric.label_sets):
+            values = totals.get((metric.name, labels)) or metric._empty()
+            for sample_name, sample_labels, value in metric._samples(labels, values):
+                lines.append(f'{sample_name}{_format_labels(metric.labelnames, sample_labels)} {value}')
+
+    for name, (help_text, callback, labelnames) in _gauges.items():
+        try:
+            value = callback()
+        except Exception:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        if isinstance(value, dict):
+            for labels, sample in sorted(value.items()):
+                lines.append(f'{name}{_format_labels(labelnames, labels)} {sample}')
+        else:
+            lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _pool_stats(engine):
+    pool = engine.pool
+    stats = {}
+    for stat in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, stat):
+            stats[(stat,)] = getattr(pool, stat)()
+    return stats
+
+
+def init_metrics(app, engine):
+    """
+    Record request metrics for an app and expose them on GET /metrics.
+    Register after init_query_stats so the per-request query statistics are still available.
+
+    Config:
+        METRICS_ENABLED: Turn metrics on or off (default True)
+        METRICS_ALLOWED_IPS: Client addresses allowed to scrape /metrics (default localhost only)
+        METRICS_TOKEN: Bearer token scrapers must send (default: the METRICS_TOKEN environment
+                       variable). Behind a reverse proxy on the same host every client arrives
+                       from 127.0.0.1, so the address check alone does not protect /metrics.
+                       Without a token, only direct local requests that carry no proxy
+                       forwarding header are served.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    allowed_ips = set(app.config.get('METRICS_ALLOWED_IPS', ('127.0.0.1', '::1')))
+    token = app.config.get('METRICS_TOKEN') or os.environ.get('METRICS_TOKEN')
+    if not token:
+        app.logger.warning('METRICS_TOKEN is not set: /metrics only answers direct local requests')
+
+    def metrics():
+        if request.remote_addr not in allowed_ips:
+            abort(403)
+        if token:
+            scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+                abort(401)
+        elif any(header in request.headers for header in FORWARDED_HEADERS):
+            # Proxied request: the remote address is the proxy's, not the client's
+            abort(403)
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics, methods=['GET'])
+
+    # Pre-register the label sets of every endpoint
+    endpoint_labels = {}
+    for rule in app.url_map.iter_rules():
+        blueprint = rule.endpoint.rsplit('.', 1)[0] if '.' in rule.endpoint else 'app'
+        endpoint_labels[rule.endpoint] = (blueprint, rule.endpoint)
+        HTTP_LATENCY.register((blueprint, rule.endpoint))
+        HTTP_ERRORS.register((blueprint, rule.endpoint))
+    for blueprint in {labels[0] for labels in endpoint_labels.values()}:
+        DB_QUERIES.register((blueprint,))
+        DB_TIME.register((blueprint,))
+    unmatched = ('none', 'none')
+
+    register_gauge('inlinks_db_pool_connections', 'Database connection pool state',
+                   lambda: _pool_stats(engine), ('state',))
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        labels = endpoint_labels.get(request.endpoint, unmatched)
+        HTTP_LATENCY.observe(labels, time.perf_counter() - start)
+        HTTP_REQUESTS.inc(labels + (request.method, f'{response.status_code // 100}xx'))
+        if response.status_code >= 500:
+            HTTP_ERRORS.inc(labels)
+
+        stats = g.get('query_stats')
+        if stats is not None:
+            DB_QUERIES.inc(labels[:1], stats['count'])
+            DB_TIME.observe(labels[:1], stats['db_time'])
+        return response
@@ -0,0 +1,178 @@
+"""
+Schema migrations - numbered schema changes applied once per database and recorded in schema_version
+
+Each migration runs in its own transaction and is written so it also succeeds on databases
+whose tables were created by db.create_all() before migrations existed: version 0 means
+"unknown", and every step checks what is already there.
+
+Add a migration by appending a function decorated with @migration(<next number>, <description>).
+"""
+
+from sqlalchemy import inspect, select, text, Table, Column, Integer, String, DateTime, MetaData
+from sqlalchemy.exc import DBAPIError
+from models import db, get_hk_time
+from utils.search_index import rebuild_search_index
+
+_version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function taking a connection. Versions must be added in order."""
+    def register(func):
+        if MIGRATIONS and version != MIGRATIONS[-1][0] + 1:
+            raise ValueError(f'Migration {version} does not follow {MIGRATIONS[-1][0]}')
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def get_schema_version(conn):
+    """Return the highest applied migration, or 0 for a database without a schema_version table"""
+    if not inspect(conn).has_table('schema_version'):
+        return 0
+    return conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+
+
+def check_schema(engine=None):
+    """
+    Compare the database schema version with the latest migration. One query on a current database.
+
+    Returns:
+        tuple: (database version, latest version)
+    """
+    engine = engine or db.engine
+    with engine.connect() as conn:
+        try:
+            current = conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+        except DBAPIError:
+            # No schema_version table yet
+            current = 0
+    return current, latest_version()
+
+
+def migrate(engine=None, target=None, logger=None):
+    """
+    Apply pending migrations up to target (default: the latest).
+
+    Args:
+        engine: SQLAlchemy engine (default: db.engine)
+        target (int, optional): Version to migrate to
+        logger (optional): Logger for progress messages
+
+    Returns:
+        list: Versions applied by this call
+    """
+    engine = engine or db.engine
+    target = latest_version() if target is None else target
+    with engine.begin() as conn:
+        _version_metadata.create_all(conn)
+
+    applied = []
+    for version, description, func in MIGRATIONS:
+        if version > target:
+            break
+        with engine.begin() as conn:
+            # Checked inside the transaction, so a process that lost a race skips what the winner applied
+            if get_schema_version(conn) >= version:
+                continue
+            func(conn)
+            conn.execute(schema_version.insert().values(version=version, description=description,
+                                                        applied_at=get_hk_time()))
+        applied.append(version)
+        if logger:
+            logger.info(f'Applied migration {version}: {description}')
+    return applied
+
+
+def _create_indexes(conn, tables=None):
+    """Create every index declared on the models that the database does not have yet"""
+    for table in db.metadata.sorted_tables:
+        if tables and table.name not in tables:
+            continue
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+@migration(1, 'Create tables')
+def create_tables(conn):
+    db.metadata.create_all(conn)
+
+
+@migration(2, 'Add denormalized lot_id and carton_id to items')
+def add_item_location_columns(conn):
+    item_columns = {column['name'] for column in inspect(conn).get_columns('items')}
+    location_columns = {'lot_id': 'lots', 'carton_id': 'cartons'}
+    missing = [column for column in location_columns if column not in item_columns]
+    for column in missing:
+        conn.execute(text(
+            f'ALTER TABLE items ADD COLUMN {column} VARCHAR(20) REFERENCES {location_columns[column]} (id)'
+        ))
+    if missing:
+        backfill_item_locations(conn)
+
+
+def backfill_item_locations(conn):
+    """Set lot_id/carton_id on items from their carton, then propagate them down to split children level by level"""
+    conn.execute(text(
+        'UPDATE items SET '
+        'lot_id = COALESCE(lot_id, (SELECT cartons.parent_lot_id FROM cartons WHERE cartons.id = items.parent_id)), '
+        'carton_id = COALESCE(carton_id, parent_id) '
+        'WHERE (lot_id IS NULL OR carton_id IS NULL) AND parent_id IN (SELECT id FROM cartons)'
+    ))
+    while True:
+        result = conn.execute(text(
+            'UPDATE items SET '
+            'lot_id = COALESCE(lot_id, (SELECT parent.lot_id FROM items AS parent WHERE parent.id = items.parent_id)), '
+            'carton_id = COALESCE(carton_id, (SELECT parent.carton_id FROM items AS parent WHERE parent.id = items.parent_id)) '
+            'WHERE (lot_id IS NULL OR carton_id IS NULL) '
+            'AND parent_id IN (SELECT id FROM items WHERE lot_id IS NOT NULL AND carton_id IS NOT NULL)'
+        ))
+        if result.rowcount == 0:
+            break
+
+
+@migration(3, 'Index foreign-key and filter columns')
+def add_foreign_key_and_filter_indexes(conn):
+    # Item parent/status/material type, lot material type, task/subtask/work order assignee,
+    # stock log task, process log parents and date, plus the composite stock indexes
+    _create_indexes(conn)
+    # Refresh planner statistics so the new indexes are picked up
+    conn.execute(text('ANALYZE'))
+
+
+@migration(4, 'Full-text search index')
+def add_search_index(conn):
+    # SQLite with FTS5 only; elsewhere search falls back to LIKE matching
+    rebuild_search_index(conn)
+
+
+@migration(5, 'Table version counters for HTTP caching')
+def add_table_versions(conn):
+    from models import TableVersion
+    from utils.http_cache import VERSIONED_TABLES
+    TableVersion.__table__.create(conn, checkfirst=True)
+    existing = set(conn.execute(select(TableVersion.table_name)).scalars())
+    now = get_hk_time()
+    rows = [{'table_name': table, 'version': 1, 'updated_at': now}
+            for table in VERSIONED_TABLES if table not in existing]
+    if rows:
+        conn.execute(TableVersion.__table__.insert(), rows)
+
+
+@migration(6, 'ID sequence counters')
+def add_id_sequences(conn):
+    # Rows are created by generate_id on first use, from the highest ID in the table at that time
+    from models import IdSequence
+    IdSequence.__table__.create(conn, checkfirst=True)
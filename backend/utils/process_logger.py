@@ -1,17 +1,17 @@
 from datetime import datetime
 import json
 from __init__ import db
-from models import ProcessLog, LogType, User, Project, WorkOrder, Task, SubTask
+from models import ProcessLog, User, Project, WorkOrder, Task, SubTask
 from utils.db_utils import generate_id
+from utils.reference_cache import get_log_type_ids
 
 class ProcessLogger:
     """Enhanced process logger for tracking all changes in projects, work orders, tasks, and subtasks"""
 
     @staticmethod
     def get_log_types():
-        """Retrieve log types from the database as a dict {type: id}"""
-        log_types = LogType.query.all()
-        return {lt.type: lt.id for lt in log_types}
+        """Log types as a dict {type: id}, from the reference data cache"""
+        return get_log_type_ids()
 
     @property
     def LOG_TYPES(self):
@@ -0,0 +1,141 @@
+"""
+Query statistics - per-request SQL query counting and slow request logging
+
+Counts the statements each request runs and the time spent in the database, keeps the
+slowest statements with the line of application code that issued them, and writes a
+JSON line to a rotating log when a request is slow or runs too many queries.
+In debug mode (or with QUERY_STATS_HEADERS) the figures are also sent as response headers.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THIS_FILE = os.path.abspath(__file__)
+
+slow_request_logger = logging.getLogger('inlinks.slow_requests')
+
+
+def _call_site():
+    """Return 'path:line in function' for the innermost backend frame outside this module"""
+    frame = sys._getframe(2)
+    while frame:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(BACKEND_DIR) and filename != THIS_FILE:
+            return f"{os.path.relpath(filename, BACKEND_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_stats' in g:
+        context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context() or 'query_stats' not in g:
+        return
+    start = getattr(context, '_query_stats_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = g.query_stats
+    stats['count'] += 1
+    stats['db_time'] += elapsed
+
+    # Keep the N slowest statements; only these pay for the call site lookup
+    slowest = stats['slowest']
+    if len(slowest) < stats['top_n'] or elapsed > slowest[-1]['ms'] / 1000:
+        slowest.append({
+            'ms': round(elapsed * 1000, 3),
+            'statement': ' '.join(statement.split())[:500],
+            'call_site': _call_site(),
+        })
+        slowest.sort(key=lambda s: s['ms'], reverse=True)
+        del slowest[stats['top_n']:]
+
+
+def get_query_stats():
+    """Get the statistics of the current request, or None outside a request"""
+    if has_request_context():
+        return g.get('query_stats')
+    return None
+
+
+def init_query_stats(app, engine):
+    """
+    Hook query statistics into an app and its database engine.
+
+    Config:
+        QUERY_STATS_ENABLED: Turn the instrumentation on or off (default True)
+        QUERY_STATS_HEADERS: Send X-Query-Count / X-Query-Time-Ms / Server-Timing headers
+                             (default: only when app.debug is on)
+        QUERY_STATS_TOP_N: Number of slowest statements kept per request (default 5)
+        SLOW_REQUEST_MS: Log requests slower than this (default 500)
+        SLOW_REQUEST_QUERY_COUNT: Log requests running at least this many queries (default 50)
+        SLOW_REQUEST_LOG: Log file, relative to the instance folder (default slow_requests.log)
+        SLOW_REQUEST_LOG_MAX_BYTES / SLOW_REQUEST_LOG_BACKUP_COUNT: Log rotation (default 5 MB x 5)
+    """
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if not slow_request_logger.handlers:
+        log_path = os.path.join(app.instance_path, app.config.get('SLOW_REQUEST_LOG', 'slow_requests.log'))
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        handler = RotatingFileHandler(
+            log_path,
+            maxBytes=app.config.get('SLOW_REQUEST_LOG_MAX_BYTES', 5 * 1024 * 1024),
+            backupCount=app.config.get('SLOW_REQUEST_LOG_BACKUP_COUNT', 5)
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        slow_request_logger.addHandler(handler)
+        slow_request_logger.setLevel(logging.INFO)
+        slow_request_logger.propagate = False
+
+    top_n = app.config.get('QUERY_STATS_TOP_N', 5)
+    slow_ms = app.config.get('SLOW_REQUEST_MS', 500)
+    slow_query_count = app.config.get('SLOW_REQUEST_QUERY_COUNT', 50)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = {'count': 0, 'db_time': 0.0, 'slowest': [], 'top_n': top_n,
+                         'start': time.perf_counter()}
+
+    @app.after_request
+    def finish_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+
+        total_ms = (time.perf_counter() - stats['start']) * 1000
+        db_ms = stats['db_time'] * 1000
+
+        if app.config.get('QUERY_STATS_HEADERS', app.debug):
+            response.headers['X-Query-Count'] = str(stats['count'])
+            response.headers['X-Query-Time-Ms'] = f'{db_ms:.1f}'
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{stats["count"]} queries", total;dur={total_ms:.1f}'
+            )
+
+        if total_ms >= slow_ms or stats['count'] >= slow_query_count:
+            slow_request_logger.info(json.dumps({
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(total_ms, 1),
+                'query_count': stats['count'],
+                'db_time_ms': round(db_ms, 1),
+                'slowest': stats['slowest'],
+            }))
+        return response
@@ -0,0 +1,147 @@
+"""
+Reference data cache - material types, process state types and log types held in memory
+
+These tables have a few dozen rows and change rarely, but routes and loggers look them up once
+per item or per field. The cache loads each table with one query and serves lookups from dicts
+of immutable records, so callers never share ORM instances across sessions.
+
+A commit in this process that writes one of the tables drops its cached copy (write-through).
+Writes by other processes are picked up through the table_versions counters (see
+utils/http_cache.py), checked at most every REFERENCE_CACHE_CHECK_SECONDS.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from models import MaterialType, ProcessStateType, LogType
+from utils.write_tracking import track_writes
+from __init__ import db
+
+DEFAULT_CHECK_SECONDS = 5
+
+MaterialTypeRecord = namedtuple('MaterialTypeRecord', ['id', 'material_name', 'material_unit', 'created_at'])
+ProcessStateRecord = namedtuple('ProcessStateRecord', [
+    'id', 'state_name', 'state_type', 'description', 'bg_color', 'text_color', 'icon', 'order_index',
+    'is_active', 'created_at'])
+LogTypeRecord = namedtuple('LogTypeRecord', ['id', 'type', 'description', 'created_at'])
+
+# Table -> (model, record type)
+_SOURCES = {
+    'material_types': (MaterialType, MaterialTypeRecord),
+    'process_state_types': (ProcessStateType, ProcessStateRecord),
+    'log_types': (LogType, LogTypeRecord),
+}
+
+_lock = threading.Lock()
+# (engine, table) -> {'records': {id: record}, 'by_state': {...} for process states, 'version': int}
+_tables = {}
+_generations = {table: 0 for table in _SOURCES}
+_last_check = {}  # engine -> monotonic time of the last version check
+
+
+def invalidate_reference_cache(*tables):
+    """Drop cached tables (all of them by default); the next lookup reloads them"""
+    with _lock:
+        tables = set(tables or _SOURCES)
+        for table in tables:
+            _generations[table] += 1
+        for key in [key for key in _tables if key[1] in tables]:
+            del _tables[key]
+
+
+def _check_versions(engine):
+    """Drop tables changed by other processes, at most once per REFERENCE_CACHE_CHECK_SECONDS"""
+    from utils.http_cache import get_table_versions
+
+    interval = current_app.config.get('REFERENCE_CACHE_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+    now = time.monotonic()
+    if now - _last_check.get(engine, 0.0) < interval:
+        return
+    _last_check[engine] = now
+    with _lock:
+        cached = {table: entry['version'] for (cached_engine, table), entry in _tables.items()
+                  if cached_engine is engine}
+    if not cached:
+        return
+    with db.session.no_autoflush:
+        versions, _ = get_table_versions(tuple(cached))
+    stale = [table for table, version in cached.items() if versions[table] != version]
+    if stale:
+        invalidate_reference_cache(*stale)
+
+
+def _entry(table):
+    """The cache entry of a table, loading the table if needed"""
+    from utils.http_cache import get_table_versions
+    from utils.metrics import record_cache_lookup
+
+    engine = db.engine
+    _check_versions(engine)
+    with _lock:
+        entry = _tables.get((engine, table))
+        generation = _generations[table]
+    record_cache_lookup('reference', entry is not None)
+    if entry is not None:
+        return entry
+
+    model, record_type = _SOURCES[table]
+    # Lookups happen in the middle of route handlers; don't flush their pending changes early
+    with db.session.no_autoflush:
+        # Read the version first: a write landing between the two queries only causes an extra reload
+        versions, _ = get_table_versions((table,))
+        rows = model.query.order_by(model.id).all()
+    records = {row.id: record_type(*(getattr(row, field) for field in record_type._fields)) for row in rows}
+    entry = {'records': records, 'version': versions[table]}
+    if table == 'process_state_types':
+        by_state = {}
+        for record in records.values():
+            by_state.setdefault((record.state_type, record.state_name), record)
+        entry['by_state'] = by_state
+    with _lock:
+        # Skip storing if a commit invalidated the table while it was loading
+        if _generations[table] == generation:
+            _tables[(engine, table)] = entry
+    return entry
+
+
+def get_material_type(material_type_id):
+    """
+    Look up a material type by ID.
+
+    Returns:
+        MaterialTypeRecord: The material type, or None if it does not exist
+    """
+    if material_type_id is None:
+        return None
+    return _entry('material_types')['records'].get(material_type_id)
+
+
+def get_material_types():
+    """All material types as {id: MaterialTypeRecord}"""
+    return _entry('material_types')['records']
+
+
+def get_process_state(state_type, state_name):
+    """
+    Look up a process state by its type and name, e.g. ('task', 'completed').
+
+    Returns:
+        ProcessStateRecord: The first matching state by ID, or None
+    """
+    return _entry('process_state_types')['by_state'].get((state_type, state_name))
+
+
+def get_process_states(state_type):
+    """All process states of a type, in ID order"""
+    return [record for record in _entry('process_state_types')['records'].values()
+            if record.state_type == state_type]
+
+
+def get_log_type_ids():
+    """Log type IDs by type name, e.g. {'CREATE': 'LT001'}"""
+    return {record.type: record.id for record in _entry('log_types')['records'].values()}
+
+
+# Commits in this process drop the cached copies of the tables they wrote
+track_writes('reference_cache', _SOURCES, on_commit=lambda tables: invalidate_reference_cache(*tables))
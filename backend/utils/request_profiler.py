@@ -0,0 +1,128 @@
+"""
+Request profiler - opt-in profiling of a single request for admins
+
+Send the header ``X-Profile: stacks`` (or the query flag ``?_profile=stacks``) to sample the
+request's stack and store collapsed stacks for flamegraph tools, or ``cprofile`` to store a
+cProfile report. Only users with the admin.profile permission can trigger it; for everyone
+else the flag is ignored. Requests without the flag only pay for one header and one argument lookup.
+"""
+
+import io
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from flask import g, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from models import User
+from utils.auth_middleware import has_permission
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ARG = '_profile'
+PROFILE_MODES = ('stacks', 'cprofile')
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of another thread at a fixed interval and counts collapsed stacks"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if self._stopped.is_set():
+                break
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def report(self):
+        """Collapsed stack lines: 'outer;inner;leaf count'"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _is_profiling_admin():
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        return False
+    user = User.query.get(get_jwt_identity())
+    return bool(user and user.is_active and has_permission(user, 'admin.profile'))
+
+
+def init_request_profiler(app):
+    """
+    Register the request profiling hooks.
+
+    Config:
+        PROFILING_ENABLED: Allow admins to profile requests (default True)
+        PROFILE_DIR: Where reports are written, relative to the instance folder (default profiles)
+        PROFILE_SAMPLE_INTERVAL_MS: Stack sampling interval (default 5, the interpreter's thread switch interval)
+    """
+    if not app.config.get('PROFILING_ENABLED', True):
+        return
+
+    profile_dir = os.path.join(app.instance_path, app.config.get('PROFILE_DIR', 'profiles'))
+    interval = app.config.get('PROFILE_SAMPLE_INTERVAL_MS', 5) / 1000
+
+    @app.before_request
+    def start_profiler():
+        mode = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_ARG)
+        if not mode:
+            return
+        if mode not in PROFILE_MODES or not _is_profiling_admin():
+            return
+
+        if mode == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), interval)
+            profiler.start()
+        g.request_profiler = (mode, profiler, time.perf_counter())
+
+    @app.after_request
+    def stop_profiler(response):
+        if 'request_profiler' not in g:
+            return response
+        mode, profiler, start = g.pop('request_profiler')
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if mode == 'cprofile':
+            import pstats
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(50)
+            content, extension = report.getvalue(), 'txt'
+        else:
+            profiler.stop()
+            content, extension = profiler.report(), 'collapsed'
+
+        os.makedirs(profile_dir, exist_ok=True)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'none'}-{uuid.uuid4().hex[:8]}.{extension}"
+        with open(os.path.join(profile_dir, filename), 'w') as f:
+            f.write(content)
+
+        response.headers['X-Profile-Report'] = filename
+        response.headers['X-Profile-Duration-Ms'] = f'{elapsed_ms:.1f}'
+        return response
@@ -0,0 +1,275 @@
+"""
+Search index - full-text search over projects, work orders, tasks, items, lots and users
+
+On SQLite every searchable row has a document in search_documents, indexed by the FTS5 table
+search_index. Triggers on the source tables keep the documents in sync, so ORM writes, bulk
+updates and raw inserts are all picked up. The tables and triggers are created together with
+the model tables (db.create_all) and by migration 4 on existing databases.
+
+Other databases, and SQLite builds without FTS5, fall back to case-insensitive LIKE matching
+without ranking.
+"""
+
+import base64
+import json
+import re
+from sqlalchemy import event, inspect, literal, select, union_all, cast, or_, String, text
+from models import db, Project, WorkOrder, Task, Item, Lot, User, MaterialType
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Entity type -> (table, title, body, status, columns whose updates change the document).
+# Expressions are SQL with {row} standing for the source row (NEW in triggers, the table in backfills).
+_MATERIAL = "(SELECT material_name FROM material_types WHERE id = {row}.material_type_id)"
+_UNIT = "(SELECT material_unit FROM material_types WHERE id = {row}.material_type_id)"
+SEARCH_SOURCES = {
+    'project': ('projects', "{row}.project_name", "{row}.id || ' ' || COALESCE({row}.description, '')",
+                "NULL", ('project_name', 'description')),
+    'work_order': ('work_orders', "{row}.work_order_name", "{row}.id || ' ' || COALESCE({row}.description, '')",
+                   "NULL", ('work_order_name', 'description')),
+    'task': ('tasks', "{row}.task_name", "{row}.id || ' ' || COALESCE({row}.description, '')",
+             "NULL", ('task_name', 'description')),
+    'item': ('items', f"{_MATERIAL} || ' (' || {{row}}.quantity || ' ' || {_UNIT} || ')'",
+             "{row}.id || ' ' || COALESCE({row}.label, '')",
+             "{row}.status", ('material_type_id', 'quantity', 'label', 'status')),
+    'lot': ('lots', "{row}.factory_lot_number", f"{{row}}.id || ' ' || COALESCE({_MATERIAL}, '')",
+            "NULL", ('factory_lot_number', 'material_type_id')),
+    'user': ('users', "{row}.username", "{row}.id", "NULL", ('username',)),
+}
+
+# Accepted values of the type parameter -> entity types
+SEARCH_TYPES = {
+    'projects': ('project',), 'work_orders': ('work_order',), 'tasks': ('task',),
+    'items': ('item',), 'lots': ('lot',), 'users': ('user',),
+}
+SEARCH_TYPES['all'] = tuple(SEARCH_SOURCES)
+
+_index_available = {}
+
+
+class SearchQueryError(ValueError):
+    """Invalid search parameter. Routes return the message as a 400 response."""
+
+
+def _search_ddl():
+    statements = [
+        'CREATE TABLE IF NOT EXISTS search_documents ('
+        'id INTEGER PRIMARY KEY, entity_type VARCHAR(20) NOT NULL, entity_id VARCHAR(20) NOT NULL, '
+        'title TEXT, body TEXT, status VARCHAR(20), UNIQUE (entity_type, entity_id))',
+        # External-content index: the text lives in search_documents only. Prefix indexes make
+        # two- and three-character prefix queries (e.g. "ca*") cheap.
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, body, content='search_documents', content_rowid='id', tokenize='unicode61', prefix='2 3')",
+        'CREATE TRIGGER IF NOT EXISTS search_documents_insert AFTER INSERT ON search_documents BEGIN '
+        'INSERT INTO search_index(rowid, title, body) VALUES (NEW.id, NEW.title, NEW.body); END',
+        'CREATE TRIGGER IF NOT EXISTS search_documents_delete AFTER DELETE ON search_documents BEGIN '
+        "INSERT INTO search_index(search_index, rowid, title, body) VALUES ('delete', OLD.id, OLD.title, OLD.body); END",
+        'CREATE TRIGGER IF NOT EXISTS search_documents_update AFTER UPDATE ON search_documents BEGIN '
+        "INSERT INTO search_index(search_index, rowid, title, body) VALUES ('delete', OLD.id, OLD.title, OLD.body); "
+        'INSERT INTO search_index(rowid, title, body) VALUES (NEW.id, NEW.title, NEW.body); END',
+    ]
+    for entity_type, (table, title, body, status, columns) in SEARCH_SOURCES.items():
+        values = {key: expression.format(row='NEW') for key, expression in
+                  (('title', title), ('body', body), ('status', status))}
+        statements += [
+            f'CREATE TRIGGER IF NOT EXISTS search_{table}_insert AFTER INSERT ON {table} BEGIN '
+            f'INSERT INTO search_documents(entity_type, entity_id, title, body, status) '
+            f"VALUES ('{entity_type}', NEW.id, {values['title']}, {values['body']}, {values['status']}); END",
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN "
+            f"UPDATE search_documents SET title = {values['title']}, body = {values['body']}, status = {values['status']} "
+            f"WHERE entity_type = '{entity_type}' AND entity_id = NEW.id; END",
+            f'CREATE TRIGGER IF NOT EXISTS search_{table}_delete AFTER DELETE ON {table} BEGIN '
+            f"DELETE FROM search_documents WHERE entity_type = '{entity_type}' AND entity_id = OLD.id; END",
+        ]
+    # A renamed material type changes the text of its items and lots; touching the rows fires their triggers
+    statements.append(
+        'CREATE TRIGGER IF NOT EXISTS search_material_types_update '
+        'AFTER UPDATE OF material_name, material_unit ON material_types BEGIN '
+        'UPDATE items SET material_type_id = material_type_id WHERE material_type_id = NEW.id; '
+        'UPDATE lots SET material_type_id = material_type_id WHERE material_type_id = NEW.id; END'
+    )
+    return statements
+
+
+def fts5_supported(conn):
+    return conn.dialect.name == 'sqlite' and bool(
+        conn.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar())
+
+
+def create_search_index(conn):
+    """Create the search tables and triggers if missing. Does nothing without SQLite FTS5."""
+    if not fts5_supported(conn):
+        return False
+    for statement in _search_ddl():
+        conn.exec_driver_sql(statement)
+    _index_available.clear()
+    return True
+
+
+def drop_search_index(conn):
+    if conn.dialect.name != 'sqlite':
+        return
+    # Triggers on the source tables are dropped with those tables
+    conn.exec_driver_sql('DROP TABLE IF EXISTS search_index')
+    conn.exec_driver_sql('DROP TABLE IF EXISTS search_documents')
+    _index_available.clear()
+
+
+def rebuild_search_index(conn):
+    """Recreate every search document from the source tables"""
+    if not create_search_index(conn):
+        return
+    conn.exec_driver_sql('DELETE FROM search_documents')
+    for entity_type, (table, title, body, status, _) in SEARCH_SOURCES.items():
+        conn.exec_driver_sql(
+            f'INSERT INTO search_documents(entity_type, entity_id, title, body, status) '
+            f"SELECT '{entity_type}', id, {title.format(row=table)}, {body.format(row=table)}, "
+            f'{status.format(row=table)} FROM {table}'
+        )
+    conn.exec_driver_sql("INSERT INTO search_index(search_index) VALUES ('optimize')")
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_with_models(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_with_models(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def has_search_index(engine):
+    """Whether the database has the FTS5 index (checked once per engine)"""
+    if engine not in _index_available:
+        _index_available[engine] = inspect(engine).has_table('search_documents')
+    return _index_available[engine]
+
+
+def _match_expression(query):
+    """Turn user input into an FTS5 query: every word must match as a prefix"""
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _encode_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps({'o': offset}).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return max(0, int(json.loads(base64.urlsafe_b64decode(padded.encode()))['o']))
+    except (ValueError, TypeError, KeyError):
+        raise SearchQueryError('Invalid cursor')
+
+
+def _fts_search(match, entity_types, limit, offset, include_total):
+    type_params = {f'type_{n}': entity_type for n, entity_type in enumerate(entity_types)}
+    where = (f"search_index MATCH :match AND d.entity_type IN "
+             f"({', '.join(':' + name for name in type_params)})")
+    params = dict(type_params, match=match, limit=limit + 1, offset=offset)
+    # bm25 ranks lower-is-better; a title match weighs ten times a match in the body
+    rows = db.session.execute(text(
+        'SELECT d.entity_type, d.entity_id, d.title, d.status, bm25(search_index, 10.0, 1.0) AS score '
+        'FROM search_index JOIN search_documents AS d ON d.id = search_index.rowid '
+        f'WHERE {where} ORDER BY score, d.entity_type, d.entity_id LIMIT :limit OFFSET :offset'
+    ), params).all()
+    total = None
+    if include_total:
+        total = db.session.execute(text(
+            'SELECT COUNT(*) FROM search_index JOIN search_documents AS d ON d.id = search_index.rowid '
+            f'WHERE {where}'
+        ), params).scalar()
+    return [(entity_type, entity_id, title, status, round(-score, 4))
+            for entity_type, entity_id, title, status, score in rows], total
+
+
+def _like_selects(query):
+    def matching(entity_type, entity_id, title, status, *columns):
+        return select(literal(entity_type, String).label('entity_type'), entity_id.label('entity_id'),
+                      title.label('title'), status.label('status')) \
+            .where(or_(*(column.icontains(query, autoescape=True) for column in columns)))
+
+    item_title = MaterialType.material_name + ' (' + cast(Item.quantity, String) + ' ' \
+        + MaterialType.material_unit + ')'
+    no_status = literal(None, String)
+    return {
+        'project': matching('project', Project.id, Project.project_name, no_status, Project.project_name, Project.id),
+        'work_order': matching('work_order', WorkOrder.id, WorkOrder.work_order_name, no_status,
+                               WorkOrder.work_order_name, WorkOrder.id),
+        'task': matching('task', Task.id, Task.task_name, no_status, Task.task_name, Task.id),
+        'item': matching('item', Item.id, item_title, Item.status,
+                         MaterialType.material_name, Item.label, Item.id).join_from(Item, MaterialType),
+        'lot': matching('lot', Lot.id, Lot.factory_lot_number, no_status, Lot.factory_lot_number, Lot.id),
+        'user': matching('user', User.id, User.username, no_status, User.username, User.id),
+    }
+
+
+def _like_search(query, entity_types, limit, offset, include_total):
+    selects = _like_selects(query)
+    combined = union_all(*(selects[entity_type] for entity_type in entity_types)).subquery()
+    rows = db.session.execute(
+        select(combined).order_by(combined.c.entity_type, combined.c.entity_id).limit(limit + 1).offset(offset)
+    ).all()
+    total = None
+    if include_total:
+        total = db.session.execute(select(db.func.count()).select_from(combined)).scalar()
+    return [(entity_type, entity_id, title, status, None) for entity_type, entity_id, title, status in rows], total
+
+
+def search(args):
+    """
+    Search entities by name, ID, label, material and lot number.
+
+    Query parameters read from args:
+        q: search text; every word matches as a prefix ("cab cat" finds "Cable Cat6")
+        type: all (default), projects, work_orders, tasks, items, lots or users
+        limit: page size, clamped to MAX_PAGE_SIZE
+        cursor: opaque next_cursor value from the previous page
+        include_total: 'true' to count all matches
+
+    Args:
+        args: Request arguments (e.g. request.args)
+
+    Returns:
+        tuple: (list of result dicts, page dict with next_cursor, limit and optional total).
+               Results are ranked by relevance when the full-text index is available.
+
+    Raises:
+        SearchQueryError: If a parameter is invalid
+    """
+    entity_types = SEARCH_TYPES.get(args.get('type', 'all'))
+    if entity_types is None:
+        raise SearchQueryError(f"Unknown type. Allowed: {', '.join(sorted(SEARCH_TYPES))}")
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise SearchQueryError('limit must be an integer')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = _decode_cursor(args['cursor']) if args.get('cursor') else 0
+    include_total = args.get('include_total', '').lower() == 'true'
+
+    query = args.get('q', '').strip()
+    match = _match_expression(query)
+    if not match:
+        rows, total = [], 0
+    elif has_search_index(db.engine):
+        rows, total = _fts_search(match, entity_types, limit, offset, include_total)
+    else:
+        rows, total = _like_search(query, entity_types, limit, offset, include_total)
+
+    results = []
+    for entity_type, entity_id, title, status, score in rows[:limit]:
+        result = {'id': entity_id, 'name': title, 'type': entity_type}
+        if status is not None:
+            result['status'] = status
+        if score is not None:
+            result['score'] = score
+        results.append(result)
+
+    page = {'next_cursor': _encode_cursor(offset + limit) if len(rows) > limit else None, 'limit': limit}
+    if include_total:
+        page['total'] = total
+    return results, page
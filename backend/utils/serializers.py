@@ -0,0 +1,131 @@
+"""
+Model serializers shared by the inventory blueprints
+
+Datetimes are returned as datetime objects; the JSON provider (utils/json_provider.py) renders
+them as ISO 8601 strings while encoding the response.
+"""
+
+ITEM_STATUSES = ('available', 'used', 'assigned')
+INCLUDE_MODES = ('none', 'ids', 'full')
+
+
+def item_dict(item):
+    """
+    Convert an Item to the dictionary the item, lot and carton endpoints return.
+
+    Args:
+        item (Item): The item
+
+    Returns:
+        dict: id, material_type_id, quantity, status, parent_id, child_item_ids, log_ids,
+              task_ids and created_at
+    """
+    return {
+        'id': item.id,
+        'material_type_id': item.material_type_id,
+        'quantity': float(item.quantity),
+        'status': item.status,
+        'parent_id': item.parent_id,
+        'child_item_ids': item.child_item_ids,
+        'log_ids': item.log_ids,
+        'task_ids': item.task_ids,
+        'created_at': item.created_at,
+    }
+
+
+def item_location_dict(item):
+    """item_dict plus the item's location: parent_type ('carton' or 'item'), lot_id and carton_id"""
+    data = item_dict(item)
+    parent_type = None
+    if item.parent_id:
+        # Parent type comes from the denormalized location columns
+        parent_type = 'carton' if item.parent_id == item.carton_id else 'item'
+    data['parent_type'] = parent_type
+    data['lot_id'] = item.lot_id
+    data['carton_id'] = item.carton_id
+    return data
+
+
+def stock_totals(counts, quantities):
+    """
+    Shape item counts and quantities per status into the stock fields of lots and cartons.
+
+    Args:
+        counts (dict): Item count per status
+        quantities (dict): Total quantity per status
+
+    Returns:
+        dict: total_items, <status>_items, total_quantity and <status>_quantity for available,
+              used and assigned
+    """
+    summary = {'total_items': sum(counts.values())}
+    summary.update((f'{status}_items', counts.get(status, 0)) for status in ITEM_STATUSES)
+    summary['total_quantity'] = float(sum(quantities.values()))
+    summary.update((f'{status}_quantity', float(quantities.get(status, 0))) for status in ITEM_STATUSES)
+    return summary
+
+
+def stock_summary(items):
+    """
+    Count items and sum their quantities per status, in one pass.
+
+    Args:
+        items (list): Item dictionaries (see item_dict)
+
+    Returns:
+        dict: See stock_totals
+    """
+    counts = {}
+    quantities = {}
+    total_quantity = 0.0
+    for item in items:
+        status = item['status']
+        counts[status] = counts.get(status, 0) + 1
+        quantities[status] = quantities.get(status, 0.0) + item['quantity']
+        total_quantity += item['quantity']
+    summary = stock_totals(counts, quantities)
+    # Summed in item order, so the total does not depend on the grouping by status
+    summary['total_quantity'] = float(total_quantity)
+    return summary
+
+
+def parse_include(args, default='full'):
+    """
+    Read the include parameter, which controls how the items of a lot or carton are embedded:
+    'full' (every item dictionary), 'ids' (item IDs only) or 'none'.
+
+    Raises:
+        ValueError: If include names an unknown mode
+    """
+    include = args.get('include', default).lower()
+    if include not in INCLUDE_MODES:
+        raise ValueError(f"Unknown include '{include}'. Use one of: {', '.join(INCLUDE_MODES)}")
+    return include
+
+
+def lot_dict(lot, carton_ids, summary):
+    """
+    Convert a Lot to the dictionary the lot endpoints return, with stock totals of its items.
+
+    Args:
+        lot (Lot): The lot
+        carton_ids (list): The lot's carton IDs
+        summary (dict): Stock totals of the lot's items (see stock_totals)
+
+    Returns:
+        dict: Lot fields, carton_count and the stock totals
+    """
+    data = {
+        'id': lot.id,
+        'material_type_id': lot.material_type_id,
+        'factory_lot_number': lot.factory_lot_number,
+        'carton_count': len(carton_ids),
+    }
+    data.update(summary)
+    data.update({
+        'carton_ids': carton_ids,
+        'log_ids': lot.log_ids,
+        'created_at': lot.created_at,
+        'created_user_id': lot.created_user_id,
+    })
+    return data
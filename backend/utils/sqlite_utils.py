@@ -0,0 +1,155 @@
+"""
+SQLite connection profile - pragmas applied to every new connection and a periodic WAL checkpoint
+
+With the default rollback journal a writer locks out every reader, so concurrent requests fail
+with "database is locked". In WAL mode readers and a single writer overlap, and busy_timeout makes
+a second writer wait for the lock instead of failing immediately.
+
+Every setting can be overridden with an environment variable of the same name, e.g.
+SQLITE_BUSY_TIMEOUT_MS=10000, or through create_app's config_overrides.
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+
+# Config key -> default
+SQLITE_DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',          # durable at checkpoints; safe from corruption in WAL mode
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_CACHE_SIZE_KB': 64 * 1024,
+    # Off by default: process and stock logs keep the IDs of deleted projects, tasks, lots and items,
+    # so deletes fail once SQLite enforces the references. Set to true on databases that pass
+    # PRAGMA foreign_key_check and whose deletes clean up their logs.
+    'SQLITE_FOREIGN_KEYS': False,
+    'SQLITE_TEMP_STORE': 'MEMORY',
+    'SQLITE_CHECKPOINT_INTERVAL': 300,       # seconds between WAL checkpoints, 0 to disable
+}
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def load_sqlite_config(config):
+    """
+    Fill the SQLITE_* settings in an app config from the environment, keeping values that were
+    already set (e.g. by config_overrides) and falling back to SQLITE_DEFAULTS.
+    """
+    for key, default in SQLITE_DEFAULTS.items():
+        if key in config:
+            continue
+        value = os.environ.get(key)
+        if value is None:
+            config[key] = default
+        elif isinstance(default, bool):
+            config[key] = _as_bool(value)
+        elif isinstance(default, int):
+            config[key] = int(value)
+        else:
+            config[key] = value
+
+
+def build_pragmas(config):
+    """
+    Build the PRAGMA statements for a connection.
+
+    Returns:
+        list: PRAGMA statements in the order they are applied
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA foreign_keys = {'ON' if _as_bool(config['SQLITE_FOREIGN_KEYS']) else 'OFF'}",
+        f"PRAGMA temp_store = {config['SQLITE_TEMP_STORE']}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+        # A negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}",
+    ]
+    return pragmas
+
+
+def is_sqlite(engine):
+    return engine.dialect.name == 'sqlite'
+
+
+def is_memory_database(engine):
+    return engine.url.database in (None, '', ':memory:')
+
+
+def configure_sqlite(app, engine):
+    """
+    Apply the SQLite profile to every connection the engine opens. Does nothing for other databases.
+    Connections that are already open (e.g. from create_all) are not affected, so the engine's pool
+    is disposed once the listener is in place.
+    """
+    if not is_sqlite(engine):
+        return
+
+    load_sqlite_config(app.config)
+    pragmas = build_pragmas(app.config)
+    if is_memory_database(engine):
+        # An in-memory database has no journal file to put in WAL mode
+        pragmas = [pragma for pragma in pragmas if 'journal_mode' not in pragma and 'mmap_size' not in pragma]
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    if not is_memory_database(engine):
+        engine.dispose()
+
+
+def checkpoint(engine, mode='PASSIVE'):
+    """
+    Copy WAL pages back into the database file.
+
+    Args:
+        engine: SQLAlchemy engine
+        mode (str): PASSIVE never waits for readers; TRUNCATE also resets the WAL file
+
+    Returns:
+        tuple: (busy, wal pages, checkpointed pages) as reported by SQLite
+    """
+    with engine.connect() as conn:
+        row = conn.exec_driver_sql(f'PRAGMA wal_checkpoint({mode})').fetchone()
+    return tuple(row) if row else None
+
+
+def start_wal_checkpointer(app, engine):
+    """
+    Start a daemon thread that checkpoints the WAL every SQLITE_CHECKPOINT_INTERVAL seconds.
+    SQLite checkpoints automatically at commit time, but a steady stream of readers can keep the
+    WAL from ever being reset; a periodic TRUNCATE checkpoint keeps it from growing without bound.
+    Disabled when the interval is 0, for in-memory databases and when not in WAL mode.
+    """
+    interval = app.config.get('SQLITE_CHECKPOINT_INTERVAL', 0)
+    if (not interval or not is_sqlite(engine) or is_memory_database(engine)
+            or str(app.config.get('SQLITE_JOURNAL_MODE', '')).upper() != 'WAL'):
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                result = checkpoint(engine, 'TRUNCATE')
+                if result and result[0]:
+                    # Readers were still using the WAL; the next run picks up what was left
+                    app.logger.info(f"WAL checkpoint incomplete: {result[2]} of {result[1]} pages")
+            except Exception as e:
+                app.logger.error(f"WAL checkpoint failed: {str(e)}")
+
+    checkpointer = threading.Thread(target=run, name='sqlite-wal-checkpoint', daemon=True)
+    checkpointer.start()
+    return checkpointer
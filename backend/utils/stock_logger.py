@@ -1,17 +1,17 @@
 from datetime import datetime
 import json
 from __init__ import db
-from models import StockLog, LogType, User, Lot, Carton, Item, MaterialType
+from models import StockLog, User, Lot, Carton, Item
 from utils.db_utils import generate_id
+from utils.reference_cache import get_material_type, get_log_type_ids
 
 class StockLogger:
     """Enhanced stock logger for tracking all changes in lots, cartons, and items"""
 
     @staticmethod
     def get_log_types():
-        """Retrieve log types from the database as a dict {type: id}"""
-        log_types = LogType.query.all()
-        return {lt.type: lt.id for lt in log_types}
+        """Log types as a dict {type: id}, from the reference data cache"""
+        return get_log_type_ids()
 
     @property
     def LOG_TYPES(self):
@@ -74,8 +74,8 @@ class StockLogger:
                     change_summary.append(f"child items changed from {old_count} to {new_count}")
                 elif field == 'material_type_id':
                     # Get material type names for better readability
-                    old_material = MaterialType.query.get(change['old']) if change['old'] else None
-                    new_material = MaterialType.query.get(change['new']) if change['new'] else None
+                    old_material = get_material_type(change['old']) if change['old'] else None
+                    new_material = get_material_type(change['new']) if change['new'] else None
                     old_name = old_material.material_name if old_material else 'Unknown'
                     new_name = new_material.material_name if new_material else 'Unknown'
                     change_summary.append(f"material type changed from '{old_name}' to '{new_name}'")
@@ -117,7 +117,7 @@ class StockLogger:
         elif entity_type == 'carton':
             return f"Carton {entity.id}"
         elif entity_type == 'item':
-            material = MaterialType.query.get(entity.material_type_id) if hasattr(entity, 'material_type_id') else None
+            material = get_material_type(entity.material_type_id) if hasattr(entity, 'material_type_id') else None
             material_name = material.material_name if material else 'Unknown'
             return f"Item {entity.id} ({material_name}, {entity.quantity} units)"
         return f"{entity_type.title()} {entity.id}"
@@ -0,0 +1,110 @@
+"""
+Streaming JSON responses for large listings
+
+A streamed response encodes and sends its elements one at a time while the rows are still being
+fetched, so peak memory no longer grows with the size of the result. Two formats are offered:
+
+    json   - a JSON array, the same document as the buffered response
+    ndjson - one JSON document per line (application/x-ndjson)
+
+Clients ask for a stream with ?stream=json or ?stream=ndjson, or with an
+Accept: application/x-ndjson header. The status and headers are sent before the first row is
+read, so an error part way through cannot change them: an NDJSON stream then ends with an
+{"error": ..., "details": ...} line and a JSON array stream is cut off (and fails to parse).
+
+Request metrics and query counts only cover the work done before the body starts streaming.
+"""
+
+from flask import current_app, request, stream_with_context
+
+STREAM_FORMATS = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+# Rows fetched from the database cursor per round trip
+STREAM_BATCH_SIZE = 500
+# Encoded bytes collected before a chunk is written to the client
+CHUNK_BYTES = 64 * 1024
+
+
+class StreamFormatError(ValueError):
+    """Raised for an unknown stream format"""
+
+
+def stream_format(args=None):
+    """
+    The stream format a request asks for.
+
+    Args:
+        args (MultiDict): Query parameters (default: request.args)
+
+    Returns:
+        str: 'json', 'ndjson' or None for a buffered response
+
+    Raises:
+        StreamFormatError: If the stream parameter names an unknown format
+    """
+    args = request.args if args is None else args
+    value = args.get('stream')
+    if value is None:
+        accept = request.accept_mimetypes
+        if accept.quality(STREAM_FORMATS['ndjson']) > accept.quality(STREAM_FORMATS['json']):
+            return 'ndjson'
+        return None
+    value = value.lower()
+    if value in ('', '0', 'false', 'no'):
+        return None
+    if value in ('1', 'true', 'yes'):
+        return 'json'
+    if value not in STREAM_FORMATS:
+        raise StreamFormatError(f"Unknown stream format '{value}'. Use one of: {', '.join(STREAM_FORMATS)}")
+    return value
+
+
+def _chunks(elements, fmt):
+    dumps = current_app.json.dumps_compact
+    if fmt == 'json':
+        opening, separator, closing = '[', ',', ']\n'
+    else:
+        opening, separator, closing = '', '\n', '\n'
+
+    buffer = [opening]
+    size = 0
+    first = True
+    try:
+        for element in elements:
+            encoded = dumps(element)
+            buffer.append(encoded if first else separator + encoded)
+            first = False
+            size += len(encoded) + 1
+            if size >= CHUNK_BYTES:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+    except Exception as e:
+        current_app.logger.exception(f'Streaming {request.path} failed')
+        if fmt == 'ndjson':
+            error = dumps({'error': 'Stream interrupted', 'details': str(e)})
+            buffer.append(error if first else separator + error)
+            buffer.append(closing)
+        yield ''.join(buffer)
+        return
+    if fmt == 'ndjson' and first:
+        closing = ''
+    buffer.append(closing)
+    yield ''.join(buffer)
+
+
+def stream_response(elements, fmt):
+    """
+    Stream an iterable of JSON-serializable elements.
+
+    The iterable is consumed while the response is sent, inside the request's app context, so
+    it can keep reading from the database session (e.g. a query run with yield_per).
+
+    Args:
+        elements (iterable): The elements, typically a generator over a database cursor
+        fmt (str): 'json' or 'ndjson' (see stream_format)
+
+    Returns:
+        Response: A streamed response without Content-Length
+    """
+    return current_app.response_class(stream_with_context(_chunks(elements, fmt)),
+                                      mimetype=STREAM_FORMATS[fmt])
@@ -0,0 +1,113 @@
+"""
+Write tracking - one set of Session listeners reporting which tables a transaction writes
+
+The HTTP cache (table_versions), the reference data cache and the dashboard counter cache all
+react to writes of particular tables. Rather than each scanning session.new / dirty / deleted on
+every flush, they register with track_writes and this module scans once per flush:
+
+    on_flush(session, tables)  runs inside the transaction after a flush or a bulk
+                               Query.update() / Query.delete() that wrote any of the tables
+    on_commit(tables)          runs after the commit, with every tracked table the transaction wrote
+
+Rolling back the whole transaction discards the tables collected for on_commit. Rolling back only
+a savepoint (session.begin_nested) keeps them: the tables written before it still have to be
+reported, and those written inside it are at worst invalidated once too often.
+"""
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+_subscribers = []
+
+
+class _Subscriber:
+    def __init__(self, name, tables, on_flush, on_commit, update_columns):
+        self.name = name
+        self.tables = frozenset(tables)
+        self.on_flush = on_flush
+        self.on_commit = on_commit
+        self.update_columns = update_columns or {}
+
+
+def track_writes(name, tables, on_flush=None, on_commit=None, update_columns=None):
+    """
+    Subscribe to writes of tables.
+
+    Args:
+        name (str): Unique subscriber name (keys the tables pending until commit)
+        tables (iterable): Table names to track
+        on_flush (callable, optional): on_flush(session, tables) inside the transaction
+        on_commit (callable, optional): on_commit(tables) after the commit
+        update_columns (dict, optional): Table -> columns; an update of such a table only counts
+                                         when one of these columns changed (inserts and deletes
+                                         always count)
+    """
+    # Registering a name again (e.g. a reloaded module) replaces the earlier subscriber
+    _subscribers[:] = [subscriber for subscriber in _subscribers if subscriber.name != name]
+    _subscribers.append(_Subscriber(name, tables, on_flush, on_commit, update_columns))
+
+
+def _table_name(obj):
+    table = getattr(obj, '__table__', None)
+    return table.name if table is not None else None
+
+
+def _changed(obj, columns):
+    attrs = inspect(obj).attrs
+    return any(attrs[column].history.has_changes() for column in columns)
+
+
+def _report(session, subscriber, tables):
+    if subscriber.on_commit is not None:
+        session.info.setdefault('written_tables', {}).setdefault(subscriber.name, set()).update(tables)
+    if subscriber.on_flush is not None:
+        subscriber.on_flush(session, tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_tables(session, flush_context):
+    inserted_or_deleted = {_table_name(obj) for obj in session.new}
+    inserted_or_deleted.update(_table_name(obj) for obj in session.deleted)
+    updated = {}
+    for obj in session.dirty:
+        updated.setdefault(_table_name(obj), []).append(obj)
+
+    for subscriber in _subscribers:
+        tables = inserted_or_deleted & subscriber.tables
+        for table in (updated.keys() & subscriber.tables) - tables:
+            columns = subscriber.update_columns.get(table)
+            if columns is None or any(_changed(obj, columns) for obj in updated[table]):
+                tables.add(table)
+        if tables:
+            _report(session, subscriber, tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_writes(orm_execute_state):
+    # Query.update() / Query.delete() bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None:
+            return
+        table = mapper.local_table.name
+        for subscriber in _subscribers:
+            if table in subscriber.tables:
+                _report(orm_execute_state.session, subscriber, {table})
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_commit(session):
+    written = session.info.pop('written_tables', None)
+    if not written:
+        return
+    for subscriber in _subscribers:
+        tables = written.get(subscriber.name)
+        if tables:
+            subscriber.on_commit(tables)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    # after_rollback would also fire for a savepoint rolled back inside a transaction that goes on
+    if not previous_transaction.nested and previous_transaction.parent is None:
+        session.info.pop('written_tables', None)
@@ -19,12 +19,15 @@ import LogButton from "../componenets/LogButton.jsx";
 import api from "../services/api.js";
 import { backgroundVariants } from "../utils/styles.js";
 
+const PAGE_SIZE = 50;
+
 const ItemOverview = () => {
   const [searchParams] = useSearchParams();
   const statusFilter = searchParams.get("status") || "all";
   const cartonId = searchParams.get("carton_id");
 
   const [items, setItems] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [materialTypes, setMaterialTypes] = useState([]);
   const [cartonInfo, setCartonInfo] = useState(null);
   const [cartonStat, setCartonStat] = useState(null);
@@ -67,6 +70,25 @@ const ItemOverview = () => {
     fetchItems();
   }, []);
 
+  // Status filter is applied on the server when browsing all items
+  useEffect(() => {
+    if (!cartonId && !isLoading) {
+      fetchItemsPage(null).catch((err) => setError(err.message));
+    }
+  }, [selectedStatus]);
+
+  const fetchItemsPage = async (cursor) => {
+    const params = { limit: PAGE_SIZE };
+    if (cursor) params.cursor = cursor;
+    if (selectedStatus !== "all") params.status = selectedStatus;
+
+    const response = await api.getItems(params);
+    const page = await response.json();
+    setItems((prev) => (cursor ? [...prev, ...page.items] : page.items));
+    setNextCursor(page.next_cursor);
+    if (!cursor) setVisibleCount(10);
+  };
+
   const fetchItems = async () => {
     try {
       if (cartonId) {
@@ -116,36 +138,26 @@ const ItemOverview = () => {
           setError(itemsResponse.status);
         }
       } else {
-        // Original logic for all items
-        const [itemsResponse, materialTypesResponse] = await Promise.all([
-          api.getAllItems(),
+        // Items are loaded page by page, stats come from the aggregated quantities
+        const [materialTypesResponse, quantitiesResponse] = await Promise.all([
           api.getMaterialTypes(),
+          api.getMaterialTypeQuantity(),
+          fetchItemsPage(null),
         ]);
 
-        if (itemsResponse.ok && materialTypesResponse.ok) {
-          const itemsData = await itemsResponse.json();
+        if (materialTypesResponse.ok && quantitiesResponse.ok) {
           const materialTypesData = await materialTypesResponse.json();
+          const quantitiesData = await quantitiesResponse.json();
+          const quantities = quantitiesData.material_type_quantities || [];
 
-          setItems(itemsData || []);
           setMaterialTypes(materialTypesData || []);
 
-          // Calculate stats
-          const totalItems = itemsData.length;
-          const availableItems = itemsData.filter(
-            (item) => item.status === "available",
-          ).length;
-          const assignedItems = itemsData.filter(
-            (item) => item.status === "assigned",
-          ).length;
-          const usedItems = itemsData.filter(
-            (item) => item.status === "used",
-          ).length;
-
+          const sum = (key) => quantities.reduce((acc, q) => acc + q[key], 0);
           setStats({
-            totalItems,
-            availableItems,
-            assignedItems,
-            usedItems,
+            totalItems: sum("total_items"),
+            availableItems: sum("available_items"),
+            assignedItems: sum("assigned_items"),
+            usedItems: sum("used_items"),
           });
         } else {
           setError("Failed to load data");
@@ -222,13 +234,22 @@ const ItemOverview = () => {
     return materialType ? materialType.material_unit : "";
   };
 
-  const handleShowMore = () => setVisibleCount((prev) => prev + 10);
+  const handleShowMore = async () => {
+    if (!cartonId && nextCursor && visibleCount + 10 > filteredItems.length) {
+      try {
+        await fetchItemsPage(nextCursor);
+      } catch (err) {
+        console.error("Error fetching more items:", err);
+      }
+    }
+    setVisibleCount((prev) => prev + 10);
+  };
 
   // Filter items based on search term and status
   const filteredItems = items.filter((item) => {
     const matchesSearch =
       item.id.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      item.lot_id.toLowerCase().includes(searchTerm.toLowerCase()) ||
+      (item.lot_id || "").toLowerCase().includes(searchTerm.toLowerCase()) ||
       (item.material_name &&
         item.material_name.toLowerCase().includes(searchTerm.toLowerCase()));
 
@@ -584,7 +605,8 @@ const ItemOverview = () => {
                       ))}
                     </tbody>
                   </table>
-                  {visibleCount < filteredItems.length && (
+                  {(visibleCount < filteredItems.length ||
+                    (!cartonId && nextCursor)) && (
                     <div className="flex justify-center py-4">
                       <button
                         onClick={handleShowMore}
@@ -652,7 +674,8 @@ const ItemOverview = () => {
                       </div>
                     </motion.div>
                   ))}
-                  {visibleCount < filteredItems.length && (
+                  {(visibleCount < filteredItems.length ||
+                    (!cartonId && nextCursor)) && (
                     <div className="col-span-full flex justify-center py-4">
                       <button
                         onClick={handleShowMore}
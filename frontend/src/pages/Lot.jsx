@@ -48,42 +48,37 @@ const Lot = () => {
 
   const fetchLotDetails = async () => {
     try {
-      // Fetch lot details
-      const lotResponse = await api.getLotsById(lotId);
+      // Lot details and its cartons in one round trip
+      const response = await api.batch([
+        { id: "lot", path: `/api/lots/${lotId}` },
+        { id: "cartons", path: `/api/cartons/lot/${lotId}?include=none` },
+      ]);
 
-      if (!lotResponse.ok) {
-        setError(lotResponse.status);
-        setIsLoading(false);
+      if (!response.ok) {
+        setError(response.status);
         return;
       }
 
-      const lotData = await lotResponse.json();
-      setLot(lotData);
+      const { responses } = await response.json();
+      const [lotResult, cartonsResult] = responses;
 
-      // Fetch cartons for this lot using the new API endpoint
-      await fetchCartons();
-    } catch (err) {
-      setError(err.message);
-      console.error("Error fetching lot details:", err);
-    } finally {
-      setIsLoading(false);
-    }
-  };
-
-  const fetchCartons = async () => {
-    try {
-      const response = await api.getCartonByLotId(lotId);
+      if (lotResult.status !== 200) {
+        setError(lotResult.status);
+        return;
+      }
+      setLot(lotResult.body);
 
-      if (response.ok) {
-        const data = await response.json();
-        setCartons(data.cartons || []);
+      if (cartonsResult.status === 200) {
+        setCartons(cartonsResult.body.cartons || []);
       } else {
         console.error("Failed to fetch cartons");
         setCartons([]);
       }
     } catch (err) {
-      console.error("Error fetching cartons:", err);
-      setCartons([]);
+      setError(err.message);
+      console.error("Error fetching lot details:", err);
+    } finally {
+      setIsLoading(false);
     }
   };
 
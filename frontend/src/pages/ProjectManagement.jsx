@@ -62,38 +62,29 @@ const ProjectManagement = () => {
       setIsLoading(true);
       setError("");
 
-      const response = await api.getAllProjects();
-
-      if (response.ok) {
-        const projectsData = await response.json();
-
-        // Ensure projectsData is always an array
-        const projects = Array.isArray(projectsData) ? projectsData : [];
-        setProjects(projects);
-
-        // Calculate stats
-        const totalProjects = projects.length;
-        const activeProjects = projects.filter(
-          (project) => project.state?.state_name === "active",
-        ).length;
-        const completedProjects = projects.filter(
-          (project) => project.state?.state_name === "completed",
-        ).length;
-        const pendingProjects = projects.filter(
-          (project) => project.state?.state_name === "pending",
-        ).length;
-
-        setStats({
-          totalProjects,
-          activeProjects,
-          completedProjects,
-          pendingProjects,
-        });
-      } else {
-        setError(response.status);
-      }
+      const projects = await api.getAllProjectPages();
+      setProjects(projects);
+
+      // Calculate stats
+      const totalProjects = projects.length;
+      const activeProjects = projects.filter(
+        (project) => project.state?.state_name === "active",
+      ).length;
+      const completedProjects = projects.filter(
+        (project) => project.state?.state_name === "completed",
+      ).length;
+      const pendingProjects = projects.filter(
+        (project) => project.state?.state_name === "pending",
+      ).length;
+
+      setStats({
+        totalProjects,
+        activeProjects,
+        completedProjects,
+        pendingProjects,
+      });
     } catch (err) {
-      setError(err.message);
+      setError(err.status || err.message);
       console.error("Error fetching projects:", err);
     } finally {
       setIsLoading(false);
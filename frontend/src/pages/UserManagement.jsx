@@ -69,18 +69,15 @@ const UserManagement = () => {
 
   const fetchUsers = async () => {
     try {
-      const response = await api.getUsers();
-
-      if (response.ok) {
-        const data = await response.json();
-        console.log("Fetched Users:", data);
-        setUsers(data || []);
-      } else {
-        setMessage({ type: "error", text: "無法載入用戶列表" });
-      }
+      const users = await api.getAllUserPages();
+      console.log("Fetched Users:", users);
+      setUsers(users);
     } catch (error) {
       console.error("Error fetching users:", error);
-      setMessage({ type: "error", text: "網絡錯誤，請重試" });
+      setMessage({
+        type: "error",
+        text: error.status ? "無法載入用戶列表" : "網絡錯誤，請重試",
+      });
     } finally {
       setIsLoading(false);
     }
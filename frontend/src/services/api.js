@@ -13,7 +13,9 @@ export async function get(endpoint, withAuth = false) {
     headers: { ...headers },
   });
   if (!response.ok) {
-    throw new Error(`GET ${endpoint} failed: ${response.status}`);
+    const error = new Error(`GET ${endpoint} failed: ${response.status}`);
+    error.status = response.status;
+    throw error;
   }
   return response;
 }
@@ -83,6 +85,33 @@ export async function del(endpoint, withAuth = false) {
   return response;
 }
 
+// GET every page of a cursor-paginated list ({ items, next_cursor }) and return all items.
+// Throws (with error.status for HTTP errors) instead of returning a partial list.
+export async function getAllPages(endpoint, params = {}, withAuth = false) {
+  const items = [];
+  let cursor = null;
+  do {
+    const query = new URLSearchParams({
+      limit: 500,
+      ...params,
+      ...(cursor ? { cursor } : {}),
+    });
+    const response = await get(`${endpoint}?${query}`, withAuth);
+    if (!response.ok) {
+      const error = new Error(`GET ${endpoint} failed: ${response.status}`);
+      error.status = response.status;
+      throw error;
+    }
+    const page = await response.json();
+    if (!Array.isArray(page?.items)) {
+      throw new Error(`GET ${endpoint} did not return a page of items`);
+    }
+    items.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return items;
+}
+
 const api = {
   get,
   post,
@@ -92,9 +121,14 @@ const api = {
   register: (data) => post("/auth/register", data, true),
   getUserTypes: () => get("/api/user_types", true),
   getUserTypeById: (id) => get(`/api/user_types/bg_user_type_id/${id}`, true),
-  getUsers: () => get("/api/users", true),
+  getUsers: (params = {}) => get(`/api/users?${new URLSearchParams(params)}`, true),
+  getAllUserPages: (params = {}) =>
+    getAllPages("/api/users", params, true), // every user, following next_cursor
   putUsers: (userId, data) => put(`/api/users/${userId}`, data, true),
 
+  //batch: run several GET requests in one round trip, responses come back in request order
+  batch: (requests) => post("/api/batch", { requests }, true),
+
   //dashboard
   getCardMenus: () => get("/api/card-menus", true),
 
@@ -103,8 +137,9 @@ const api = {
   getMaterialTypeQuantity: () => get(`/api/material_type_quantities`, true),
 
   //lots
-  getLots: () => get("/api/lots", true),
-  getLotsByMaterialTypeId: (id) => get(`/api/lots/material_type/${id}`, true),
+  getLots: () => get("/api/lots?include=none", true), // counts only, without the items of each lot
+  getLotsByMaterialTypeId: (id) =>
+    get(`/api/lots/material_type/${id}?include=none`, true),
   getLotsById: (id) => get(`/api/lots/${id}`, true),
   postAddLot: (data) => post("/api/add_lot", data, true), // addMaterial.jsx
   getLotsByProjectId: (id) => get(`/api/projects/${id}/lots`, true), //get all lots assigned to a project
@@ -116,12 +151,13 @@ const api = {
 
   //cartons
   getCarton: (cartonId) => get(`/api/cartons/${cartonId}`, true), //get a carton by id
-  getCartonByLotId: (id) => get(`/api/cartons/lot/${id}`, true),
+  getCartonByLotId: (id) => get(`/api/cartons/lot/${id}?include=none`, true),
   getCartonItems: (cartonId) => get(`/api/cartons/${cartonId}/items`, true),
 
   //items
   getItem: (itemId) => get(`/api/items/${itemId}`, true), //get an item by id
-  getAllItems: () => get("/api/items", true),
+  getItems: (params = {}) =>
+    get(`/api/items?${new URLSearchParams(params)}`, true), // get a page of items, params: limit, cursor, status, ...
   putItem: (itemId, data) => put(`/api/items/${itemId}`, data, true),
   getItemsByTaskId: (taskId) => get(`/api/tasks/${taskId}/items`, true), //get all items by task id
   getAvailableItemsByTaskId: (taskId) =>
@@ -137,13 +173,24 @@ const api = {
     del(`/api/tasks/${taskId}/items/${itemId}/remove`, true), // remove an item from a task
   getItemsSummaryByTaskId: (taskId) =>
     get(`/api/tasks/${taskId}/items/summary`, true), // get items summary by task id
+  holdItemsForTask: (taskId, assignments, ttlSeconds) =>
+    post(
+      `/api/tasks/${taskId}/items/hold`,
+      { assignments, ttl_seconds: ttlSeconds },
+      true,
+    ), // hold items for a task while planning
+  releaseItemHoldsForTask: (taskId) =>
+    del(`/api/tasks/${taskId}/items/hold`, true), // release all item holds of a task
 
   //stock logs: keep track any modification of items/ cartons/ lots
   getStockLog: (params) => get(`/api/get_stock_logs?${params}`, true),
 
   //projects
   getProject: (id) => get(`/api/projects/${id}`, true), //get a project by id
-  getAllProjects: () => get("/api/projects", true), //get all projects
+  getAllProjects: (params = {}) =>
+    get(`/api/projects?${new URLSearchParams(params)}`, true), //get a page of projects
+  getAllProjectPages: (params = {}) =>
+    getAllPages("/api/projects", params, true), // every project, following next_cursor
   postProject: (data) => post("/api/projects", data, true), // create a new project
   putProject: (id, data) => put(`/api/projects/${id}`, data, true), // update a project by id
 